@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import QuestionBankTopic
+
+
+@admin.register(QuestionBankTopic)
+class QuestionBankTopicAdmin(admin.ModelAdmin):
+    list_display = ('topic', 'difficulty', 'subject', 'enabled', 'requested_by', 'served', 'misses', 'refill_requested_at', 'last_refill_at')
+    list_editable = ('enabled',)
+    list_filter = ('enabled', 'subject', 'difficulty')
+    search_fields = ('topic', 'requested_by__username')
+    readonly_fields = ('served', 'generated', 'refills', 'failed_refills', 'duplicates', 'misses', 'last_refill_at', 'last_error', 'created_at')
@@ -0,0 +1,107 @@
+"""
+ASGI-native variants of the AI endpoints.
+
+Each variant runs the same ``post_steps``/``get_steps`` generator as the DRF view
+it wraps, but awaits the provider on the async client, so an ASGI worker can
+keep hundreds of AI requests in flight instead of one per thread. Auth,
+permissions, serializer errors and rendering go through DRF as usual.
+"""
+from asgiref.sync import sync_to_async
+
+from . import provider
+from .provider import run_async, get_async_client
+from .views import (
+    AIRecommendView, AISummarizeView, AIStudyScheduleView, AIQuizGenerateView, AIExamAnalysisView,
+    AIPsychSupportView, AIChatView, AIDailyReportAnalyzeView, TargetNetsView, AIPerCourseAveragesView,
+    sse_event,
+)
+
+
+def async_view(view_class, **initkwargs):
+    """Build an async Django view from a DRF view exposing ``<method>_steps`` generators."""
+
+    async def view(request, *args, **kwargs):
+        self = view_class(**initkwargs)
+        self.setup(request, *args, **kwargs)
+        self.args = args
+        self.kwargs = kwargs
+        drf_request = self.initialize_request(request, *args, **kwargs)
+        self.request = drf_request
+        self.headers = self.default_response_headers
+        try:
+            # Authentication (JWT user lookup), permissions and throttles may hit the DB.
+            await sync_to_async(self.initial)(drf_request, *args, **kwargs)
+            steps = getattr(self, f'{request.method.lower()}_steps', None)
+            if steps is None:
+                self.http_method_not_allowed(drf_request, *args, **kwargs)
+            response = await run_async(steps(drf_request, *args, **kwargs))
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(drf_request, response, *args, **kwargs)
+        return self.response
+
+    view.cls = view_class  # type: ignore[attr-defined]
+    view.initkwargs = initkwargs  # type: ignore[attr-defined]
+    # Same as APIView.as_view(): JWT auth does not use cookies, so CSRF does not apply.
+    view.csrf_exempt = True  # type: ignore[attr-defined]
+    return view
+
+
+async def _aiter(events):
+    for event in events:
+        yield event
+
+
+class AsyncAIChatView(AIChatView):
+    """Streams over the async client, so an open SSE connection holds no thread."""
+
+    def _sse_response(self, events):
+        if not hasattr(events, '__aiter__'):
+            events = _aiter(events)
+        return super()._sse_response(events)
+
+    def event_stream(self, payload):
+        if provider.httpx is None:
+            return super().event_stream(payload)
+        return self._async_event_stream(payload)
+
+    async def _async_event_stream(self, payload):
+        try:
+            stream = await get_async_client().open_stream(payload, timeout=15, retry_max_tokens=300)
+        except Exception as e:
+            for event in self._stream_error_events(e):
+                yield event
+            return
+        if not stream.ok:
+            events = self._stream_error_events(stream)
+            await stream.aclose()
+            for event in events:
+                yield event
+            return
+        parts: list[str] = []
+        try:
+            async for delta in stream:
+                parts.append(delta)
+                yield sse_event({ 'delta': delta })
+        except Exception as e:
+            yield sse_event({ 'error': self._exception_reply(e) }, event='error')
+        finally:
+            await stream.aclose()
+        yield self._done_event(parts)
+
+
+class AsyncAIChatStreamView(AsyncAIChatView):
+    streaming = True
+
+
+ai_recommend = async_view(AIRecommendView)
+ai_summarize = async_view(AISummarizeView)
+ai_schedule = async_view(AIStudyScheduleView)
+ai_quiz = async_view(AIQuizGenerateView)
+ai_exam_analysis = async_view(AIExamAnalysisView)
+ai_psych_support = async_view(AIPsychSupportView)
+ai_chat = async_view(AsyncAIChatView)
+ai_chat_stream = async_view(AsyncAIChatStreamView)
+ai_daily_report_analyze = async_view(AIDailyReportAnalyzeView)
+ai_target_nets = async_view(TargetNetsView)
+ai_per_course_averages = async_view(AIPerCourseAveragesView)
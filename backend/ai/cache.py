@@ -0,0 +1,88 @@
+"""
+Content-addressed cache for provider completions.
+
+The key is a SHA-256 of the normalized request body (model, messages,
+temperature, max_tokens and the other sampling options), so identical prompts
+from different users share one entry. Entries live in the ``ai`` cache alias
+(``settings.CACHES``), whose TTL and MAX_ENTRIES bound memory; the default
+LocMemCache evicts least-recently-used entries first.
+
+Caching is opt-in per endpoint through ``settings.AI_CACHE_ENDPOINTS``
+(endpoint name -> TTL seconds). Hit/miss counters are kept per endpoint in the
+default cache.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache as default_cache, caches
+
+STATS_PREFIX = 'ai-cache:stats'
+
+
+def _ttl(endpoint: Optional[str]) -> Optional[int]:
+    if not endpoint or not getattr(settings, 'AI_CACHE_ENABLED', True):
+        return None
+    return (getattr(settings, 'AI_CACHE_ENDPOINTS', {}) or {}).get(endpoint)
+
+
+def cache_key(body: Dict[str, Any]) -> str:
+    normalized = { k: v for k, v in body.items() if k != 'stream' }
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return 'ai:completion:' + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _count(endpoint: str, outcome: str) -> None:
+    key = f'{STATS_PREFIX}:{endpoint}:{outcome}'
+    try:
+        default_cache.incr(key)
+    except ValueError:
+        default_cache.add(key, 0, timeout=None)
+        default_cache.incr(key)
+
+
+def lookup(endpoint: Optional[str], body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Cached response JSON for ``body`` or None (also None when the endpoint is not opted in)."""
+    if _ttl(endpoint) is None:
+        return None
+    data = caches['ai'].get(cache_key(body))
+    _count(endpoint, 'hit' if data is not None else 'miss')  # type: ignore[arg-type]
+    return data
+
+
+def store(endpoint: Optional[str], body: Dict[str, Any], data: Dict[str, Any]) -> None:
+    ttl = _ttl(endpoint)
+    if ttl is None or not data.get('choices'):
+        return
+    caches['ai'].set(cache_key(body), data, timeout=ttl)
+
+
+async def alookup(endpoint: Optional[str], body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if _ttl(endpoint) is None:
+        return None
+    from asgiref.sync import sync_to_async
+    return await sync_to_async(lookup)(endpoint, body)
+
+
+async def astore(endpoint: Optional[str], body: Dict[str, Any], data: Dict[str, Any]) -> None:
+    if _ttl(endpoint) is None:
+        return
+    from asgiref.sync import sync_to_async
+    await sync_to_async(store)(endpoint, body, data)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    endpoints = getattr(settings, 'AI_CACHE_ENDPOINTS', {}) or {}
+    result = {}
+    for endpoint, ttl in endpoints.items():
+        hits = default_cache.get(f'{STATS_PREFIX}:{endpoint}:hit', 0)
+        misses = default_cache.get(f'{STATS_PREFIX}:{endpoint}:miss', 0)
+        total = hits + misses
+        result[endpoint] = {
+            'ttl': ttl,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+        }
+    return result
@@ -0,0 +1,101 @@
+"""
+Storage for saved AI chats (``ChatThread`` + one ``ChatMessage`` row per turn).
+
+The frontend sends the whole transcript on every save. ``save_history`` only
+inserts the turns past the thread's ``message_count``; it reads back one row
+(the last stored turn) to check that the client's transcript still extends
+what is stored, and rewrites the thread only when it does not (edited or
+shortened history). Preview and count live on the thread, so listing chats
+never touches messages.
+
+Messages are paged by ``seq`` (keyset): ``before`` pages back from the newest
+turn, ``after`` fetches turns newer than the client already has.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ChatMessage, ChatThread
+
+PREVIEW_CHARS = 50
+DEFAULT_TITLE = 'ChatThread'
+
+Turn = Tuple[str, str]  # (role, content)
+
+
+def clean(history: Sequence[Dict[str, Any]]) -> List[Turn]:
+    return [(str(m.get('role') or 'user')[:16], str(m.get('content') or '')) for m in history if isinstance(m, dict)]
+
+
+def preview_of(turns: Sequence[Turn]) -> str:
+    first = next((content for role, content in turns if role == 'user' and content), '')
+    return first[:PREVIEW_CHARS] + '...' if len(first) > PREVIEW_CHARS else first
+
+
+def title_from(turns: Sequence[Turn]) -> str:
+    """Title for an untitled thread: the start of the first user message."""
+    first = next((content.strip() for role, content in turns if role == 'user' and content.strip()), '')
+    return f"Chat: {first[:30]}..." if first else DEFAULT_TITLE
+
+
+def _insert(thread: ChatThread, turns: Sequence[Turn], start: int) -> None:
+    now = timezone.now()
+    ChatMessage.objects.bulk_create([  # type: ignore[attr-defined]
+        ChatMessage(thread=thread, seq=start + i, role=role, content=content, created_at=now)
+        for i, (role, content) in enumerate(turns)
+    ], batch_size=500)
+
+
+def create_thread(user, title: str, history: Sequence[Dict[str, Any]] = ()) -> ChatThread:
+    turns = clean(history)
+    with transaction.atomic():
+        thread = ChatThread.objects.create(  # type: ignore[attr-defined]
+            user=user, title=title[:200], preview=preview_of(turns), message_count=len(turns),
+        )
+        _insert(thread, turns, 0)
+    return thread
+
+
+def save_history(thread_id: int, user, history: Sequence[Dict[str, Any]], title: Optional[str] = None) -> Tuple[Optional[ChatThread], int]:
+    """Bring the user's thread up to ``history``; returns (thread or None if not found, messages written)."""
+    turns = clean(history)
+    with transaction.atomic():
+        thread = ChatThread.objects.select_for_update().filter(pk=thread_id, user=user).first()  # type: ignore[attr-defined]
+        if thread is None:
+            return None, 0
+        count = thread.message_count
+        extends = len(turns) >= count
+        if extends and count:
+            last = ChatMessage.objects.filter(thread=thread, seq=count - 1).values_list('role', 'content').first()  # type: ignore[attr-defined]
+            extends = last is not None and tuple(last) == turns[count - 1]
+        if extends:
+            _insert(thread, turns[count:], count)
+            written = len(turns) - count
+        else:
+            ChatMessage.objects.filter(thread=thread).delete()  # type: ignore[attr-defined]
+            _insert(thread, turns, 0)
+            written = len(turns)
+        thread.title = (title or thread.title)[:200]
+        thread.preview = preview_of(turns) if turns else ''
+        thread.message_count = len(turns)
+        thread.updated_at = timezone.now()
+        thread.save(update_fields=['title', 'preview', 'message_count', 'updated_at'])
+    return thread, written
+
+
+def page(thread: ChatThread, before: Optional[int] = None, after: Optional[int] = None,
+         limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], bool]:
+    """Messages of ``thread`` in order, and whether older ones exist before the first returned.
+
+    Without a cursor or limit this is the whole transcript.
+    """
+    qs = ChatMessage.objects.filter(thread=thread)  # type: ignore[attr-defined]
+    if after is not None:
+        rows = list(qs.filter(seq__gt=after).order_by('seq').values('seq', 'role', 'content')[:limit])
+    else:
+        if before is not None:
+            qs = qs.filter(seq__lt=before)
+        rows = list(qs.order_by('-seq').values('seq', 'role', 'content')[:limit])[::-1]
+    has_more = bool(rows) and rows[0]['seq'] > 0 and after is None
+    return rows, has_more
@@ -0,0 +1,153 @@
+"""
+Near-duplicate detection for quiz question stems.
+
+Stems are normalized (case, punctuation, whitespace), every word is cut to its
+first ``STEM_CHARS`` letters so Turkish suffixes do not count as differences
+("gerçekleşir" / "gerçekleşmektedir"), and the result is split into character
+shingles; a 64-value MinHash signature estimates the Jaccard similarity of two
+stems. ``MinHashIndex`` buckets signatures with LSH (16 bands x 4 rows), so a
+lookup only compares against the few signatures sharing a band, whatever the
+index size. Bands are sized so pairs around the threshold almost always share
+a band while clearly different stems rarely do.
+
+Signatures serialize to 256 bytes (``to_bytes``/``from_bytes``) for storage.
+"""
+import hashlib
+import os
+import re
+import struct
+import threading
+from array import array
+from typing import Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = 4
+SHINGLE_SIZE = 5
+STEM_CHARS = 5  # prefix stemming; changing it requires recomputing stored signatures
+# Estimated Jaccard similarity at or above which two stems are duplicates.
+THRESHOLD = float(os.getenv('QUIZ_DUPLICATE_THRESHOLD', '0.7'))
+
+# Each blake2b digest yields 16 independent 32-bit hash values; 4 salts give 64.
+_SALTS = [bytes([i]) * 16 for i in range(NUM_PERM // 16)]
+_UNPACK = struct.Struct(f'<{NUM_PERM}I').unpack
+_EMPTY = (0xFFFFFFFF,) * NUM_PERM
+_NON_WORD = re.compile(r'[^\w]+')
+
+Signature = Tuple[int, ...]
+
+
+def normalize(text: str) -> str:
+    return ' '.join(_NON_WORD.sub(' ', str(text or '').casefold()).split())
+
+
+def shingles(text: str) -> Set[str]:
+    norm = ' '.join(word[:STEM_CHARS] for word in normalize(text).split())
+    if len(norm) <= SHINGLE_SIZE:
+        return { norm } if norm else set()
+    return { norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1) }
+
+
+def _hashes(shingle: str) -> Tuple[int, ...]:
+    data = shingle.encode('utf-8')
+    return _UNPACK(b''.join(hashlib.blake2b(data, digest_size=64, salt=salt).digest() for salt in _SALTS))
+
+
+def signature(text: str) -> Signature:
+    """MinHash signature of a question stem."""
+    sh = shingles(text)
+    if not sh:
+        return _EMPTY
+    return tuple(map(min, zip(*map(_hashes, sh))))
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of the stems behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def to_bytes(sig: Signature) -> bytes:
+    return array('I', sig).tobytes()
+
+
+def from_bytes(raw: bytes) -> Signature:
+    values = array('I')
+    values.frombytes(bytes(raw))
+    return tuple(values)
+
+
+class MinHashIndex:
+    """
+    In-memory LSH index of signatures keyed by caller-chosen ids, safe to share
+    between threads. Signatures are kept as their 256-byte encoding and each band
+    as one hashed dict key; a 2000-stem index takes about 5 MB.
+    """
+
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self._signatures: Dict[Hashable, bytes] = {}
+        # hash of (band, band bytes) -> keys in that bucket
+        self._buckets: Dict[int, List[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @staticmethod
+    def _bands(raw: bytes) -> Iterator[int]:
+        width = ROWS * 4
+        for band in range(BANDS):
+            yield hash((band, raw[band * width:(band + 1) * width]))
+
+    def keys(self) -> List[Hashable]:
+        """Indexed keys, oldest first."""
+        with self._lock:
+            return list(self._signatures)
+
+    def get(self, key: Hashable) -> Optional[Signature]:
+        with self._lock:
+            raw = self._signatures.get(key)
+        return from_bytes(raw) if raw is not None else None
+
+    def add(self, key: Hashable, sig: Signature) -> None:
+        self.add_bytes(key, to_bytes(sig))
+
+    def add_bytes(self, key: Hashable, raw: bytes) -> None:
+        """Add a signature in its ``to_bytes`` form (as stored in the database)."""
+        raw = bytes(raw)
+        with self._lock:
+            self._remove(key)
+            self._signatures[key] = raw
+            for bucket in self._bands(raw):
+                self._buckets.setdefault(bucket, []).append(key)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        raw = self._signatures.pop(key, None)
+        if raw is None:
+            return
+        for bucket in self._bands(raw):
+            keys = self._buckets.get(bucket)
+            if keys is not None and key in keys:
+                keys.remove(key)
+                if not keys:
+                    del self._buckets[bucket]
+
+    def query(self, sig: Signature) -> Optional[Tuple[Hashable, float]]:
+        """Most similar indexed key at or above the threshold, with its similarity."""
+        raw = to_bytes(sig)
+        with self._lock:
+            candidates = { key for bucket in self._bands(raw) for key in self._buckets.get(bucket, ()) }
+            stored = [(key, self._signatures[key]) for key in candidates]
+        best = None
+        for key, other in stored:
+            sim = similarity(sig, from_bytes(other))
+            if sim >= self.threshold and (best is None or sim > best[1]):
+                best = (key, sim)
+        return best
+
+    def is_duplicate(self, sig: Signature) -> bool:
+        return self.query(sig) is not None
@@ -0,0 +1,215 @@
+"""
+Provider health tracking shared by every AI view in the process.
+
+``CircuitBreaker`` opens after ``AI_BREAKER_FAILURES`` consecutive failed calls
+(timeouts, connection errors, 429/5xx), rejects calls for ``AI_BREAKER_RESET``
+seconds so views go straight to their local fallbacks, then lets a single
+half-open probe through: success closes it, failure opens it again.
+
+``LatencyTracker`` keeps a window of recent call durations per endpoint and
+derives read timeouts from them (p95 x ``AI_TIMEOUT_FACTOR``, clamped), so
+timeouts follow the provider instead of the per-view constants, which are only
+used until enough samples exist.
+
+``UpstreamGate`` caps concurrent upstream calls per process at
+``AI_UPSTREAM_CONCURRENCY``; a call beyond the cap waits up to
+``AI_UPSTREAM_WAIT`` seconds for a slot and is then rejected.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+FAILURE_THRESHOLD = int(os.getenv('AI_BREAKER_FAILURES', '5'))
+RESET_SECONDS = float(os.getenv('AI_BREAKER_RESET', '30'))
+
+TIMEOUT_MIN = float(os.getenv('AI_TIMEOUT_MIN', '4'))
+TIMEOUT_MAX = float(os.getenv('AI_TIMEOUT_MAX', '30'))
+TIMEOUT_FACTOR = float(os.getenv('AI_TIMEOUT_FACTOR', '2'))
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+
+UPSTREAM_CONCURRENCY = int(os.getenv('AI_UPSTREAM_CONCURRENCY', '16'))  # 0 disables the cap
+UPSTREAM_WAIT = float(os.getenv('AI_UPSTREAM_WAIT', '5'))
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_seconds: float = RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a provider call may start now (claims the probe slot when half-open)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                print('✅ AI provider circuit closed')
+                self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f'⚠️ AI provider circuit opened after {self.failures} failures')
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        """Seconds until the next half-open probe (0 when not open)."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return { 'state': self.state, 'failures': self.failures, 'retry_after': round(self.retry_after(), 1) }
+
+
+class LatencyTracker:
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, endpoint: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint) or ())
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def timeout_for(self, endpoint: Optional[str], default: float) -> float:
+        """Adaptive read timeout for ``endpoint``; ``default`` until MIN_SAMPLES calls were seen."""
+        if not endpoint:
+            return default
+        with self._lock:
+            count = len(self._samples.get(endpoint) or ())
+        if count < MIN_SAMPLES:
+            return default
+        p95 = self.percentile(endpoint, 0.95) or default
+        return min(TIMEOUT_MAX, max(TIMEOUT_MIN, p95 * TIMEOUT_FACTOR))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            endpoints = list(self._samples)
+        result = {}
+        for endpoint in endpoints:
+            p50 = self.percentile(endpoint, 0.5)
+            p95 = self.percentile(endpoint, 0.95)
+            result[endpoint] = {
+                'samples': len(self._samples[endpoint]),
+                'p50': round(p50, 3) if p50 is not None else None,
+                'p95': round(p95, 3) if p95 is not None else None,
+                'timeout': round(self.timeout_for(endpoint, 0.0), 2) or None,
+            }
+        return result
+
+
+class UpstreamGate:
+    """Counting semaphore over upstream calls, with counters for tuning the cap."""
+
+    def __init__(self, limit: int = UPSTREAM_CONCURRENCY, wait_seconds: float = UPSTREAM_WAIT):
+        self.limit = limit
+        self.wait_seconds = wait_seconds
+        self._slots = threading.BoundedSemaphore(max(1, limit))
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak = 0
+        self.admitted = 0
+        self.waited = 0
+        self.rejected = 0
+
+    def _enter(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.admitted += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now."""
+        if self.limit <= 0 or self._slots.acquire(blocking=False):
+            self._enter()
+            return True
+        return False
+
+    def acquire(self) -> bool:
+        """Take a slot, waiting up to ``wait_seconds``; False when none freed up."""
+        if self.try_acquire():
+            return True
+        with self._lock:
+            self.waiting += 1
+            self.waited += 1
+        try:
+            ok = self._slots.acquire(timeout=self.wait_seconds)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if ok:
+            self._enter()
+        else:
+            with self._lock:
+                self.rejected += 1
+        return ok
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        if self.limit > 0:
+            self._slots.release()
+
+    def saturated(self) -> bool:
+        """Every slot is taken and as many callers again are queued for one."""
+        with self._lock:
+            return self.limit > 0 and self.in_flight >= self.limit and self.waiting >= self.limit
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'limit': self.limit, 'in_flight': self.in_flight, 'waiting': self.waiting, 'peak': self.peak,
+                'admitted': self.admitted, 'waited': self.waited, 'rejected': self.rejected,
+            }
+
+
+breaker = CircuitBreaker()
+latency = LatencyTracker()
+upstream = UpstreamGate()
+
+
+def is_failure(status_code: int) -> bool:
+    """Statuses that mean the provider itself is unhealthy (not a bad request)."""
+    return status_code == 429 or status_code >= 500
@@ -0,0 +1,176 @@
+"""
+Load benchmark: blocking (thread-per-request) vs async provider calls.
+
+Starts a local fake OpenRouter that answers after ``--latency`` seconds and
+fires ``--requests`` chat completions at each concurrency level (all submitted
+at once; latency is measured from submission, so queueing is included), once through
+the pooled sync client on a fixed pool of worker threads (what a threaded
+WSGI deployment can do) and once through the async client on a single event
+loop (what one ASGI worker can do).
+
+Every request carries a distinct prompt so single-flight cannot merge them, and
+the upstream concurrency cap is lifted unless ``--upstream-limit`` is given;
+the ``upstream`` column counts the calls that actually reached the provider.
+
+    python manage.py bench_ai_concurrency --latency 0.5 --levels 10,50,200 --threads 8
+"""
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from ai import provider
+from ai.health import UpstreamGate
+from ai.provider import AsyncOpenRouterClient, OpenRouterClient
+
+
+class FakeProvider:
+    """
+    Minimal keep-alive HTTP/1.1 server on its own event loop thread that answers
+    every POST with a fixed completion after ``latency`` seconds. Being async, it
+    is never the bottleneck, whatever the client concurrency.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.reply = json.dumps({ 'choices': [ { 'message': { 'content': 'ok' } } ] }).encode()
+        self.loop = asyncio.new_event_loop()
+        self.port = 0
+        self.hits = 0  # requests answered; only touched on the server loop
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle, '127.0.0.1', 0, backlog=2048)
+            )
+            self.port = server.sockets[0].getsockname()[1]
+            started.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        started.wait()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}/api/v1/chat/completions'
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in head.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':', 1)[1])
+                await reader.readexactly(length)
+                self.hits += 1
+                await asyncio.sleep(self.latency)
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    + f'Content-Length: {len(self.reply)}\r\n\r\n'.encode() + self.reply
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def _payload(i: int) -> dict:
+    # Distinct prompts: identical concurrent calls would be coalesced by single-flight
+    return { 'messages': [ { 'role': 'user', 'content': f'ping {i}' } ], 'max_tokens': 16 }
+
+
+def _summary(latencies, wall):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    return {
+        'rps': len(latencies) / wall if wall else 0.0,
+        'p50': statistics.median(latencies) if latencies else 0.0,
+        'p95': p95,
+        'wall': wall,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark blocking vs async AI provider calls against a local fake provider.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=0.5, help='Fake provider latency in seconds')
+        parser.add_argument('--levels', default='10,50,200', help='Comma-separated in-flight request counts')
+        parser.add_argument('--threads', type=int, default=8, help='Worker threads for the blocking mode')
+        parser.add_argument('--requests', type=int, default=0, help='Requests per level (default: 2x level)')
+        parser.add_argument('--upstream-limit', type=int, default=0,
+                            help='Upstream concurrency cap during the run (default: 0, uncapped)')
+
+    def handle(self, *args, **options):
+        latency = options['latency']
+        levels = [int(x) for x in options['levels'].split(',') if x.strip()]
+        threads = options['threads']
+        server = FakeProvider(latency)
+        url = server.url
+        gate = provider.upstream
+        provider.upstream = UpstreamGate(limit=options['upstream_limit'])
+
+        self.stdout.write(
+            f"fake provider latency={latency}s, blocking threads={threads}, upstream limit={options['upstream_limit'] or 'none'}"
+        )
+        self.stdout.write(
+            f"{'mode':<10}{'in-flight':>10}{'reqs':>7}{'upstream':>10}{'req/s':>10}{'p50 s':>9}{'p95 s':>9}{'wall s':>9}"
+        )
+        try:
+            for level in levels:
+                total = options['requests'] or level * 2
+                for mode, bench in (
+                    ('blocking', lambda: self._bench_sync(url, total, threads)),
+                    ('async', lambda: asyncio.run(self._bench_async(url, total, level))),
+                ):
+                    hits = server.hits
+                    result = bench()
+                    self.stdout.write(
+                        f"{mode:<10}{level:>10}{total:>7}{server.hits - hits:>10}{result['rps']:>10.1f}"
+                        f"{result['p50']:>9.3f}{result['p95']:>9.3f}{result['wall']:>9.2f}"
+                    )
+        finally:
+            provider.upstream = gate
+            server.stop()
+
+    def _bench_sync(self, url, total, threads):
+        client = OpenRouterClient(provider_url=url, pool_size=threads)
+        latencies = []
+
+        start = time.perf_counter()
+
+        def one(i):
+            client.chat_completion(_payload(i), timeout=60)
+            latencies.append(time.perf_counter() - start)
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(one, range(total)))
+        return _summary(latencies, time.perf_counter() - start)
+
+    async def _bench_async(self, url, total, in_flight):
+        client = AsyncOpenRouterClient(OpenRouterClient(provider_url=url), pool_size=in_flight)
+        gate = asyncio.Semaphore(in_flight)
+        latencies = []
+
+        start = time.perf_counter()
+
+        async def one(i):
+            async with gate:
+                await client.chat_completion(_payload(i), timeout=60)
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(one(i) for i in range(total)))
+        wall = time.perf_counter() - start
+        if client.http is not None:
+            await client.http.aclose()
+        return _summary(latencies, wall)
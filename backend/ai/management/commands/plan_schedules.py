@@ -0,0 +1,53 @@
+"""
+Plan study schedules in batch, without the API.
+
+Reads schedule request bodies (the JSON the schedule endpoint accepts; one
+object, a list, or one object per line) from a file or stdin and writes one
+response body per line, in input order:
+
+    python manage.py plan_schedules requests.json > schedules.jsonl
+    python manage.py plan_schedules --mode greedy --weak "türev,limit" < requests.jsonl
+"""
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai import scheduler
+
+
+def _read_bodies(text):
+    text = text.strip()
+    if not text:
+        return []
+    try:
+        parsed = json.loads(text)
+        return parsed if isinstance(parsed, list) else [parsed]
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class Command(BaseCommand):
+    help = 'Plan study schedules for request bodies read from a file or stdin.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='JSON/JSONL file (default: stdin)')
+        parser.add_argument('--mode', choices=scheduler.MODES, help="Override each body's mode")
+        parser.add_argument('--weak', default='', help='Comma-separated weak topics for every body')
+
+    def handle(self, *args, **options):
+        try:
+            if options['path']:
+                with open(options['path'], encoding='utf-8') as fh:
+                    bodies = _read_bodies(fh.read())
+            else:
+                bodies = _read_bodies(sys.stdin.read())
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Could not read requests: {exc}')
+
+        weak = [t.strip() for t in options['weak'].split(',') if t.strip()]
+        for body in bodies:
+            if not isinstance(body, dict):
+                raise CommandError('Each request must be a JSON object')
+            result = scheduler.plan_request(body, weak, options['mode'])
+            self.stdout.write(json.dumps(result, ensure_ascii=False))
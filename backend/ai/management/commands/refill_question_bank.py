@@ -0,0 +1,84 @@
+"""
+Keep the quiz question bank stocked.
+
+Refills every enabled topic whose stock is below its low-water mark up to its
+target, topics that quiz requests marked (``refill_requested_at``) first.
+Quiz requests never refill themselves, so keep this running as a worker with
+``--loop`` (or from cron). ``--topic`` registers a topic, enabling it if
+students had suggested it.
+
+    python manage.py refill_question_bank --loop 300
+    python manage.py refill_question_bank --topic "matematik türev" --difficulty zor --low-water 30 --target 90
+    python manage.py refill_question_bank --stats
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from ai import question_bank
+from ai.health import breaker
+from ai.models import QuestionBankTopic
+from ai.provider import get_client
+
+
+class Command(BaseCommand):
+    help = 'Refill quiz question bank topics that are below their low-water mark.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--topic', help='Register/refill only this topic')
+        parser.add_argument('--difficulty', default='orta', help='Difficulty for --topic (kolay/orta/zor)')
+        parser.add_argument('--low-water', type=int, help='Set the low-water mark of --topic')
+        parser.add_argument('--target', type=int, help='Set the refill target of --topic')
+        parser.add_argument('--force', action='store_true', help='Refill up to target even above the low-water mark')
+        parser.add_argument('--loop', type=float, default=0, help='Repeat every N seconds')
+        parser.add_argument('--stats', action='store_true', help='Print stock and refill metrics and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._print_stats()
+            return
+
+        if options['topic']:
+            entry = question_bank.register(options['topic'], options['difficulty'])
+            updates = {}
+            if options['low_water'] is not None:
+                updates['low_water'] = options['low_water']
+            if options['target'] is not None:
+                updates['target'] = options['target']
+            if updates:
+                QuestionBankTopic.objects.filter(pk=entry.pk).update(**updates)  # type: ignore[attr-defined]
+
+        while True:
+            self._refill_once(options)
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+
+    def _refill_once(self, options):
+        # Nothing to gain without a key, and a refill must not spend the breaker's half-open probe.
+        if not get_client().api_key or breaker.state == breaker.OPEN:
+            return
+        topics = QuestionBankTopic.objects.filter(enabled=True).order_by(  # type: ignore[attr-defined]
+            F('refill_requested_at').asc(nulls_last=True), 'id'
+        )
+        if options['topic']:
+            topics = topics.filter(**question_bank.bank_key(options['topic'], options['difficulty']))
+        for entry in topics:
+            current = question_bank.stock(entry)
+            threshold = entry.target if options['force'] else entry.low_water
+            if current >= threshold:
+                if entry.refill_requested_at is not None:
+                    QuestionBankTopic.objects.filter(pk=entry.pk).update(refill_requested_at=None)  # type: ignore[attr-defined]
+                continue
+            added = question_bank.refill(entry)
+            self.stdout.write(f'{entry.topic} [{entry.difficulty}]: {current} -> {current + added}')
+
+    def _print_stats(self):
+        rows = question_bank.stats()
+        self.stdout.write(f"{'topic':<32}{'diff':<7}{'on':>3}{'stock':>6}{'low':>5}{'tgt':>5}{'served':>8}{'miss':>6}{'gen':>6}{'refill':>7}{'fail':>5}")
+        for r in rows:
+            self.stdout.write(
+                f"{r['topic'][:31]:<32}{r['difficulty']:<7}{'y' if r['enabled'] else 'n':>3}{r['stock']:>6}{r['low_water']:>5}{r['target']:>5}"
+                f"{r['served']:>8}{r['misses']:>6}{r['generated']:>6}{r['refills']:>7}{r['failed_refills']:>5}"
+            )
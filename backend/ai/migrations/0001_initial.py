@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionBankItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=32)),
+                ('topic', models.CharField(max_length=128)),
+                ('difficulty', models.CharField(max_length=16)),
+                ('question', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['subject', 'topic', 'difficulty'], name='ai_question_subject_7fae7e_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionBankTopic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=32)),
+                ('topic', models.CharField(max_length=128)),
+                ('difficulty', models.CharField(max_length=16)),
+                ('low_water', models.PositiveIntegerField(default=20)),
+                ('target', models.PositiveIntegerField(default=60)),
+                ('served', models.PositiveIntegerField(default=0)),
+                ('generated', models.PositiveIntegerField(default=0)),
+                ('refills', models.PositiveIntegerField(default=0)),
+                ('failed_refills', models.PositiveIntegerField(default=0)),
+                ('misses', models.PositiveIntegerField(default=0)),
+                ('last_refill_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('subject', 'topic', 'difficulty'), name='uniq_question_bank_topic')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionbankitem',
+            name='signature',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='questionbanktopic',
+            name='duplicates',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
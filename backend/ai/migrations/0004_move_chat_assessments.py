@@ -0,0 +1,97 @@
+from django.core.management.color import no_style
+from django.db import migrations
+
+BATCH_SIZE = 200
+PREVIEW_CHARS = 50
+
+
+def _turns(data):
+    history = data.get('history') if isinstance(data, dict) else None
+    return [
+        (str(m.get('role') or 'user')[:16], str(m.get('content') or ''))
+        for m in (history or []) if isinstance(m, dict)
+    ]
+
+
+def _preview(turns):
+    first = next((content for role, content in turns if role == 'user' and content), '')
+    return first[:PREVIEW_CHARS] + '...' if len(first) > PREVIEW_CHARS else first
+
+
+def _flush(ChatThread, ChatMessage, threads, messages):
+    ChatThread.objects.bulk_create(threads)
+    ChatMessage.objects.bulk_create(messages, batch_size=1000)
+
+
+def _reset_sequences(schema_editor, model):
+    # Explicit ids do not advance Postgres sequences
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+def forwards(apps, schema_editor):
+    """Chat assessments become threads with the same id (links the frontend holds keep working)."""
+    Assessment = apps.get_model('assessments', 'Assessment')
+    ChatThread = apps.get_model('ai', 'ChatThread')
+    ChatMessage = apps.get_model('ai', 'ChatMessage')
+    chats = Assessment.objects.filter(kind='chat').order_by('pk')
+    threads, messages, moved = [], [], []
+    for chat in chats.iterator(chunk_size=BATCH_SIZE):
+        turns = _turns(chat.data)
+        threads.append(ChatThread(
+            id=chat.pk, user_id=chat.user_id, title=chat.title[:200], preview=_preview(turns),
+            message_count=len(turns), created_at=chat.created_at, updated_at=chat.created_at,
+        ))
+        messages.extend(
+            ChatMessage(thread_id=chat.pk, seq=i, role=role, content=content, created_at=chat.created_at)
+            for i, (role, content) in enumerate(turns)
+        )
+        moved.append(chat.pk)
+        if len(threads) >= BATCH_SIZE:
+            _flush(ChatThread, ChatMessage, threads, messages)
+            threads, messages = [], []
+    if threads:
+        _flush(ChatThread, ChatMessage, threads, messages)
+    if moved:
+        _reset_sequences(schema_editor, ChatThread)
+        for i in range(0, len(moved), 1000):
+            Assessment.objects.filter(pk__in=moved[i:i + 1000]).delete()
+
+
+def backwards(apps, schema_editor):
+    """Threads become chat assessments again with their id and creation time."""
+    Assessment = apps.get_model('assessments', 'Assessment')
+    ChatThread = apps.get_model('ai', 'ChatThread')
+    ChatMessage = apps.get_model('ai', 'ChatMessage')
+    explicit_ids = False
+    for thread in ChatThread.objects.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        history = [
+            { 'role': role, 'content': content }
+            for role, content in ChatMessage.objects.filter(thread_id=thread.pk).order_by('seq').values_list('role', 'content')
+        ]
+        # Threads started after the move may share an id with a newer assessment; those get a fresh one
+        keep_id = not Assessment.objects.filter(pk=thread.pk).exists()
+        chat = Assessment.objects.create(
+            id=thread.pk if keep_id else None, user_id=thread.user_id, title=thread.title, kind='chat', score=0,
+            data={ 'history': history, 'type': 'chat' }, event_date=thread.created_at.date(),
+        )
+        # created_at is auto_now_add, so the original time is written afterwards
+        Assessment.objects.filter(pk=chat.pk).update(created_at=thread.created_at)
+        explicit_ids = explicit_ids or keep_id
+    if explicit_ids:
+        _reset_sequences(schema_editor, Assessment)
+    ChatThread.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0003_chat_threads'),
+        ('assessments', '0004_backfill_assessment_kind'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+# Signatures must match what ai.dedup computes at runtime, so it is imported rather than frozen
+from ai.dedup import signature, to_bytes
+
+BATCH_SIZE = 500
+SEEN_QUIZZES = 100  # latest quizzes per student whose questions count as seen
+SEEN_MAX_QUESTIONS = 2000
+
+
+def _stem(question):
+    return question.get('q', '') if isinstance(question, dict) else ''
+
+
+def forwards(apps, schema_editor):
+    """Recompute stock signatures (stems are now prefix-stemmed) and seed SeenQuestion from saved quizzes."""
+    QuestionBankItem = apps.get_model('ai', 'QuestionBankItem')
+    Assessment = apps.get_model('assessments', 'Assessment')
+    SeenQuestion = apps.get_model('ai', 'SeenQuestion')
+
+    items = []
+    for item in QuestionBankItem.objects.only('id', 'question').iterator(chunk_size=BATCH_SIZE):
+        item.signature = to_bytes(signature(_stem(item.question)))
+        items.append(item)
+        if len(items) >= BATCH_SIZE:
+            QuestionBankItem.objects.bulk_update(items, ['signature'])
+            items = []
+    if items:
+        QuestionBankItem.objects.bulk_update(items, ['signature'])
+
+    quizzes = Assessment.objects.filter(kind='quiz')
+    for user_id in quizzes.values_list('user_id', flat=True).distinct().order_by('user_id'):
+        rows = []
+        latest = quizzes.filter(user_id=user_id).order_by('-created_at').values_list('data', 'created_at')[:SEEN_QUIZZES]
+        for data, created_at in latest:
+            questions = (data or {}).get('questions') if isinstance(data, dict) else None
+            # Newest first, so the cap keeps the latest questions
+            for q in reversed(questions or []):
+                if _stem(q):
+                    rows.append((to_bytes(signature(_stem(q))), created_at))
+        # Oldest first, so row ids follow the order questions were served in
+        rows = rows[:SEEN_MAX_QUESTIONS][::-1]
+        SeenQuestion.objects.bulk_create(
+            [SeenQuestion(user_id=user_id, signature=sig, created_at=created_at) for sig, created_at in rows],
+            batch_size=BATCH_SIZE,
+        )
+
+
+def backwards(apps, schema_editor):
+    apps.get_model('ai', 'SeenQuestion').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0005_seenquestion'),
+        ('assessments', '0004_backfill_assessment_kind'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
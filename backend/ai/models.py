@@ -1,3 +1,104 @@
 from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
 
-# Create your models here.
+
+class QuestionBankTopic(models.Model):
+    """A quiz topic the bank keeps stocked, with its refill marks and counters."""
+    subject = models.CharField(max_length=32)
+    topic = models.CharField(max_length=128)
+    difficulty = models.CharField(max_length=16)
+    # Topics students ask for are recorded disabled; only enabled topics are refilled
+    enabled = models.BooleanField(default=True)
+    requested_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='requested_bank_topics')
+    # Set by quiz requests that found the stock low; the refill worker clears it
+    refill_requested_at = models.DateTimeField(null=True, blank=True)
+    # Refill starts below low_water and stops at target
+    low_water = models.PositiveIntegerField(default=20)  # type: ignore[arg-type]
+    target = models.PositiveIntegerField(default=60)  # type: ignore[arg-type]
+    served = models.PositiveIntegerField(default=0)  # type: ignore[arg-type]
+    generated = models.PositiveIntegerField(default=0)  # type: ignore[arg-type]
+    refills = models.PositiveIntegerField(default=0)  # type: ignore[arg-type]
+    failed_refills = models.PositiveIntegerField(default=0)  # type: ignore[arg-type]
+    duplicates = models.PositiveIntegerField(default=0)  # type: ignore[arg-type]
+    misses = models.PositiveIntegerField(default=0)  # type: ignore[arg-type]
+    last_refill_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['subject', 'topic', 'difficulty'], name='uniq_question_bank_topic'),
+        ]
+
+    def __str__(self) -> str:
+        return f"QuestionBankTopic({self.topic}, {self.difficulty})"
+
+
+class QuestionBankItem(models.Model):
+    """One pre-generated question; consumed (deleted) when served."""
+    subject = models.CharField(max_length=32)
+    topic = models.CharField(max_length=128)
+    difficulty = models.CharField(max_length=16)
+    question = models.JSONField(default=dict)  # {q, a, correct, explanation}
+    signature = models.BinaryField(null=True, blank=True)  # MinHash of the stem, see ai/dedup.py
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subject', 'topic', 'difficulty']),
+        ]
+
+    def __str__(self) -> str:
+        return f"QuestionBankItem({self.topic}, {self.difficulty})"
+
+
+class SeenQuestion(models.Model):
+    """MinHash signature of a quiz question a student was served, written with the quiz."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seen_questions')
+    signature = models.BinaryField()  # see ai/dedup.py
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+        ]
+
+    def __str__(self) -> str:
+        return f"SeenQuestion({self.user.username}, {self.pk})"  # type: ignore[attr-defined]
+
+
+class ChatThread(models.Model):
+    """A saved AI chat; preview and message_count are kept up to date so listing never reads messages."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_threads')
+    title = models.CharField(max_length=200)
+    preview = models.CharField(max_length=64, blank=True)  # first user message, shortened
+    message_count = models.PositiveIntegerField(default=0)  # type: ignore[arg-type]
+    # Plain defaults (not auto_now) so migrated chats keep their original timestamps
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+        ]
+
+    def __str__(self) -> str:
+        return f"ChatThread({self.user.username}, {self.title})"  # type: ignore[attr-defined]
+
+
+class ChatMessage(models.Model):
+    """One turn of a chat; ``seq`` numbers the thread's messages from 0 and is the pagination key."""
+    thread = models.ForeignKey(ChatThread, on_delete=models.CASCADE, related_name='messages')
+    seq = models.PositiveIntegerField()
+    role = models.CharField(max_length=16)
+    content = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['thread', 'seq'], name='uniq_chat_message_seq'),
+        ]
+
+    def __str__(self) -> str:
+        return f"ChatMessage({self.thread_id}, {self.seq})"  # type: ignore[attr-defined]
@@ -0,0 +1,592 @@
+"""
+Shared OpenRouter client used by every AI view.
+
+One process-wide ``requests.Session`` keeps TLS connections to the provider
+alive between requests, so AI endpoints stop paying a fresh TCP+TLS handshake
+per call. Headers, the API key and timeouts are resolved here once instead of
+in each view.
+
+AI views are written as generators that ``yield Completion(...)`` wherever they
+need the provider. ``run_sync`` drives them with the pooled blocking client
+(regular DRF views); ``run_async`` drives the same code from async views and
+awaits the provider on an async HTTP client instead of holding a thread.
+
+Every upstream call passes through the shared circuit breaker and latency
+window in ``ai.health``: while the breaker is open calls fail fast with
+``CircuitOpen`` and views use their local fallbacks. Calls also take a slot of
+the process-wide upstream gate; when none frees up in time they fail with
+``ProviderBusy`` the same way. Streams keep their slot until closed.
+"""
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Generator, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from asgiref.sync import sync_to_async
+
+from . import cache as completion_cache
+from .health import breaker, latency, upstream, is_failure
+from .singleflight import AsyncSingleFlight, SingleFlight
+
+try:
+    import httpx
+except ImportError:  # optional: without httpx async views offload to threads
+    httpx = None
+
+
+DEFAULT_PROVIDER_URL = 'https://openrouter.ai/api/v1/chat/completions'
+DEFAULT_MODEL = 'deepseek/deepseek-chat'
+
+# Seconds to wait for the TCP/TLS connection; read timeouts are passed per call.
+CONNECT_TIMEOUT = float(os.getenv('AI_CONNECT_TIMEOUT', '3.05'))
+DEFAULT_READ_TIMEOUT = float(os.getenv('AI_READ_TIMEOUT', '15'))
+# How long a resolved API key is reused before re-reading env/key files.
+KEY_CACHE_SECONDS = float(os.getenv('AI_KEY_CACHE_SECONDS', '300'))
+POOL_SIZE = int(os.getenv('AI_POOL_SIZE', '20'))
+
+
+def _flight_wait(timeout: Optional[float]) -> float:
+    # Longest a coalesced caller may wait: connect + read, twice for the 402 retry.
+    return 2 * (CONNECT_TIMEOUT + (timeout or DEFAULT_READ_TIMEOUT))
+
+
+class ProviderError(Exception):
+    """Base error for failed provider calls."""
+
+
+class ProviderTimeout(ProviderError):
+    pass
+
+
+class ProviderConnectionError(ProviderError):
+    pass
+
+
+class CircuitOpen(ProviderError):
+    """The provider is failing; the call was rejected without going upstream."""
+
+
+class ProviderBusy(CircuitOpen):
+    """Every upstream slot stayed taken; the call was rejected without going upstream."""
+
+
+def _admit() -> float:
+    if not breaker.allow():
+        upstream.release()
+        raise CircuitOpen(f'AI provider circuit open, retry in {breaker.retry_after():.0f}s')
+    return time.monotonic()
+
+
+def _start_call() -> float:
+    if not upstream.acquire():
+        raise ProviderBusy(f'AI provider busy ({upstream.limit} calls in flight)')
+    return _admit()
+
+
+async def _astart_call() -> float:
+    # Waiting for a slot blocks, so only a full gate costs a thread
+    if not (upstream.try_acquire() or await sync_to_async(upstream.acquire, thread_sensitive=False)()):
+        raise ProviderBusy(f'AI provider busy ({upstream.limit} calls in flight)')
+    return _admit()
+
+
+def _release_on_close(close):
+    state = { 'held': True }
+
+    def wrapped():
+        try:
+            return close()
+        finally:
+            if state.pop('held', False):
+                upstream.release()
+    return wrapped
+
+
+def _arelease_on_close(close):
+    state = { 'held': True }
+
+    async def wrapped():
+        try:
+            return await close()
+        finally:
+            if state.pop('held', False):
+                upstream.release()
+    return wrapped
+
+
+def _finish_call(endpoint: Optional[str], started: float, status_code: int = 0,
+                 error: Optional[ProviderError] = None, release: bool = True) -> None:
+    """Feed the outcome of one upstream call to the breaker and the latency window, freeing its slot."""
+    if release:
+        upstream.release()
+    if error is not None or is_failure(status_code):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    # Timeouts count as samples too, so a slowing provider raises its own timeout.
+    if endpoint and (isinstance(error, ProviderTimeout) or (error is None and 200 <= status_code < 400)):
+        latency.record(endpoint, time.monotonic() - started)
+
+
+def _translate_requests_error(e: Exception) -> ProviderError:
+    if isinstance(e, requests.exceptions.Timeout):
+        return ProviderTimeout(str(e))
+    if isinstance(e, requests.exceptions.ConnectionError):
+        return ProviderConnectionError(str(e))
+    return ProviderError(str(e))
+
+
+def _translate_httpx_error(e: Exception) -> ProviderError:
+    assert httpx is not None
+    if isinstance(e, httpx.TimeoutException):
+        return ProviderTimeout(str(e))
+    if isinstance(e, httpx.TransportError):
+        return ProviderConnectionError(str(e))
+    return ProviderError(str(e))
+
+
+def _get_ai_api_key() -> str | None:
+    # Some editors add a UTF-8 BOM (\ufeff) at the start of files/env values.
+    # Requests encodes HTTP headers as latin-1; a BOM in the key breaks header encoding.
+    def _sanitize(value: str | None) -> str | None:
+        if value is None:
+            return None
+        # Strip BOM and whitespace/newlines
+        return value.lstrip('\ufeff').strip()
+
+    key = _sanitize(os.getenv('OPENROUTER_API_KEY') or os.getenv('OPENAI_API_KEY'))
+    if key:
+        return key
+    try:
+        ai_dir = Path(__file__).resolve().parent
+        ai_key_path = ai_dir / 'openrouter.key'
+        if ai_key_path.exists():
+            return _sanitize(ai_key_path.read_text(encoding='utf-8'))
+        backend_dir = ai_dir.parent
+        backend_key_path = backend_dir / 'openrouter.key'
+        if backend_key_path.exists():
+            return _sanitize(backend_key_path.read_text(encoding='utf-8'))
+    except Exception:
+        pass
+    return None
+
+
+class ProviderResponse:
+    """Plain, picklable result of a chat completion call."""
+
+    def __init__(self, status_code: int, data: Optional[Dict[str, Any]] = None, text: str = ''):
+        self.status_code = status_code
+        self.data = data or {}
+        self.text = text
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 400
+
+    def json(self) -> Dict[str, Any]:
+        return self.data
+
+    @property
+    def content(self) -> str:
+        """Text of the first choice, or '' when the provider returned none."""
+        return (self.data.get('choices') or [{}])[0].get('message', {}).get('content') or ''
+
+
+def parse_stream_line(line: str) -> Optional[str]:
+    """
+    Content delta from one line of the provider's SSE stream, or None for
+    keep-alive comments, empty lines, role-only chunks and ``data: [DONE]``.
+    """
+    if not line or not line.startswith('data:'):
+        return None
+    data = line[5:].strip()
+    if data == '[DONE]':
+        return None
+    try:
+        chunk = json.loads(data)
+    except ValueError:
+        return None
+    return (chunk.get('choices') or [{}])[0].get('delta', {}).get('content') or None
+
+
+class ProviderStream:
+    """
+    An open streaming completion. ``status_code``/``ok``/``text`` are known as
+    soon as the provider answers; iterate to receive content deltas. Always close.
+    """
+
+    def __init__(self, status_code: int, lines=None, text: str = '', close=None):
+        self.status_code = status_code
+        self.text = text
+        self._lines = lines or ()
+        self._close = close
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 400
+
+    def __iter__(self):
+        for line in self._lines:
+            delta = parse_stream_line(line)
+            if delta:
+                yield delta
+
+    async def __aiter__(self):
+        async for line in self._lines:
+            delta = parse_stream_line(line)
+            if delta:
+                yield delta
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+
+    async def aclose(self):
+        if self._close is not None:
+            await self._close()
+
+
+class OpenRouterClient:
+    """Pooled, thread-safe chat completion client."""
+
+    def __init__(self, provider_url: Optional[str] = None, pool_size: int = POOL_SIZE):
+        self.provider_url = provider_url or os.getenv('OPENROUTER_URL', DEFAULT_PROVIDER_URL)
+        self.default_model = os.getenv('OPENROUTER_MODEL', DEFAULT_MODEL)
+        self._key_lock = threading.Lock()
+        self._api_key: str | None = None
+        self._key_loaded_at = 0.0
+        self._flights = SingleFlight()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
+            'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
+        })
+
+    @property
+    def api_key(self) -> str | None:
+        now = time.monotonic()
+        if now - self._key_loaded_at > KEY_CACHE_SECONDS:
+            with self._key_lock:
+                if now - self._key_loaded_at > KEY_CACHE_SECONDS:
+                    self._api_key = _get_ai_api_key()
+                    self._key_loaded_at = now
+        return self._api_key
+
+    def refresh_key(self) -> None:
+        with self._key_lock:
+            self._key_loaded_at = 0.0
+
+    def build_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return { 'model': self.default_model, **payload }
+
+    def chat_completion(self, payload: Dict[str, Any], timeout: Optional[float] = None,
+                        retry_max_tokens: Optional[int] = None, endpoint: Optional[str] = None) -> ProviderResponse:
+        """
+        POST a chat completion. On 402 (insufficient credits for max_tokens) retry
+        once with a smaller ``max_tokens`` (``retry_max_tokens`` or half, min 150).
+        Responses are served from / stored in the completion cache when
+        ``endpoint`` is opted in (see ``ai.cache``), and concurrent identical
+        calls share one upstream request (see ``ai.singleflight``).
+        """
+        body = self.build_payload(payload)
+        cached = completion_cache.lookup(endpoint, body)
+        if cached is not None:
+            return ProviderResponse(200, cached)
+        timeout = latency.timeout_for(endpoint, timeout or DEFAULT_READ_TIMEOUT)
+
+        def call() -> ProviderResponse:
+            resp = self._post(body, timeout, endpoint)
+            if resp.status_code == 402 and body.get('max_tokens'):
+                smaller = retry_max_tokens or max(150, int(body['max_tokens']) // 2)
+                resp = self._post({ **body, 'max_tokens': smaller }, timeout, endpoint)
+            if resp.ok:
+                completion_cache.store(endpoint, body, resp.data)
+            return resp
+
+        return self._flights.do(completion_cache.cache_key(body), call, _flight_wait(timeout))
+
+    def _post(self, body: Dict[str, Any], timeout: Optional[float], endpoint: Optional[str] = None) -> ProviderResponse:
+        headers = { 'Authorization': f'Bearer {self.api_key}' }
+        started = _start_call()
+        try:
+            resp = self.session.post(
+                self.provider_url, json=body, headers=headers,
+                timeout=(CONNECT_TIMEOUT, timeout or DEFAULT_READ_TIMEOUT),
+            )
+        except requests.exceptions.RequestException as e:
+            error = _translate_requests_error(e)
+            _finish_call(endpoint, started, error=error)
+            raise error from e
+        _finish_call(endpoint, started, resp.status_code)
+        try:
+            data = resp.json() if resp.ok else {}
+        except ValueError:
+            data = {}
+        return ProviderResponse(resp.status_code, data, '' if resp.ok else resp.text)
+
+    def open_stream(self, payload: Dict[str, Any], timeout: Optional[float] = None,
+                    retry_max_tokens: Optional[int] = None) -> ProviderStream:
+        """Start a ``stream: true`` completion; same 402 handling as ``chat_completion``."""
+        body = { **self.build_payload(payload), 'stream': True }
+        stream = self._open_stream(body, timeout)
+        if stream.status_code == 402 and body.get('max_tokens'):
+            stream.close()
+            smaller = retry_max_tokens or max(150, int(body['max_tokens']) // 2)
+            stream = self._open_stream({ **body, 'max_tokens': smaller }, timeout)
+        return stream
+
+    def _open_stream(self, body: Dict[str, Any], timeout: Optional[float]) -> ProviderStream:
+        headers = { 'Authorization': f'Bearer {self.api_key}' }
+        started = _start_call()
+        try:
+            resp = self.session.post(
+                self.provider_url, json=body, headers=headers, stream=True,
+                timeout=(CONNECT_TIMEOUT, timeout or DEFAULT_READ_TIMEOUT),
+            )
+        except requests.exceptions.RequestException as e:
+            error = _translate_requests_error(e)
+            _finish_call(None, started, error=error)
+            raise error from e
+        # Time to first byte is not comparable with full completions; breaker only.
+        _finish_call(None, started, resp.status_code, release=not resp.ok)
+        if not resp.ok:
+            text = resp.text
+            resp.close()
+            return ProviderStream(resp.status_code, text=text)
+        resp.encoding = 'utf-8'
+        return ProviderStream(resp.status_code, lines=resp.iter_lines(decode_unicode=True),
+                              close=_release_on_close(resp.close))
+
+
+class AsyncOpenRouterClient:
+    """
+    Async counterpart of ``OpenRouterClient`` sharing its URL, model and key.
+    Uses ``httpx.AsyncClient`` when installed, otherwise runs the blocking
+    client in a worker thread so the event loop is never blocked.
+    """
+
+    def __init__(self, sync_client: OpenRouterClient, pool_size: int = POOL_SIZE * 10):
+        self.sync_client = sync_client
+        self._flights = AsyncSingleFlight()
+        self.http = None
+        if httpx is not None:
+            self.http = httpx.AsyncClient(
+                headers=dict(sync_client.session.headers),
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+
+    async def chat_completion(self, payload: Dict[str, Any], timeout: Optional[float] = None,
+                              retry_max_tokens: Optional[int] = None, endpoint: Optional[str] = None) -> ProviderResponse:
+        if self.http is None:
+            return await sync_to_async(self.sync_client.chat_completion, thread_sensitive=False)(
+                payload, timeout=timeout, retry_max_tokens=retry_max_tokens, endpoint=endpoint
+            )
+        body = self.sync_client.build_payload(payload)
+        cached = await completion_cache.alookup(endpoint, body)
+        if cached is not None:
+            return ProviderResponse(200, cached)
+        timeout = latency.timeout_for(endpoint, timeout or DEFAULT_READ_TIMEOUT)
+
+        async def call() -> ProviderResponse:
+            resp = await self._post(body, timeout, endpoint)
+            if resp.status_code == 402 and body.get('max_tokens'):
+                smaller = retry_max_tokens or max(150, int(body['max_tokens']) // 2)
+                resp = await self._post({ **body, 'max_tokens': smaller }, timeout, endpoint)
+            if resp.ok:
+                await completion_cache.astore(endpoint, body, resp.data)
+            return resp
+
+        return await self._flights.do(completion_cache.cache_key(body), call, _flight_wait(timeout))
+
+    async def _post(self, body: Dict[str, Any], timeout: Optional[float], endpoint: Optional[str] = None) -> ProviderResponse:
+        assert httpx is not None and self.http is not None
+        headers = { 'Authorization': f'Bearer {self.sync_client.api_key}' }
+        started = await _astart_call()
+        try:
+            resp = await self.http.post(
+                self.sync_client.provider_url, json=body, headers=headers,
+                timeout=httpx.Timeout(timeout or DEFAULT_READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            )
+        except httpx.HTTPError as e:
+            error = _translate_httpx_error(e)
+            _finish_call(endpoint, started, error=error)
+            raise error from e
+        _finish_call(endpoint, started, resp.status_code)
+        ok = resp.is_success or resp.is_redirect
+        try:
+            data = resp.json() if ok else {}
+        except ValueError:
+            data = {}
+        return ProviderResponse(resp.status_code, data, '' if ok else resp.text)
+
+    async def open_stream(self, payload: Dict[str, Any], timeout: Optional[float] = None,
+                          retry_max_tokens: Optional[int] = None) -> ProviderStream:
+        """Async ``OpenRouterClient.open_stream``; iterate the result with ``async for``."""
+        if self.http is None:
+            raise ProviderError('Async streaming requires httpx')
+        body = { **self.sync_client.build_payload(payload), 'stream': True }
+        stream = await self._open_stream(body, timeout)
+        if stream.status_code == 402 and body.get('max_tokens'):
+            await stream.aclose()
+            smaller = retry_max_tokens or max(150, int(body['max_tokens']) // 2)
+            stream = await self._open_stream({ **body, 'max_tokens': smaller }, timeout)
+        return stream
+
+    async def _open_stream(self, body: Dict[str, Any], timeout: Optional[float]) -> ProviderStream:
+        assert httpx is not None and self.http is not None
+        request = self.http.build_request(
+            'POST', self.sync_client.provider_url, json=body,
+            headers={ 'Authorization': f'Bearer {self.sync_client.api_key}' },
+            timeout=httpx.Timeout(timeout or DEFAULT_READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+        started = await _astart_call()
+        try:
+            resp = await self.http.send(request, stream=True)
+        except httpx.HTTPError as e:
+            error = _translate_httpx_error(e)
+            _finish_call(None, started, error=error)
+            raise error from e
+        _finish_call(None, started, resp.status_code, release=not resp.is_success)
+        if not resp.is_success:
+            text = (await resp.aread()).decode('utf-8', 'replace')
+            await resp.aclose()
+            return ProviderStream(resp.status_code, text=text)
+        return ProviderStream(resp.status_code, lines=resp.aiter_lines(), close=_arelease_on_close(resp.aclose))
+
+
+_client: Optional[OpenRouterClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OpenRouterClient:
+    """Process-wide client; created lazily so settings/env are loaded first."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenRouterClient()
+    return _client
+
+
+# httpx.AsyncClient is bound to the event loop it was first used on; keep one per loop.
+_async_clients: 'weakref.WeakKeyDictionary[Any, AsyncOpenRouterClient]' = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> AsyncOpenRouterClient:
+    import asyncio
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncOpenRouterClient(get_client())
+    return client
+
+
+@dataclass
+class Completion:
+    """A provider call requested by a view generator: ``resp = yield Completion(payload)``."""
+    payload: Dict[str, Any]
+    timeout: Optional[float] = None
+    retry_max_tokens: Optional[int] = None
+    # Endpoint name for per-endpoint features such as the completion cache.
+    endpoint: Optional[str] = None
+
+
+# A step is one Completion (the response is sent back, errors are thrown into the
+# generator) or a list of them, run concurrently; a list gets back a list holding
+# each response or, for failed calls, the exception instance.
+Steps = Generator[Union[Completion, List[Completion]], Any, Any]
+
+
+class _Finished:
+    def __init__(self, value: Any):
+        self.value = value
+
+
+def _advance(steps: Steps, result: Any = None, error: Optional[BaseException] = None):
+    # StopIteration cannot cross a thread/future boundary, so wrap the return value.
+    try:
+        return steps.throw(error) if error is not None else steps.send(result)
+    except StopIteration as stop:
+        return _Finished(stop.value)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _client_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix='ai-completion')
+    return _executor
+
+
+def _complete(client: OpenRouterClient, step: Completion):
+    return client.chat_completion(
+        step.payload, timeout=step.timeout, retry_max_tokens=step.retry_max_tokens, endpoint=step.endpoint
+    )
+
+
+def _complete_or_error(client: OpenRouterClient, step: Completion):
+    try:
+        return _complete(client, step)
+    except Exception as e:
+        return e
+
+
+def run_sync(steps: Steps):
+    """Drive a view generator with the blocking pooled client; returns its return value."""
+    client = get_client()
+    step = _advance(steps)
+    while not isinstance(step, _Finished):
+        if isinstance(step, list):
+            step = _advance(steps, list(_get_executor().map(lambda c: _complete_or_error(client, c), step)))
+            continue
+        try:
+            result = _complete(client, step)
+        except Exception as e:
+            step = _advance(steps, error=e)
+        else:
+            step = _advance(steps, result)
+    return step.value
+
+
+async def run_async(steps: Steps):
+    """
+    Drive a view generator from async code. The view's own (sync, possibly ORM)
+    code between yields runs via ``sync_to_async``; provider calls are awaited.
+    """
+    import asyncio
+    client = get_async_client()
+    advance = sync_to_async(_advance)
+    step = await advance(steps)
+    while not isinstance(step, _Finished):
+        if isinstance(step, list):
+            results = await asyncio.gather(*(
+                client.chat_completion(c.payload, timeout=c.timeout, retry_max_tokens=c.retry_max_tokens, endpoint=c.endpoint)
+                for c in step
+            ), return_exceptions=True)
+            step = await advance(steps, list(results))
+            continue
+        try:
+            result = await client.chat_completion(
+                step.payload, timeout=step.timeout, retry_max_tokens=step.retry_max_tokens, endpoint=step.endpoint
+            )
+        except Exception as e:
+            step = await advance(steps, error=e)
+        else:
+            step = await advance(steps, result)
+    return step.value
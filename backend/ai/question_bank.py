@@ -0,0 +1,307 @@
+"""
+Pre-generated quiz question bank.
+
+Quiz requests take questions from stock (``QuestionBankItem``, indexed by
+subject/topic/difficulty) and only ask the provider synchronously for what the
+bank cannot cover. Stocked topics (``QuestionBankTopic``) are registered by an
+admin or the ``refill_question_bank`` command. A quiz request only marks a
+registered topic whose stock is below ``low_water`` (``refill_requested_at``);
+the ``refill_question_bank`` worker refills marked topics first, up to
+``target`` in small batches. A topic nobody registered is recorded disabled, as
+a suggestion for the admin, and each student can leave at most
+``USER_TOPIC_LIMIT`` of those; disabled topics are never refilled.
+
+Near-duplicate stems (``ai.dedup``) are rejected when refilling, and questions
+a student has already been served (``SeenQuestion``) are skipped when taking
+from stock.
+"""
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .dedup import MinHashIndex, Signature, from_bytes, signature, to_bytes
+from .models import QuestionBankItem, QuestionBankTopic, SeenQuestion
+from .provider import CircuitOpen, ProviderError, get_client
+
+LOW_WATER = int(os.getenv('QUIZ_BANK_LOW_WATER', '20'))
+TARGET = int(os.getenv('QUIZ_BANK_TARGET', '60'))
+# Questions per refill completion; small batches rarely hit max_tokens.
+BATCH_SIZE = int(os.getenv('QUIZ_BANK_BATCH', '5'))
+BATCH_MAX_TOKENS = int(os.getenv('QUIZ_BANK_MAX_TOKENS', '1200'))
+MAX_FAILED_BATCHES = 3
+# Disabled topic suggestions a student's quiz requests may leave for the admin.
+USER_TOPIC_LIMIT = int(os.getenv('QUIZ_BANK_USER_TOPICS', '5'))
+# How many of a student's latest questions count as already seen.
+SEEN_MAX_QUESTIONS = int(os.getenv('QUIZ_SEEN_MAX_QUESTIONS', '2000'))
+# Students whose built seen-question index each process keeps (least recently used go first).
+SEEN_CACHE_USERS = int(os.getenv('QUIZ_SEEN_CACHE_USERS', '32'))
+
+SUBJECTS = ('matematik', 'fizik', 'kimya', 'biyoloji')
+
+
+def normalize_difficulty(difficulty: str) -> str:
+    level = (difficulty or 'orta').lower()
+    return 'kolay' if level.startswith('ko') else 'zor' if level.startswith('z') else 'orta'
+
+
+def topic_key(topics: str) -> Tuple[str, str]:
+    """(subject, topic) for a free-text topic string; equal topics share a bank."""
+    topic = ' '.join(str(topics or '').casefold().split())[:128]
+    subject = next((s for s in SUBJECTS if s in topic), 'genel')
+    return subject, topic
+
+
+def bank_key(topics: str, difficulty: str) -> Dict[str, str]:
+    subject, topic = topic_key(topics)
+    return { 'subject': subject, 'topic': topic, 'difficulty': normalize_difficulty(difficulty) }
+
+
+def _item(key: Dict[str, str], question: Dict[str, Any]) -> QuestionBankItem:
+    return QuestionBankItem(**key, question=question, signature=to_bytes(signature(question.get('q', ''))))
+
+
+def _item_signature(item: QuestionBankItem):
+    return from_bytes(item.signature) if item.signature else signature(item.question.get('q', ''))
+
+
+def register(topics: str, difficulty: str) -> QuestionBankTopic:
+    """Stock ``topics`` (admin/command only); enables it if students had suggested it."""
+    entry, created = QuestionBankTopic.objects.get_or_create(  # type: ignore[attr-defined]
+        **bank_key(topics, difficulty), defaults={ 'low_water': LOW_WATER, 'target': TARGET }
+    )
+    if not created and not entry.enabled:
+        entry.enabled = True
+        entry.save(update_fields=['enabled'])
+    return entry
+
+
+def stock(entry: QuestionBankTopic) -> int:
+    return QuestionBankItem.objects.filter(  # type: ignore[attr-defined]
+        subject=entry.subject, topic=entry.topic, difficulty=entry.difficulty
+    ).count()
+
+
+def take(topics: str, difficulty: str, count: int, exclude: Optional[MinHashIndex] = None,
+         picked: Optional[MinHashIndex] = None) -> List[Dict[str, Any]]:
+    """
+    Remove and return up to ``count`` stocked questions (oldest first), skipping
+    near-duplicates of each other and of ``exclude`` (e.g. the student's seen
+    questions); skipped questions stay in stock. The stored signatures of the
+    returned questions are added to ``picked`` under their list positions.
+    """
+    key = bank_key(topics, difficulty)
+    with transaction.atomic():
+        qs = QuestionBankItem.objects.filter(**key).order_by('id')  # type: ignore[attr-defined]
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        items, signatures = [], []
+        chosen = MinHashIndex()
+        for item in qs[:count * 3]:
+            sig = _item_signature(item)
+            if chosen.is_duplicate(sig) or (exclude is not None and exclude.is_duplicate(sig)):
+                continue
+            chosen.add(item.id, sig)
+            items.append(item)
+            signatures.append(sig)
+            if len(items) >= count:
+                break
+        if items:
+            QuestionBankItem.objects.filter(id__in=[item.id for item in items]).delete()  # type: ignore[attr-defined]
+    QuestionBankTopic.objects.filter(**key).update(  # type: ignore[attr-defined]
+        served=F('served') + len(items),
+        misses=F('misses') + (1 if len(items) < count else 0),
+    )
+    if picked is not None:
+        for i, sig in enumerate(signatures):
+            picked.add(i, sig)
+    return [item.question for item in items]
+
+
+def put_back(topics: str, difficulty: str, questions: List[Dict[str, Any]]) -> None:
+    """Return taken questions that were not served (e.g. the quiz could not be completed)."""
+    if not questions:
+        return
+    key = bank_key(topics, difficulty)
+    QuestionBankItem.objects.bulk_create([_item(key, q) for q in questions])  # type: ignore[attr-defined]
+    QuestionBankTopic.objects.filter(**key).update(served=F('served') - len(questions))  # type: ignore[attr-defined]
+
+
+def generate_batch(entry: QuestionBankTopic, count: int) -> List[Dict[str, Any]]:
+    # Prompt and parser are shared with the synchronous quiz path
+    from .views import AIQuizGenerateView
+    view = AIQuizGenerateView()
+    prompt = view._create_topic_specific_prompt(
+        entry.topic, entry.difficulty, count, uuid.uuid4().hex[:12], datetime.now().strftime('%Y%m%d%H%M%S')
+    )
+    payload = {
+        'messages': [ { 'role': 'user', 'content': prompt } ],
+        'response_format': { 'type': 'json_object' },
+        'temperature': 0.7,
+        'max_tokens': BATCH_MAX_TOKENS,
+        'top_p': 0.9,
+    }
+    resp = get_client().chat_completion(payload, timeout=30, endpoint='quiz_bank')
+    if not resp.ok:
+        raise ProviderError(f'HTTP {resp.status_code}: {resp.text[:120]}')
+    return view._parse_ai_response(resp.json(), count)
+
+
+def refill(entry: QuestionBankTopic) -> int:
+    """Generate questions until ``entry`` reaches its target; returns how many were added."""
+    key = { 'subject': entry.subject, 'topic': entry.topic, 'difficulty': entry.difficulty }
+    added = 0
+    duplicates = 0
+    failures = 0
+    error = ''
+    index = MinHashIndex()
+    for item in QuestionBankItem.objects.filter(**key).only('id', 'question', 'signature'):  # type: ignore[attr-defined]
+        index.add(item.id, _item_signature(item))
+    current = len(index)
+    while current < entry.target and failures < MAX_FAILED_BATCHES:
+        try:
+            questions = generate_batch(entry, min(BATCH_SIZE, entry.target - current))
+        except CircuitOpen as e:
+            error = str(e)
+            break
+        except Exception as e:
+            error = str(e)
+            failures += 1
+            continue
+        items = []
+        for q in questions:
+            item = _item(key, q)
+            sig = from_bytes(item.signature)
+            if index.is_duplicate(sig):
+                duplicates += 1
+                continue
+            index.add(('new', added + len(items)), sig)
+            items.append(item)
+        if not items:
+            error = 'Geçerli soru üretilemedi' if not questions else 'Sadece tekrar eden sorular üretildi'
+            failures += 1
+            continue
+        QuestionBankItem.objects.bulk_create(items)  # type: ignore[attr-defined]
+        added += len(items)
+        current += len(items)
+
+    QuestionBankTopic.objects.filter(pk=entry.pk).update(  # type: ignore[attr-defined]
+        generated=F('generated') + added,
+        refills=F('refills') + (1 if added else 0),
+        duplicates=F('duplicates') + duplicates,
+        failed_refills=F('failed_refills') + (0 if added else 1),
+        last_refill_at=timezone.now(),
+        last_error=error[:255],
+        refill_requested_at=None,
+    )
+    print(f"Question bank refill {entry.topic}/{entry.difficulty}: +{added} (stock {current}/{entry.target})")
+    return added
+
+
+_seen: 'OrderedDict[int, Tuple[int, MinHashIndex]]' = OrderedDict()  # user id -> (last row id, index)
+_seen_lock = threading.Lock()
+
+
+def seen_index(user) -> MinHashIndex:
+    """
+    Index of the last SEEN_MAX_QUESTIONS questions ``user`` was served (empty for
+    anonymous users). Built indexes are cached per process, and each call only
+    loads the rows saved since, so questions served by other workers count too.
+    """
+    if user is None or not user.is_authenticated:
+        return MinHashIndex()
+    with _seen_lock:
+        cached = _seen.get(user.pk)
+        if cached is not None:
+            _seen.move_to_end(user.pk)
+    last_id, index = cached or (0, MinHashIndex())
+    rows = list(
+        SeenQuestion.objects.filter(user=user, id__gt=last_id)  # type: ignore[attr-defined]
+        .order_by('-id').values_list('id', 'signature')[:SEEN_MAX_QUESTIONS]
+    )
+    for pk, raw in reversed(rows):
+        index.add_bytes(pk, raw)
+    for pk in index.keys()[:max(len(index) - SEEN_MAX_QUESTIONS, 0)]:
+        index.remove(pk)
+    with _seen_lock:
+        _seen[user.pk] = (max(last_id, rows[0][0]) if rows else last_id, index)
+        while len(_seen) > SEEN_CACHE_USERS:
+            _seen.popitem(last=False)
+    return index
+
+
+def remember_seen(user, signatures: List[Optional[Signature]]) -> None:
+    """Record the signatures of the questions ``user`` was just served, keeping the latest SEEN_MAX_QUESTIONS."""
+    if user is None or not user.is_authenticated:
+        return
+    served = [SeenQuestion(user=user, signature=to_bytes(sig)) for sig in signatures if sig is not None]
+    if not served:
+        return
+    SeenQuestion.objects.bulk_create(served)  # type: ignore[attr-defined]
+    rows = SeenQuestion.objects.filter(user=user)  # type: ignore[attr-defined]
+    cutoff = list(rows.order_by('-id').values_list('id', flat=True)[SEEN_MAX_QUESTIONS:SEEN_MAX_QUESTIONS + 1])
+    if cutoff:
+        rows.filter(id__lte=cutoff[0]).delete()
+
+
+def request_refill(topics: str, difficulty: str, user=None) -> bool:
+    """
+    Called after a quiz took from stock: mark the topic for the refill worker
+    if it is registered and below its low-water mark. An unregistered topic is
+    recorded disabled for the admin, up to USER_TOPIC_LIMIT per student.
+    Returns whether the topic was newly marked.
+    """
+    key = bank_key(topics, difficulty)
+    entry = QuestionBankTopic.objects.filter(**key).first()  # type: ignore[attr-defined]
+    if entry is None:
+        _suggest(key, user)
+        return False
+    if not entry.enabled or entry.refill_requested_at is not None or stock(entry) >= entry.low_water:
+        return False
+    return bool(QuestionBankTopic.objects.filter(pk=entry.pk, refill_requested_at__isnull=True).update(  # type: ignore[attr-defined]
+        refill_requested_at=timezone.now(),
+    ))
+
+
+def _suggest(key: Dict[str, str], user) -> None:
+    if user is None or not user.is_authenticated or not key['topic']:
+        return
+    if QuestionBankTopic.objects.filter(requested_by=user, enabled=False).count() >= USER_TOPIC_LIMIT:  # type: ignore[attr-defined]
+        return
+    QuestionBankTopic.objects.get_or_create(  # type: ignore[attr-defined]
+        **key, defaults={ 'low_water': LOW_WATER, 'target': TARGET, 'enabled': False, 'requested_by': user }
+    )
+
+
+def stats() -> List[Dict[str, Any]]:
+    counts = {
+        (row['subject'], row['topic'], row['difficulty']): row['n']
+        for row in QuestionBankItem.objects.values('subject', 'topic', 'difficulty').annotate(n=Count('id'))  # type: ignore[attr-defined]
+    }
+    return [
+        {
+            'subject': t.subject,
+            'topic': t.topic,
+            'difficulty': t.difficulty,
+            'enabled': t.enabled,
+            'refill_requested_at': t.refill_requested_at.isoformat() if t.refill_requested_at else None,
+            'stock': counts.get((t.subject, t.topic, t.difficulty), 0),
+            'low_water': t.low_water,
+            'target': t.target,
+            'served': t.served,
+            'misses': t.misses,
+            'generated': t.generated,
+            'refills': t.refills,
+            'failed_refills': t.failed_refills,
+            'duplicates': t.duplicates,
+            'last_refill_at': t.last_refill_at.isoformat() if t.last_refill_at else None,
+            'last_error': t.last_error,
+        }
+        for t in QuestionBankTopic.objects.order_by('subject', 'topic', 'difficulty')  # type: ignore[attr-defined]
+    ]
@@ -0,0 +1,116 @@
+"""
+Batch study-schedule planning for many students at once.
+
+Identical inputs (same subjects, grid, weak topics and mode) are planned once
+and the result is shared. Unique inputs run on a process pool, since planning
+is pure CPU work in ``ai.scheduler``; small batches run inline, where pool
+overhead would dominate.
+
+Config (env):
+- SCHEDULE_BATCH_WORKERS: pool size (default: CPU count)
+- SCHEDULE_BATCH_INLINE_BELOW: plan inline below this many unique inputs (default 8)
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import scheduler
+
+POOL_SIZE = int(os.getenv('SCHEDULE_BATCH_WORKERS', str(os.cpu_count() or 1)))
+INLINE_BELOW = int(os.getenv('SCHEDULE_BATCH_INLINE_BELOW', '8'))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+Job = Tuple[Dict[str, Any], Sequence[str]]  # (request body, weak topics)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=POOL_SIZE)
+    return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def entry_error(body: Dict[str, Any]) -> Optional[str]:
+    """Why one student's entry cannot be planned (wrong field types or unknown states), or None."""
+    subjects = body.get('subjects')
+    if subjects is not None and (
+        not isinstance(subjects, list)
+        or any(not isinstance(s, dict) or not isinstance(s.get('name') or '', str) for s in subjects)
+    ):
+        return 'subjects [{name, hours}] listesi olmalı'
+    if not isinstance(body.get('courses') or '', str):
+        return 'courses metin olmalı'
+    for field in ('cell_states', 'day_states'):
+        states = body.get(field) or {}
+        if not isinstance(states, dict):
+            return f'{field} nesne olmalı'
+        bad = [k for k, v in states.items() if v and v not in scheduler.STATES]
+        if bad:
+            return f'Geçersiz durum ({field}): {", ".join(map(str, bad[:5]))}'
+    days = body.get('available_days')
+    if days is not None and (not isinstance(days, list) or not all(isinstance(d, str) for d in days)):
+        return 'available_days gün listesi olmalı'
+    return None
+
+
+def normalize(body: Dict[str, Any], mode: str) -> Dict[str, Any]:
+    """The parts of a request body that decide its schedule, in canonical form."""
+    subjects = scheduler.parse_subjects(body.get('subjects'), (body.get('courses') or '').strip())
+    return {
+        'subjects': [{ 'name': name, 'hours': hours } for name, hours in subjects],
+        'cell_states': { k: v for k, v in (body.get('cell_states') or {}).items() if v },
+        'day_states': { k: v for k, v in (body.get('day_states') or {}).items() if v },
+        'available_days': list(body.get('available_days') or scheduler.DEFAULT_DAYS),
+        'mode': mode,
+    }
+
+
+def input_key(body: Dict[str, Any], weak_topics: Sequence[str]) -> str:
+    raw = json.dumps([body, list(weak_topics)], sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _plan(job: Job) -> Dict[str, Any]:
+    body, weak_topics = job
+    return scheduler.plan_request(body, weak_topics)
+
+
+def plan_many(jobs: Sequence[Job], mode: str = 'optimal') -> Tuple[List[Dict[str, Any]], int]:
+    """Response payloads for ``jobs`` in order, and how many unique inputs were planned."""
+    keys: List[str] = []
+    unique: Dict[str, Job] = {}
+    for body, weak in jobs:
+        normalized = normalize(body, mode)
+        key = input_key(normalized, weak)
+        keys.append(key)
+        unique.setdefault(key, (normalized, list(weak)))
+
+    order = list(unique)
+    todo = [unique[k] for k in order]
+    if len(todo) < INLINE_BELOW or POOL_SIZE <= 1:
+        planned = [_plan(job) for job in todo]
+    else:
+        try:
+            planned = list(_get_pool().map(_plan, todo, chunksize=max(1, len(todo) // (POOL_SIZE * 4))))
+        except BrokenProcessPool:
+            print("Schedule batch pool broke; planning inline")
+            _reset_pool()
+            planned = [_plan(job) for job in todo]
+    by_key = dict(zip(order, planned))
+    return [by_key[k] for k in keys], len(order)
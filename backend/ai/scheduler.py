@@ -0,0 +1,565 @@
+"""
+Local study scheduler on a 7 x 14 bitmask.
+
+Availability is one int per day per priority (bit ``h - 8`` set when hour
+``h`` is free), and occupancy is one int per day. Free slots are
+``mask & ~used``; free 2-hour blocks are ``free & (free >> 1)``, and the
+earliest one is its lowest set bit. Placing a session is an OR, so a week
+is scheduled in O(hours x days) bit operations.
+
+Placement rules:
+- Green hours are used first, then yellow; red is never used.
+- Weak-topic subjects go first, then subjects with more hours.
+- Each subject gets 2-hour blocks, plus a single hour when its count is odd.
+- A subject prefers days it has not been placed on yet.
+
+The module is stateless: every function works on its arguments only, so the
+view, thread-pooled workers and management commands can all call it.
+``plan_request`` turns a schedule request body into the response payload.
+
+``schedule_week`` is the greedy pass described above. ``solve_week`` is the
+optimal mode: it minimises colour and spreading cost over the whole week
+(min-cost flow) and lays each day out in 2-hour blocks (exact DP), so it does
+not strand hours behind an early greedy choice.
+"""
+import heapq
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DAYS = ['Pzt', 'Sal', 'Çar', 'Per', 'Cum', 'Cmt', 'Paz']
+DEFAULT_DAYS = DAYS[:5]
+FIRST_HOUR = 8
+LAST_HOUR = 21  # last slot starts 21:00
+HOURS = list(range(FIRST_HOUR, LAST_HOUR + 1))
+PRIORITIES = ('green', 'yellow')
+STATES = ('green', 'yellow', 'red')
+
+Masks = Dict[str, List[int]]
+
+
+def default_state(hour: int) -> str:
+    """Availability of a cell the student did not mark (same defaults as the grid)."""
+    if 9 <= hour <= 17:
+        return 'green' if hour in (9, 10, 14, 15) else 'yellow'
+    return 'red'
+
+
+def availability_masks(cell_states: Dict[str, str], day_states: Dict[str, str], available_days: Iterable[str]) -> Masks:
+    """Per-priority day masks from the grid: cell state, else day state, else the default."""
+    masks: Masks = { state: [0] * len(DAYS) for state in STATES }
+    for day in available_days:
+        if day not in DAYS:
+            continue
+        d = DAYS.index(day)
+        for hour in HOURS:
+            state = cell_states.get(f"{day}-{hour}") or day_states.get(day) or default_state(hour)
+            if state in masks:
+                masks[state][d] |= 1 << (hour - FIRST_HOUR)
+    return masks
+
+
+def _lowest_bit_index(value: int) -> int:
+    return (value & -value).bit_length() - 1
+
+
+def _fmt(hour: int) -> str:
+    return f"{str(hour).zfill(2)}:00"
+
+
+@dataclass
+class ScheduleResult:
+    schedule: List[Dict[str, Any]]
+    hours_needed: int
+    hours_scheduled: int
+    unplaced: Dict[str, int] = field(default_factory=dict)
+    mode: str = 'greedy'
+
+
+def _pick_day(candidates: Sequence[int], on_days: int) -> Optional[int]:
+    # candidates[d] is the usable bit pattern on day d; days without the subject first
+    fallback = None
+    for d, bits in enumerate(candidates):
+        if not bits:
+            continue
+        if not on_days >> d & 1:
+            return d
+        if fallback is None:
+            fallback = d
+    return fallback
+
+
+def schedule_week(subjects: Sequence[Tuple[str, int]], masks: Masks,
+                  weak_topics: Sequence[str] = ()) -> ScheduleResult:
+    """Place ``(name, hours)`` subjects into the green/yellow slots of ``masks``."""
+    weak = [w.lower() for w in weak_topics if w]
+
+    def rank(subject: Tuple[str, int]):
+        name, hours = subject
+        return (1 if weak and any(w in name.lower() for w in weak) else 2, -hours)
+
+    used = [0] * len(DAYS)
+    sessions: List[List[Tuple[int, int, str]]] = [[] for _ in DAYS]
+    unplaced: Dict[str, int] = {}
+    needed = 0
+    scheduled = 0
+
+    for name, hours in sorted(subjects, key=rank):
+        needed += hours
+        remaining = hours
+        on_days = 0
+        blocks = hours // 2
+        for priority in PRIORITIES:
+            day_masks = masks.get(priority) or [0] * len(DAYS)
+            while blocks:
+                pairs = [(m & ~u) & ((m & ~u) >> 1) for m, u in zip(day_masks, used)]
+                d = _pick_day(pairs, on_days)
+                if d is None:
+                    break
+                start = _lowest_bit_index(pairs[d])
+                used[d] |= 0b11 << start
+                on_days |= 1 << d
+                sessions[d].append((start + FIRST_HOUR, start + FIRST_HOUR + 2, name))
+                blocks -= 1
+                remaining -= 2
+        # Odd hour, plus any blocks that found no consecutive pair, as single hours
+        for priority in PRIORITIES:
+            day_masks = masks.get(priority) or [0] * len(DAYS)
+            while remaining:
+                free = [m & ~u for m, u in zip(day_masks, used)]
+                d = _pick_day(free, on_days)
+                if d is None:
+                    break
+                start = _lowest_bit_index(free[d])
+                used[d] |= 1 << start
+                on_days |= 1 << d
+                sessions[d].append((start + FIRST_HOUR, start + FIRST_HOUR + 1, name))
+                remaining -= 1
+        scheduled += hours - remaining
+        if remaining:
+            unplaced[name] = unplaced.get(name, 0) + remaining
+
+    return ScheduleResult(schedule=_render(sessions), hours_needed=needed, hours_scheduled=scheduled, unplaced=unplaced)
+
+
+def _render(sessions: List[List[Tuple[int, int, str]]]) -> List[Dict[str, Any]]:
+    schedule = []
+    for d, day in enumerate(DAYS):
+        day_sessions = sorted(sessions[d])
+        items = [f"{name} {_fmt(start)}-{_fmt(end)}" for start, end, name in day_sessions]
+        if len(day_sessions) > 3:
+            # A short break before the 4th session of the day
+            break_hour = max(12, day_sessions[3][0] - 1)
+            items.insert(3, f"🟡 Mola (15 dk) {str(break_hour).zfill(2)}:30-{str(break_hour).zfill(2)}:45")
+        schedule.append({ 'day': day, 'items': items })
+    return schedule
+
+
+# --- Optimal mode -----------------------------------------------------------
+#
+# Costs are per hour, lower is better. Weak-topic subjects pay more for yellow
+# hours, so they get the green ones when green runs short. A subject's first
+# two hours on a day are free of spread cost; every further pair on the same
+# day costs SPREAD_COST per hour. A block that cannot be laid out as two
+# consecutive hours costs SPLIT_COST (less than one yellow hour, as in the
+# greedy mode: green singles beat yellow blocks).
+GREEN_COST = 0
+YELLOW_COST = 10
+WEAK_FACTOR = 2
+SPREAD_COST = 4
+SPLIT_COST = 3
+_COLOR_COST = { 'green': GREEN_COST, 'yellow': YELLOW_COST }
+_INF = float('inf')
+
+
+class _FlowGraph:
+    """Min-cost max-flow by successive shortest paths (Dijkstra with potentials)."""
+
+    def __init__(self, size: int):
+        # edge: [to, capacity, cost, index of the reverse edge]
+        self.edges: List[List[List[int]]] = [[] for _ in range(size)]
+
+    def add_edge(self, u: int, v: int, cap: int, cost: int) -> Tuple[int, int]:
+        self.edges[u].append([v, cap, cost, len(self.edges[v])])
+        self.edges[v].append([u, 0, -cost, len(self.edges[u]) - 1])
+        return u, len(self.edges[u]) - 1
+
+    def flow(self, ref: Tuple[int, int]) -> int:
+        u, i = ref
+        v, _, _, r = self.edges[u][i]
+        return self.edges[v][r][1]
+
+    def solve(self, source: int, sink: int) -> int:
+        size = len(self.edges)
+        potential = [0] * size  # all costs start non-negative
+        total = 0
+        while True:
+            dist = [_INF] * size
+            prev: List[Optional[Tuple[int, int]]] = [None] * size
+            dist[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                pu = potential[u]
+                for i, (v, cap, cost, _) in enumerate(self.edges[u]):
+                    if cap > 0:
+                        nd = d + cost + pu - potential[v]
+                        if nd < dist[v]:
+                            dist[v] = nd
+                            prev[v] = (u, i)
+                            heapq.heappush(heap, (nd, v))
+            if dist[sink] == _INF:
+                return total
+            for v in range(size):
+                if dist[v] < _INF:
+                    potential[v] += dist[v]
+            push = _INF
+            v = sink
+            while v != source:
+                u, i = prev[v]  # type: ignore[misc]
+                push = min(push, self.edges[u][i][1])
+                v = u
+            v = sink
+            while v != source:
+                u, i = prev[v]  # type: ignore[misc]
+                edge = self.edges[u][i]
+                edge[1] -= push
+                self.edges[v][edge[3]][1] += push
+                v = u
+            total += push
+
+
+def _bits(value: int) -> List[int]:
+    return [i for i in range(len(HOURS)) if value >> i & 1]
+
+
+def _layout_day(slot_cost: Dict[int, int], blocks: int, singles: int):
+    """Cheapest placement of ``blocks`` 2-hour and ``singles`` 1-hour sessions on one day.
+
+    Exact DP over the day's hours; a block may be split into two singles at
+    SPLIT_COST. Returns (block starts, single hours), each sorted cheapest first.
+    """
+    hours = len(HOURS)
+
+    @lru_cache(maxsize=None)
+    def best(pos: int, b: int, s: int):
+        if b == 0 and s == 0:
+            return 0, None
+        # On equal cost the first option wins: earliest hours, blocks before singles
+        options = []
+        if pos < hours:
+            if pos in slot_cost:
+                if b and pos + 1 in slot_cost:
+                    options.append((slot_cost[pos] + slot_cost[pos + 1] + best(pos + 2, b - 1, s)[0], 'block'))
+                if s:
+                    options.append((slot_cost[pos] + best(pos + 1, b, s - 1)[0], 'single'))
+            options.append((best(pos + 1, b, s)[0], 'skip'))
+        if b:
+            options.append((SPLIT_COST + best(pos, b - 1, s + 2)[0], 'split'))
+        return min(options, key=lambda o: o[0]) if options else (_INF, None)
+
+    starts: List[int] = []
+    singles_at: List[int] = []
+    pos, b, s = 0, blocks, singles
+    while b or s:
+        cost, move = best(pos, b, s)
+        if move is None or cost == _INF:
+            break
+        if move == 'split':
+            b, s = b - 1, s + 2
+        elif move == 'skip':
+            pos += 1
+        elif move == 'single':
+            singles_at.append(pos)
+            pos, s = pos + 1, s - 1
+        else:
+            starts.append(pos)
+            pos, b = pos + 2, b - 1
+    best.cache_clear()
+    starts.sort(key=lambda p: (slot_cost[p] + slot_cost[p + 1], p))
+    singles_at.sort(key=lambda p: (slot_cost[p], p))
+    return starts, singles_at
+
+
+def solve_week(subjects: Sequence[Tuple[str, int]], masks: Masks,
+               weak_topics: Sequence[str] = ()) -> ScheduleResult:
+    """Cost-optimal placement of ``(name, hours)`` subjects into the green/yellow slots of ``masks``.
+
+    Hours per subject and day come from a min-cost flow (colour cost, weak
+    subjects first, spread over days); each day is then laid out in 2-hour
+    blocks by an exact DP. Places every hour whenever the week has room.
+    """
+    weak = [w.lower() for w in weak_topics if w]
+    subjects = [(name, hours) for name, hours in subjects if hours > 0]
+    weights = [WEAK_FACTOR if weak and any(w in name.lower() for w in weak) else 1 for name, _ in subjects]
+    capacity = {
+        (d, color): bin((masks.get(color) or [0] * len(DAYS))[d]).count('1')
+        for d in range(len(DAYS)) for color in PRIORITIES
+    }
+    open_days = [d for d in range(len(DAYS)) if any(capacity[d, c] for c in PRIORITIES)]
+
+    # Nodes: source, subjects, (subject, day), (day, colour), sink
+    source = 0
+    subject_node = { i: 1 + i for i in range(len(subjects)) }
+    next_node = 1 + len(subjects)
+    pair_node: Dict[Tuple[int, int], int] = {}
+    for i in range(len(subjects)):
+        for d in open_days:
+            pair_node[i, d] = next_node
+            next_node += 1
+    slot_node: Dict[Tuple[int, str], int] = {}
+    for d in open_days:
+        for color in PRIORITIES:
+            slot_node[d, color] = next_node
+            next_node += 1
+    sink = next_node
+    graph = _FlowGraph(sink + 1)
+
+    # When the week is short, weak subjects keep their hours
+    supply = [graph.add_edge(source, subject_node[i], hours, 0 if weights[i] > 1 else 1)
+              for i, (_, hours) in enumerate(subjects)]
+    placed: Dict[Tuple[int, int, str], Tuple[int, int]] = {}
+    for i, (_, hours) in enumerate(subjects):
+        for d in open_days:
+            room = sum(capacity[d, c] for c in PRIORITIES)
+            for tier in range((min(hours, room) + 1) // 2):
+                graph.add_edge(subject_node[i], pair_node[i, d], 2, tier * SPREAD_COST)
+            for color in PRIORITIES:
+                if capacity[d, color]:
+                    placed[i, d, color] = graph.add_edge(pair_node[i, d], slot_node[d, color], hours,
+                                                         _COLOR_COST[color] * weights[i])
+    for (d, color), node in slot_node.items():
+        if capacity[d, color]:
+            graph.add_edge(node, sink, capacity[d, color], 0)
+    graph.solve(source, sink)
+
+    per_day = [[0] * len(DAYS) for _ in subjects]
+    for (i, d, _), ref in placed.items():
+        per_day[i][d] += graph.flow(ref)
+
+    # Two odd days for one subject are a split block; move an hour so they pair
+    # up whenever the receiving day has room and the spread cost does not grow.
+    used_on_day = [sum(per_day[i][d] for i in range(len(subjects))) for d in range(len(DAYS))]
+    for i in range(len(subjects)):
+        odd = [d for d in open_days if per_day[i][d] % 2]
+        while len(odd) >= 2:
+            give = max(odd, key=lambda d: (per_day[i][d], d))
+            take = next((d for d in odd if d != give and per_day[i][d] <= per_day[i][give]
+                         and used_on_day[d] < sum(capacity[d, c] for c in PRIORITIES)), None)
+            odd.remove(give)
+            if take is None:
+                continue
+            odd.remove(take)
+            per_day[i][give] -= 1
+            per_day[i][take] += 1
+            used_on_day[give] -= 1
+            used_on_day[take] += 1
+
+    sessions: List[List[Tuple[int, int, str]]] = [[] for _ in DAYS]
+    for d in open_days:
+        slot_cost = {}
+        for color in PRIORITIES:
+            for bit in _bits((masks.get(color) or [0] * len(DAYS))[d]):
+                slot_cost.setdefault(bit, _COLOR_COST[color])
+        # Heavier subjects take the cheaper slots; ties keep input order
+        order = sorted(range(len(subjects)), key=lambda i: (-weights[i], i))
+        wanted_blocks = [i for i in order for _ in range(per_day[i][d] // 2)]
+        wanted_singles = [i for i in order if per_day[i][d] % 2]
+        starts, singles_at = _layout_day(slot_cost, len(wanted_blocks), len(wanted_singles))
+        # Blocks the DP split go to the lightest subjects, as two single hours
+        split = wanted_blocks[len(starts):]
+        wanted_blocks = wanted_blocks[:len(starts)]
+        wanted_singles = sorted(wanted_singles + split + split, key=lambda i: (-weights[i], i))
+        for i, start in zip(wanted_blocks, starts):
+            sessions[d].append((start + FIRST_HOUR, start + FIRST_HOUR + 2, subjects[i][0]))
+        for i, hour in zip(wanted_singles, singles_at):
+            sessions[d].append((hour + FIRST_HOUR, hour + FIRST_HOUR + 1, subjects[i][0]))
+
+    unplaced = {}
+    scheduled = 0
+    for i, (name, hours) in enumerate(subjects):
+        got = graph.flow(supply[i])
+        scheduled += got
+        if got < hours:
+            unplaced[name] = unplaced.get(name, 0) + hours - got
+    needed = sum(hours for _, hours in subjects)
+    return ScheduleResult(schedule=_render(sessions), hours_needed=needed, hours_scheduled=scheduled,
+                          unplaced=unplaced, mode='optimal')
+
+
+# --- Requests -----------------------------------------------------------------
+
+MODES = ('optimal', 'greedy')
+SOURCES = { 'optimal': 'optimal_solver_generated', 'greedy': 'smart_algorithm_generated' }
+DEFAULT_HOURS = 2  # per subject when only a course list is given
+
+_TIPS = [
+    "Yeşil saatlerde daha verimli çalışırsınız",
+    "2'şerli ders blokları odaklanmanızı artırır",
+    "Her 3-4 saatte bir 15-30 dakika mola verin",
+    "Zayıf konularınıza yeşil saatlerde odaklanın",
+    "Düzenli tekrarlar bilgiyi kalıcı hale getirir",
+]
+
+
+def parse_subjects(subjects: Any, courses: str = '') -> List[Tuple[str, int]]:
+    """``[{name, hours}]`` from the request as ``(name, hours)``; falls back to the comma-separated ``courses``."""
+    parsed: List[Tuple[str, int]] = []
+    try:
+        for s in subjects or []:
+            if isinstance(s, dict):
+                name = (s.get('name') or '').strip()
+                hours = int(s.get('hours') or 0)
+                if name and hours > 0:
+                    parsed.append((name, hours))
+    except (TypeError, ValueError):
+        pass
+    if not parsed:
+        fallback = [c.strip() for c in (courses or '').split(',') if c.strip()] or ['Genel Çalışma']
+        parsed = [(name, DEFAULT_HOURS) for name in fallback]
+    return parsed
+
+
+def plan(subjects: Sequence[Tuple[str, int]], cell_states: Optional[Dict[str, str]] = None,
+         day_states: Optional[Dict[str, str]] = None, available_days: Optional[Iterable[str]] = None,
+         weak_topics: Sequence[str] = (), mode: str = 'optimal') -> ScheduleResult:
+    """Schedule ``subjects`` on the availability grid; ``mode`` is 'optimal' or 'greedy'."""
+    masks = availability_masks(cell_states or {}, day_states or {}, available_days or DEFAULT_DAYS)
+    if mode == 'greedy':
+        return schedule_week(subjects, masks, weak_topics)
+    return solve_week(subjects, masks, weak_topics)
+
+
+def tips(result: ScheduleResult, weak_topics: Sequence[str] = ()) -> List[str]:
+    out = list(_TIPS)
+    if result.hours_scheduled < result.hours_needed:
+        out.insert(0, f"Uyarı: Sadece {result.hours_scheduled}/{result.hours_needed} saat planlanabildi. Daha fazla müsait saat eklemeyi deneyin.")
+    if weak_topics:
+        out.insert(0, f"{', '.join(weak_topics[:2])} konularına daha fazla zaman ayırın")
+    return out[:6]
+
+
+def payload(result: ScheduleResult, weak_topics: Sequence[str] = ()) -> Dict[str, Any]:
+    """The schedule endpoint's response body for ``result``."""
+    return {
+        'schedule': result.schedule,
+        'tips': tips(result, weak_topics),
+        'source': SOURCES.get(result.mode, SOURCES['optimal']),
+        'hours_needed': result.hours_needed,
+        'hours_scheduled': result.hours_scheduled,
+    }
+
+
+def plan_request(data: Dict[str, Any], weak_topics: Sequence[str] = (), mode: Optional[str] = None) -> Dict[str, Any]:
+    """Response body for one schedule request body (``subjects``, ``courses``, ``cell_states``, ...)."""
+    mode = str(mode or data.get('mode') or 'optimal').strip().lower()
+    subjects = parse_subjects(data.get('subjects'), (data.get('courses') or '').strip())
+    result = plan(subjects, data.get('cell_states'), data.get('day_states'), data.get('available_days'),
+                  weak_topics, 'greedy' if mode == 'greedy' else 'optimal')
+    return payload(result, weak_topics)
+
+
+# --- Incremental repair ---------------------------------------------------------
+
+def usable_days(cell_states: Dict[str, str], day_states: Dict[str, str]) -> List[str]:
+    """Days the grid makes available, as the frontend computes them: a green day or any green cell."""
+    days = [d for d in DAYS if day_states.get(d) == 'green'
+            or any(cell_states.get(f"{d}-{h}") == 'green' for h in HOURS)]
+    return days or list(DEFAULT_DAYS)
+
+
+def parse_schedule(schedule: Any) -> List[List[Tuple[int, int, str]]]:
+    """Sessions per day from a rendered schedule; breaks and unreadable items are dropped."""
+    sessions: List[List[Tuple[int, int, str]]] = [[] for _ in DAYS]
+    for day in schedule or []:
+        if not isinstance(day, dict) or day.get('day') not in DAYS:
+            continue
+        d = DAYS.index(day['day'])
+        for item in day.get('items') or []:
+            if not isinstance(item, str) or 'Mola' in item or ' ' not in item:
+                continue
+            name, times = item.rsplit(' ', 1)
+            try:
+                start, end = (int(t.split(':')[0]) for t in times.split('-'))
+            except ValueError:
+                continue
+            if FIRST_HOUR <= start < end <= LAST_HOUR + 1:
+                sessions[d].append((start, end, name))
+    return sessions
+
+
+def _span(start: int, end: int) -> int:
+    return ((1 << (end - start)) - 1) << (start - FIRST_HOUR)
+
+
+@dataclass
+class RepairResult:
+    result: ScheduleResult
+    added: List[Dict[str, str]]
+    removed: List[Dict[str, str]]
+
+
+def repair_week(schedule: Any, before: Masks, after: Masks, subjects: Optional[Sequence[Tuple[str, int]]] = None,
+                weak_topics: Sequence[str] = ()) -> RepairResult:
+    """Repair ``schedule`` after the grid changed from ``before`` to ``after``.
+
+    Sessions that sit on an hour which changed and is no longer green/yellow are
+    removed; every other session stays where it is. Removed hours, and hours
+    ``subjects`` asks for beyond what is scheduled, are placed into the free
+    green/yellow hours by the optimal solver.
+    """
+    sessions = parse_schedule(schedule)
+    usable_after = [g | y for g, y in zip(after.get('green') or [0] * len(DAYS), after.get('yellow') or [0] * len(DAYS))]
+    changed = [0] * len(DAYS)
+    for state in STATES:
+        for d, (old, new) in enumerate(zip(before.get(state) or [0] * len(DAYS), after.get(state) or [0] * len(DAYS))):
+            changed[d] |= old ^ new
+
+    kept: List[List[Tuple[int, int, str]]] = [[] for _ in DAYS]
+    removed: List[List[Tuple[int, int, str]]] = [[] for _ in DAYS]
+    used = [0] * len(DAYS)
+    have: Dict[str, int] = {}
+    for d, day_sessions in enumerate(sessions):
+        for start, end, name in day_sessions:
+            span = _span(start, end)
+            if span & changed[d] and span & ~usable_after[d]:
+                removed[d].append((start, end, name))
+                continue
+            kept[d].append((start, end, name))
+            used[d] |= span
+            have[name] = have.get(name, 0) + end - start
+
+    if subjects is None:
+        wanted: Dict[str, int] = {}
+        for day_sessions in sessions:
+            for start, end, name in day_sessions:
+                wanted[name] = wanted.get(name, 0) + end - start
+    else:
+        wanted = {}
+        for name, hours in subjects:
+            wanted[name] = wanted.get(name, 0) + hours
+    missing = [(name, hours - have.get(name, 0)) for name, hours in wanted.items() if hours > have.get(name, 0)]
+
+    free = { state: [m & ~u for m, u in zip(after.get(state) or [0] * len(DAYS), used)] for state in PRIORITIES }
+    filled = solve_week(missing, free, weak_topics) if missing else None
+    placed = parse_schedule(filled.schedule) if filled else [[] for _ in DAYS]
+    merged = [kept[d] + placed[d] for d in range(len(DAYS))]
+
+    result = ScheduleResult(
+        schedule=_render(merged),
+        hours_needed=sum(wanted.values()),
+        hours_scheduled=sum(have.values()) + (filled.hours_scheduled if filled else 0),
+        unplaced=filled.unplaced if filled else {},
+        mode='optimal',
+    )
+
+    def items(day_sessions):
+        return [f"{name} {_fmt(start)}-{_fmt(end)}" for start, end, name in sorted(day_sessions)]
+
+    return RepairResult(
+        result=result,
+        added=[{ 'day': DAYS[d], 'item': item } for d in range(len(DAYS)) for item in items(placed[d])],
+        removed=[{ 'day': DAYS[d], 'item': item } for d in range(len(DAYS)) for item in items(removed[d])],
+    )
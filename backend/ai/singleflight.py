@@ -0,0 +1,174 @@
+"""
+Request coalescing ("single-flight") for identical provider calls.
+
+While a completion for a given content key (see ``ai.cache.cache_key``) is in
+flight, identical calls wait for it instead of going upstream, and every
+waiter receives a copy of the same result (or the same exception).
+
+``SingleFlight`` coalesces across threads of one process (sync client),
+``AsyncSingleFlight`` across tasks of one event loop (async client). With
+``settings.AI_SINGLE_FLIGHT_CROSS_PROCESS`` the leader also takes a lock in the
+``ai`` cache so other processes sharing that backend (Redis, Memcached, DB)
+wait for its result too.
+"""
+import asyncio
+import copy
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+# Seconds a cross-process result stays readable for followers of its flight.
+RESULT_TTL = 30
+POLL_INTERVAL = 0.05
+
+
+def _lock_key(key: str) -> str:
+    return f'ai:flight:lock:{key}'
+
+
+def _result_key(token: str) -> str:
+    return f'ai:flight:result:{token}'
+
+
+def _cross_process() -> bool:
+    return getattr(settings, 'AI_SINGLE_FLIGHT_CROSS_PROCESS', False)
+
+
+def shared_call(key: str, fn: Callable[[], Any], wait: float) -> Any:
+    """
+    Run ``fn`` once across processes: the first caller takes the cache lock and
+    publishes its result, the others poll for it for up to ``wait`` seconds.
+    If the leader fails or disappears, followers call ``fn`` themselves.
+    """
+    if not _cross_process():
+        return fn()
+    store = caches['ai']
+    token = uuid.uuid4().hex
+    if store.add(_lock_key(key), token, timeout=int(wait) + 1):
+        try:
+            result = fn()
+            store.set(_result_key(token), result, timeout=RESULT_TTL)
+            return result
+        finally:
+            store.delete(_lock_key(key))
+
+    deadline = time.monotonic() + wait
+    leader = store.get(_lock_key(key))
+    while leader is not None and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        result = store.get(_result_key(leader))
+        if result is not None:
+            return result
+        if store.get(_lock_key(key)) != leader:
+            result = store.get(_result_key(leader))
+            if result is not None:
+                return result
+            break
+    return fn()
+
+
+async def ashared_call(key: str, fn: Callable[[], Any], wait: float) -> Any:
+    """Async ``shared_call``; ``fn`` returns an awaitable."""
+    if not _cross_process():
+        return await fn()
+    store = caches['ai']
+    token = uuid.uuid4().hex
+    if await sync_to_async(store.add)(_lock_key(key), token, timeout=int(wait) + 1):
+        try:
+            result = await fn()
+            await sync_to_async(store.set)(_result_key(token), result, timeout=RESULT_TTL)
+            return result
+        finally:
+            await sync_to_async(store.delete)(_lock_key(key))
+
+    deadline = time.monotonic() + wait
+    leader = await sync_to_async(store.get)(_lock_key(key))
+    while leader is not None and time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        result = await sync_to_async(store.get)(_result_key(leader))
+        if result is not None:
+            return result
+        if await sync_to_async(store.get)(_lock_key(key)) != leader:
+            result = await sync_to_async(store.get)(_result_key(leader))
+            if result is not None:
+                return result
+            break
+    return await fn()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Thread-safe: one ``fn`` call per key at a time, shared by all concurrent callers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], wait: float) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        assert call is not None
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = shared_call(key, fn, wait)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """``SingleFlight`` for coroutines; bound to one event loop like the async client."""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Any], wait: float) -> Any:
+        while (future := self._calls.get(key)) is not None:
+            try:
+                # shield: a cancelled waiter must not cancel the shared call
+                return copy.deepcopy(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # the leader was cancelled (client went away); take over
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await ashared_call(key, fn, wait)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved; waiters (if any) re-raise it
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._calls.pop(key, None)
@@ -0,0 +1,237 @@
+"""
+Local extractive summarizer (TextRank over TF-IDF sentence vectors).
+
+Sentences become sublinear TF-IDF vectors; cosine similarity between them is
+the edge weight of a sentence graph, and PageRank by power iteration scores
+each sentence by how much of the text it "covers". The top sentences are
+returned in document order.
+
+With NumPy the vectors are built from sparse (row, col, value) triplets and
+only terms shared by at least two sentences become matrix columns (a term in
+one sentence changes its norm but links nothing), so the similarity matrix is
+one matmul. Without NumPy a pure-Python path computes the same scores from an
+inverted index.
+
+Long documents are handled chunk by chunk (``chunk_text``): each chunk keeps its
+best sentences and the final ranking runs over those, so cost grows linearly
+with the text instead of quadratically.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: without numpy the pure-Python ranking is used
+    np = None
+
+DAMPING = 0.85
+MAX_ITER = 100
+TOLERANCE = 1e-6
+# Widest shared-term matrix built; the highest-weight shared terms are kept beyond this
+MAX_TERMS = 4096
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[\.!?])\s+|\n+")
+_TOKEN = re.compile(r"[A-Za-zÇĞİÖŞÜçğıöşü0-9']+")
+STOPWORDS = frozenset([
+    've', 'ile', 'da', 'de', 'ki', 'bu', 'şu', 'o', 'bir', 'çok', 'az', 'için', 'gibi', 'olan', 'olarak',
+    'daha', 'en', 'ya', 'veya', 'ama', 'fakat', 'her', 'ise', 'mi', 'mı', 'mu', 'mü', 'ne', 'kadar',
+    'the', 'a', 'an', 'to', 'of', 'in', 'on', 'at', 'is', 'are', 'was', 'were', 'and', 'or', 'for',
+])
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text or '') if s and s.strip()]
+
+
+def tokenize(sentence: str) -> List[str]:
+    return [t for t in _TOKEN.findall(sentence.lower()) if len(t) >= 3 and t not in STOPWORDS]
+
+
+def default_limit(sentence_count: int) -> int:
+    """How many sentences a summary keeps (same rule the view always used)."""
+    return 5 if sentence_count > 8 else min(3, sentence_count)
+
+
+def _rank_numpy(token_lists: Sequence[List[str]]) -> List[float]:
+    n = len(token_lists)
+    vocab: Dict[str, int] = {}
+    rows: List[int] = []
+    cols: List[int] = []
+    counts: List[int] = []
+    for i, tokens in enumerate(token_lists):
+        for term, count in Counter(tokens).items():
+            rows.append(i)
+            cols.append(vocab.setdefault(term, len(vocab)))
+            counts.append(count)
+    if not vocab:
+        return [1.0 / n] * n
+    row = np.asarray(rows)
+    col = np.asarray(cols)
+    df = np.bincount(col, minlength=len(vocab))
+    idf = np.log((n + 1) / (df + 1)) + 1.0
+    weight = (1.0 + np.log(np.asarray(counts, dtype=np.float64))) * idf[col]
+    norm = np.sqrt(np.bincount(row, weights=weight * weight, minlength=n))
+    norm[norm == 0] = 1.0
+    weight /= norm[row]
+
+    shared = np.flatnonzero(df >= 2)
+    if len(shared) > MAX_TERMS:
+        energy = np.bincount(col, weights=weight, minlength=len(vocab))[shared]
+        shared = shared[np.argsort(-energy, kind='stable')[:MAX_TERMS]]
+    column = np.full(len(vocab), -1)
+    column[shared] = np.arange(len(shared))
+    keep = column[col] >= 0
+    matrix = np.zeros((n, len(shared)), dtype=np.float32)
+    matrix[row[keep], column[col[keep]]] = weight[keep]
+
+    similarity = (matrix @ matrix.T).astype(np.float64)
+    np.fill_diagonal(similarity, 0.0)
+    degree = similarity.sum(axis=1)
+    dangling = degree == 0
+    degree[dangling] = 1.0
+    transition = (similarity / degree[:, None]).T  # column-stochastic except dangling columns
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITER):
+        # Dangling sentences spread their rank evenly instead of leaking it
+        updated = (1 - DAMPING) / n + DAMPING * (transition @ scores + scores[dangling].sum() / n)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            scores = updated
+            break
+        scores = updated
+    return scores.tolist()
+
+
+def _rank_python(token_lists: Sequence[List[str]]) -> List[float]:
+    n = len(token_lists)
+    df: Counter = Counter()
+    for tokens in token_lists:
+        df.update(set(tokens))
+    vectors: List[Dict[str, float]] = []
+    for tokens in token_lists:
+        vec = { t: (1.0 + math.log(c)) * (math.log((n + 1) / (df[t] + 1)) + 1.0) for t, c in Counter(tokens).items() }
+        length = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        vectors.append({ t: v / length for t, v in vec.items() })
+
+    postings: Dict[str, List[Tuple[int, float]]] = {}
+    for i, vec in enumerate(vectors):
+        for t, v in vec.items():
+            if df[t] >= 2:
+                postings.setdefault(t, []).append((i, v))
+    edges: List[Dict[int, float]] = [{} for _ in range(n)]
+    for plist in postings.values():
+        for a, (i, vi) in enumerate(plist):
+            for j, vj in plist[a + 1:]:
+                edges[i][j] = edges[i].get(j, 0.0) + vi * vj
+                edges[j][i] = edges[j].get(i, 0.0) + vi * vj
+    degree = [sum(e.values()) for e in edges]
+
+    scores = [1.0 / n] * n
+    for _ in range(MAX_ITER):
+        leaked = sum(scores[i] for i in range(n) if not degree[i]) / n
+        updated = [(1 - DAMPING) / n + DAMPING * leaked] * n
+        for i in range(n):
+            if degree[i]:
+                share = DAMPING * scores[i] / degree[i]
+                for j, w in edges[i].items():
+                    updated[j] += share * w
+        delta = sum(abs(u - s) for u, s in zip(updated, scores))
+        scores = updated
+        if delta < TOLERANCE:
+            break
+    return scores
+
+
+def rank(sentences: Sequence[str]) -> List[float]:
+    """TextRank score per sentence."""
+    if not sentences:
+        return []
+    token_lists = [tokenize(s) for s in sentences]
+    if np is not None:
+        return _rank_numpy(token_lists)
+    return _rank_python(token_lists)
+
+
+def summarize(text: str, limit: int = 0) -> List[str]:
+    """The ``limit`` (default: ``default_limit``) highest-ranked sentences of ``text``, in order."""
+    sentences = split_sentences(text)
+    if not sentences:
+        return []
+    limit = limit or default_limit(len(sentences))
+    scores = rank(sentences)
+    top = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))[:limit]
+    return [sentences[i] for i in sorted(top)]
+
+
+def bullets(sentences: Sequence[str]) -> str:
+    return "\n".join(f"- {s}" for s in sentences)
+
+
+def chunk_text(text: str, max_chars: int) -> List[str]:
+    """Consecutive sentence groups of at most ``max_chars``; a longer sentence is cut on whitespace."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for sentence in split_sentences(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces, sentence = sentence[:cut].strip(), sentence[cut:].strip()
+            if current:
+                chunks.append(' '.join(current))
+                current, size = [], 0
+            chunks.append(pieces)
+        if not sentence:
+            continue
+        if current and size + 1 + len(sentence) > max_chars:
+            chunks.append(' '.join(current))
+            current, size = [], 0
+        current.append(sentence)
+        size += len(sentence) + (1 if size else 0)
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (~3 characters per token for Turkish text)."""
+    return len(text) // 3 + 1
+
+
+def condense(text: str, max_chars: int, chunk_chars: int = 4000) -> str:
+    """``text`` cut down to about ``max_chars`` by keeping each chunk's best sentences, in order."""
+    if len(text) <= max_chars:
+        return text
+    ratio = max_chars / len(text)
+    kept: List[str] = []
+    for chunk in chunk_text(text, chunk_chars):
+        sentences = split_sentences(chunk)
+        scores = rank(sentences)
+        budget = len(chunk) * ratio
+        chosen = []
+        for i in sorted(range(len(sentences)), key=lambda i: (-scores[i], i)):
+            if budget <= 0:
+                break
+            chosen.append(i)
+            budget -= len(sentences[i]) + 1
+        kept.extend(sentences[i] for i in sorted(chosen))
+    return ' '.join(kept)
+
+
+def summarize_long(text: str, chunk_chars: int, limit: int = 0, per_chunk: int = 3) -> Tuple[List[str], int]:
+    """Map-reduce extractive summary: best ``per_chunk`` sentences of each chunk, then rank those.
+
+    Returns the summary sentences and the number of chunks.
+    """
+    chunks = chunk_text(text, chunk_chars)
+    if len(chunks) <= 1:
+        return summarize(text, limit), len(chunks)
+    pooled: List[str] = []
+    for chunk in chunks:
+        pooled.extend(summarize(chunk, per_chunk))
+    limit = limit or min(10, 3 + len(chunks))
+    scores = rank(pooled)
+    top = sorted(range(len(pooled)), key=lambda i: (-scores[i], i))[:limit]
+    return [pooled[i] for i in sorted(top)], len(chunks)
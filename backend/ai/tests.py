@@ -0,0 +1,330 @@
+import importlib
+import uuid
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from assessments.models import Assessment
+
+from . import chat_store, question_bank, throttling
+from .async_views import AsyncAIChatView
+from .models import ChatMessage, ChatThread, QuestionBankItem, QuestionBankTopic
+from .provider import ProviderTimeout
+from .views import AIChatView
+
+
+def _history(*contents):
+    return [{ 'role': 'user' if i % 2 == 0 else 'assistant', 'content': c } for i, c in enumerate(contents)]
+
+
+class SaveHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ayse', password='x')
+        self.thread = chat_store.create_thread(self.user, 'Sohbet', _history('merhaba', 'selam'))
+
+    def stored(self):
+        return list(ChatMessage.objects.filter(thread=self.thread).order_by('seq').values_list('seq', 'content'))
+
+    def test_extended_history_appends_new_turns_only(self):
+        first_ids = list(ChatMessage.objects.filter(thread=self.thread).order_by('seq').values_list('pk', flat=True))
+
+        thread, written = chat_store.save_history(self.thread.pk, self.user, _history('merhaba', 'selam', 'türev nedir?', 'eğim'))
+
+        self.assertEqual(written, 2)
+        self.assertEqual(thread.message_count, 4)
+        self.assertEqual(self.stored(), [(0, 'merhaba'), (1, 'selam'), (2, 'türev nedir?'), (3, 'eğim')])
+        self.assertEqual(list(ChatMessage.objects.filter(seq__lt=2).order_by('seq').values_list('pk', flat=True)), first_ids)
+
+    def test_edited_history_is_rewritten(self):
+        thread, written = chat_store.save_history(self.thread.pk, self.user, _history('merhaba', 'düzeltilmiş', 'devam'))
+
+        self.assertEqual(written, 3)
+        self.assertEqual(self.stored(), [(0, 'merhaba'), (1, 'düzeltilmiş'), (2, 'devam')])
+        self.assertEqual(thread.message_count, 3)
+
+    def test_shortened_history_is_rewritten(self):
+        thread, written = chat_store.save_history(self.thread.pk, self.user, _history('yeni başlangıç'))
+
+        self.assertEqual(written, 1)
+        self.assertEqual(self.stored(), [(0, 'yeni başlangıç')])
+        self.assertEqual((thread.message_count, thread.preview), (1, 'yeni başlangıç'))
+
+    def test_other_users_thread_is_not_found(self):
+        other = User.objects.create_user('mehmet', password='x')
+
+        self.assertEqual(chat_store.save_history(self.thread.pk, other, _history('x')), (None, 0))
+        self.assertEqual(len(self.stored()), 2)
+
+
+class PageTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('ayse', password='x')
+        self.thread = chat_store.create_thread(user, 'Sohbet', _history(*[f'm{i}' for i in range(10)]))
+
+    def seqs(self, rows):
+        return [row['seq'] for row in rows]
+
+    def test_whole_transcript_without_cursor(self):
+        rows, has_more = chat_store.page(self.thread)
+
+        self.assertEqual(self.seqs(rows), list(range(10)))
+        self.assertFalse(has_more)
+
+    def test_limit_returns_newest_turns_in_order(self):
+        rows, has_more = chat_store.page(self.thread, limit=3)
+
+        self.assertEqual(self.seqs(rows), [7, 8, 9])
+        self.assertTrue(has_more)
+
+    def test_before_pages_back(self):
+        rows, has_more = chat_store.page(self.thread, before=7, limit=3)
+        self.assertEqual(self.seqs(rows), [4, 5, 6])
+        self.assertTrue(has_more)
+
+        rows, has_more = chat_store.page(self.thread, before=2, limit=3)
+        self.assertEqual(self.seqs(rows), [0, 1])
+        self.assertFalse(has_more)
+
+    def test_after_fetches_newer_turns(self):
+        rows, has_more = chat_store.page(self.thread, after=5, limit=2)
+        self.assertEqual(self.seqs(rows), [6, 7])
+        self.assertFalse(has_more)
+
+        rows, _ = chat_store.page(self.thread, after=9)
+        self.assertEqual(rows, [])
+
+
+class MoveChatAssessmentsBackwardsTests(TestCase):
+    migration = importlib.import_module('ai.migrations.0004_move_chat_assessments')
+
+    def test_threads_become_assessments_with_their_id_and_time(self):
+        user = User.objects.create_user('ayse', password='x')
+        created = timezone.now() - timedelta(days=30)
+        thread = chat_store.create_thread(user, 'Eski sohbet', _history('merhaba', 'selam'))
+        ChatThread.objects.filter(pk=thread.pk).update(created_at=created)
+
+        self.migration.backwards(apps, SimpleNamespace(connection=connection))
+
+        chat = Assessment.objects.get(kind='chat')
+        self.assertEqual((chat.pk, chat.created_at, chat.event_date), (thread.pk, created, created.date()))
+        self.assertEqual(chat.data['history'], _history('merhaba', 'selam'))
+        self.assertFalse(ChatThread.objects.exists())
+
+
+class ThrottledView(APIView):
+    throttle_classes = [throttling.AIRateThrottle]
+
+    def get(self, request):
+        return Response({ 'ok': True })
+
+
+@override_settings(AI_THROTTLE_ENABLED=True, AI_THROTTLE_CACHE='default',
+                   AI_THROTTLE_RATES={ 'user': '2/min', 'anon': None, 'global': '3/min' })
+class AIRateThrottleTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.ayse = User.objects.create_user('ayse', password='x')
+        self.mehmet = User.objects.create_user('mehmet', password='x')
+        self.view = ThrottledView.as_view()
+
+    def call(self, user):
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=user)
+        return self.view(request)
+
+    def user_bucket(self, user):
+        return caches['default'].get(f'ai-throttle:bucket:user:{user.pk}')
+
+    def test_exhausted_user_bucket_is_refused_with_retry_after(self):
+        self.assertEqual([self.call(self.ayse).status_code for _ in range(2)], [200, 200])
+
+        response = self.call(self.ayse)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')  # 1 token at 2/min
+        self.assertEqual(throttling.stats()['counts']['user'], { 'allowed': 2, 'throttled': 1 })
+
+    def test_global_refusal_does_not_spend_user_tokens(self):
+        self.call(self.ayse)
+        self.call(self.mehmet)
+        self.call(self.mehmet)
+        tokens_before, _ = self.user_bucket(self.ayse)
+
+        response = self.call(self.ayse)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        tokens_after, _ = self.user_bucket(self.ayse)
+        self.assertEqual(tokens_after, tokens_before)
+        counts = throttling.stats()['counts']
+        self.assertEqual((counts['global']['throttled'], counts['user']['throttled']), (1, 0))
+
+    def test_saturated_upstream_is_refused_before_buckets(self):
+        with mock.patch.object(throttling.health.upstream, 'saturated', return_value=True):
+            response = self.call(self.ayse)
+
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '1'))
+        self.assertIsNone(self.user_bucket(self.ayse))
+        self.assertEqual(throttling.stats()['counts']['upstream'], { 'throttled': 1 })
+
+
+class FakeStream:
+    def __init__(self, deltas=(), status_code=200, fail_after=None):
+        self.deltas, self.status_code, self.fail_after = list(deltas), status_code, fail_after
+        self.ok = status_code < 400
+        self.text = 'upstream body'
+        self.closed = False
+
+    def _deltas(self):
+        for i, delta in enumerate(self.deltas):
+            if i == self.fail_after:
+                raise ProviderTimeout('read timeout')
+            yield delta
+
+    def __iter__(self):
+        return self._deltas()
+
+    async def __aiter__(self):
+        for delta in self._deltas():
+            yield delta
+
+    def close(self):
+        self.closed = True
+
+    async def aclose(self):
+        self.closed = True
+
+
+@mock.patch('builtins.print')
+class ChatEventStreamTests(TestCase):
+    """The sync and async SSE generators must emit the same events."""
+
+    def run_both(self, make_stream):
+        streams = []
+
+        def open_stream(*args, **kwargs):
+            stream = make_stream()
+            if isinstance(stream, Exception):
+                raise stream
+            streams.append(stream)
+            return stream
+
+        async def open_async_stream(*args, **kwargs):
+            return open_stream()
+
+        with mock.patch('ai.views.get_client', return_value=SimpleNamespace(open_stream=open_stream)):
+            sync_events = list(AIChatView().event_stream({}))
+
+        async def collect():
+            return [event async for event in AsyncAIChatView()._async_event_stream({})]
+
+        client = SimpleNamespace(open_stream=open_async_stream)
+        with mock.patch('ai.async_views.get_async_client', return_value=client):
+            async_events = async_to_sync(collect)()
+
+        self.assertEqual(sync_events, async_events)
+        self.assertTrue(all(stream.closed for stream in streams))
+        return sync_events
+
+    def test_deltas_then_full_reply(self, _print):
+        events = self.run_both(lambda: FakeStream(['Mer', 'haba']))
+
+        self.assertEqual(events, [
+            'data: {"delta": "Mer"}\n\n', 'data: {"delta": "haba"}\n\n', 'event: done\ndata: {"reply": "Merhaba"}\n\n',
+        ])
+
+    def test_error_status_becomes_fallback_reply(self, _print):
+        events = self.run_both(lambda: FakeStream(status_code=429))
+
+        self.assertEqual(len(events), 2)
+        self.assertIn('API kullanım limitine ulaşıldı', events[0])
+        self.assertTrue(events[1].startswith('event: done'))
+
+    def test_open_failure_becomes_fallback_reply(self, _print):
+        events = self.run_both(lambda: ProviderTimeout('connect timeout'))
+
+        self.assertEqual(len(events), 2)
+        self.assertIn('süresi aşıldı', events[1])
+
+    def test_interrupted_stream_keeps_streamed_text(self, _print):
+        events = self.run_both(lambda: FakeStream(['Mer', 'haba'], fail_after=1))
+
+        self.assertEqual(events[0], 'data: {"delta": "Mer"}\n\n')
+        self.assertTrue(events[1].startswith('event: error'))
+        self.assertEqual(events[2], 'event: done\ndata: {"reply": "Mer"}\n\n')
+
+
+class QuestionBankRequestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ayse', password='x')
+
+    def test_request_marks_registered_topic_below_low_water_once(self):
+        entry = question_bank.register('matematik türev', 'orta')
+
+        self.assertTrue(question_bank.request_refill('Matematik  Türev', 'orta', self.user))
+        self.assertFalse(question_bank.request_refill('matematik türev', 'orta', self.user))
+        entry.refresh_from_db()
+        self.assertIsNotNone(entry.refill_requested_at)
+
+    def test_stocked_topic_is_not_marked(self):
+        entry = question_bank.register('fizik', 'orta')
+        QuestionBankTopic.objects.filter(pk=entry.pk).update(low_water=1)
+        QuestionBankItem.objects.create(subject='fizik', topic='fizik', difficulty='orta', question={ 'q': 'Soru' })
+
+        self.assertFalse(question_bank.request_refill('fizik', 'orta', self.user))
+
+    def test_unregistered_topics_are_suggested_disabled_up_to_the_limit(self):
+        with mock.patch.object(question_bank, 'USER_TOPIC_LIMIT', 2):
+            for topic in ('konu a', 'konu b', 'konu c'):
+                self.assertFalse(question_bank.request_refill(topic, 'orta', self.user))
+            question_bank.request_refill('konu d', 'orta', AnonymousUser())
+
+        topics = QuestionBankTopic.objects.order_by('topic')
+        self.assertEqual(list(topics.values_list('topic', 'enabled', 'requested_by')), [
+            ('konu a', False, self.user.pk), ('konu b', False, self.user.pk),
+        ])
+
+    def test_disabled_topic_is_not_marked_until_registered(self):
+        question_bank.request_refill('kimya mol', 'zor', self.user)
+        self.assertFalse(question_bank.request_refill('kimya mol', 'zor', self.user))
+
+        entry = question_bank.register('kimya mol', 'zor')
+
+        self.assertTrue(entry.enabled)
+        self.assertTrue(question_bank.request_refill('kimya mol', 'zor', self.user))
+
+
+@mock.patch('ai.management.commands.refill_question_bank.get_client', return_value=SimpleNamespace(api_key='k'))
+@mock.patch('builtins.print')
+class RefillQuestionBankCommandTests(TestCase):
+    def test_worker_refills_enabled_topics_and_clears_the_mark(self, _print, _client):
+        user = User.objects.create_user('ayse', password='x')
+        wanted = question_bank.register('biyoloji hücre', 'orta')
+        question_bank.request_refill('biyoloji hücre', 'orta', user)
+        question_bank.request_refill('rastgele metin', 'orta', user)
+
+        def generate(entry, count):
+            return [{ 'q': f'{uuid.uuid4().hex} {uuid.uuid4().hex}', 'a': ['1', '2'], 'correct': 0 } for _ in range(count)]
+
+        with mock.patch.object(question_bank, 'generate_batch', side_effect=generate) as batches, \
+                mock.patch.object(question_bank, 'MAX_FAILED_BATCHES', 1):
+            call_command('refill_question_bank', stdout=StringIO())
+
+        self.assertEqual({ call.args[0].topic for call in batches.call_args_list }, { 'biyoloji hücre' })
+        wanted.refresh_from_db()
+        self.assertIsNone(wanted.refill_requested_at)
+        self.assertEqual(QuestionBankItem.objects.filter(topic='biyoloji hücre').count(), wanted.target)
+        self.assertFalse(QuestionBankItem.objects.exclude(topic='biyoloji hücre').exists())
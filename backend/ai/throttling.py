@@ -0,0 +1,143 @@
+"""
+Request limits for the AI endpoints.
+
+``AIRateThrottle`` admits a request only if it can take a token from two
+buckets: one per user (per client IP for anonymous callers) and one shared by
+all AI traffic. Buckets refill continuously at their rate, so short bursts up
+to the rate's count pass while sustained load is held to the rate. A request
+is also refused while the upstream gate (``ai.health.upstream``) already has a
+full queue. Tokens are spent only when every check passes, so a request turned
+away by the global bucket or the gate costs the user nothing. Refusals become
+DRF's 429 with ``Retry-After``, before the view runs and so before any provider
+work starts.
+
+Buckets and counters live in the ``AI_THROTTLE_CACHE`` cache alias: shared by
+all workers on Redis/Memcached, per process on the default LocMemCache.
+Updates are get/set, not atomic, so concurrent workers may let a few extra
+requests through at the edge of a limit.
+
+Config (settings):
+- AI_THROTTLE_ENABLED
+- AI_THROTTLE_RATES: ``{'user', 'anon', 'global'}`` -> ``'<count>/<s|min|hour|day>'``, or None for no limit
+- AI_THROTTLE_CACHE: cache alias (default 'default')
+"""
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from . import health
+
+SCOPES = ('user', 'anon', 'global', 'upstream')
+_PERIODS = { 's': 1, 'm': 60, 'h': 3600, 'd': 86400 }
+_PREFIX = 'ai-throttle'
+
+_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, 'AI_THROTTLE_CACHE', 'default')]
+
+
+def parse_rate(rate: Optional[str]) -> Optional[Tuple[int, float]]:
+    """``'30/min'`` -> (bucket capacity, tokens per second); None when unlimited."""
+    if not rate:
+        return None
+    count, period = rate.split('/')
+    seconds = _PERIODS[period.strip()[0].lower()]
+    return int(count), int(count) / seconds
+
+
+Bucket = Tuple[str, str, int, float]  # (scope, key, capacity, tokens per second)
+
+
+def take(buckets: List[Bucket]) -> Tuple[Optional[str], float]:
+    """
+    Take one token from every bucket, or from none: (None, 0) when taken, else
+    the scope of the first empty bucket and seconds until it has a token.
+    """
+    cache = _cache()
+    now = time.time()
+    with _lock:
+        keys = [f'{_PREFIX}:bucket:{key}' for _, key, _, _ in buckets]
+        stored = cache.get_many(keys)
+        levels = []
+        for cache_key, (scope, _, capacity, per_second) in zip(keys, buckets):
+            tokens, stamp = stored.get(cache_key) or (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - stamp) * per_second)
+            if tokens < 1:
+                return scope, (1 - tokens) / per_second
+            levels.append(tokens)
+        for cache_key, tokens, (_, _, capacity, per_second) in zip(keys, levels, buckets):
+            ttl = math.ceil(capacity / per_second) + 1  # a bucket idle this long is full again
+            cache.set(cache_key, (tokens - 1, now), ttl)
+    return None, 0.0
+
+
+def _count(scope: str, outcome: str) -> None:
+    cache = _cache()
+    key = f'{_PREFIX}:count:{scope}:{outcome}'
+    try:
+        cache.add(key, 0, None)
+        cache.incr(key)
+    except ValueError:  # evicted between add and incr
+        cache.set(key, 1, None)
+
+
+def _outcomes(scope: str) -> Tuple[str, ...]:
+    # Most admitted requests never reach the provider (cache hits, local fallbacks),
+    # so upstream admissions are the gate's own 'admitted' counter, not a throttle count
+    return ('throttled',) if scope == 'upstream' else ('allowed', 'throttled')
+
+
+def stats() -> Dict[str, Any]:
+    """Configured rates, allowed/throttled counts per scope and the upstream gate."""
+    keys = [f'{_PREFIX}:count:{scope}:{outcome}' for scope in SCOPES for outcome in _outcomes(scope)]
+    counts = _cache().get_many(keys)
+    return {
+        'enabled': settings.AI_THROTTLE_ENABLED,
+        'rates': settings.AI_THROTTLE_RATES,
+        'counts': {
+            scope: { outcome: counts.get(f'{_PREFIX}:count:{scope}:{outcome}', 0) for outcome in _outcomes(scope) }
+            for scope in SCOPES
+        },
+        'upstream': health.upstream.snapshot(),
+    }
+
+
+class AIRateThrottle(BaseThrottle):
+    """Per-user/IP and global token buckets, plus back-pressure from the upstream gate."""
+
+    def allow_request(self, request, view) -> bool:
+        self.retry_after: Optional[float] = None
+        if not settings.AI_THROTTLE_ENABLED:
+            return True
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            scope, ident = 'user', user.pk
+        else:
+            scope, ident = 'anon', self.get_ident(request)
+        if health.upstream.saturated():
+            _count('upstream', 'throttled')
+            self.retry_after = 1.0
+            return False
+        buckets = []
+        for scope, key in ((scope, f'{scope}:{ident}'), ('global', 'global')):
+            rate = parse_rate(settings.AI_THROTTLE_RATES.get(scope))
+            if rate is not None:
+                buckets.append((scope, key, *rate))
+        empty, wait = take(buckets)
+        if empty is not None:
+            _count(empty, 'throttled')
+            self.retry_after = wait
+            return False
+        for scope, *_ in buckets:
+            _count(scope, 'allowed')
+        return True
+
+    def wait(self) -> Optional[float]:
+        return self.retry_after
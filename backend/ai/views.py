@@ -1,14 +1,25 @@
 from rest_framework import permissions, views, status
 from rest_framework.response import Response
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
 import os
-import requests
 import random
 import uuid
 from datetime import datetime, timedelta
-from pathlib import Path
-from assessments.models import Assessment
+from assessments.models import Assessment, event_date_for
+from .provider import get_client, run_sync, Completion, CircuitOpen, ProviderTimeout, ProviderConnectionError
+from . import cache as completion_cache, chat_store, dedup, health, question_bank, schedule_batch, scheduler, summarizer
+from .models import ChatThread
+from .throttling import AIRateThrottle, stats as throttle_stats
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.http import StreamingHttpResponse
+from jobs import queue as jobs_queue
 from rest_framework import serializers
 from typing import Dict, Any, List, Optional, Union
 
@@ -29,36 +40,14 @@ def randomize_quiz_options(question_data: Dict[str, Any]) -> Dict[str, Any]:
     
     return question_data
 
-def _get_ai_api_key() -> str | None:
-    # Some editors add a UTF-8 BOM (\ufeff) at the start of files/env values.
-    # Requests encodes HTTP headers as latin-1; a BOM in the key breaks header encoding.
-    def _sanitize(value: str | None) -> str | None:
-        if value is None:
-            return None
-        # Strip BOM and whitespace/newlines
-        return value.lstrip('\ufeff').strip()
-
-    key = _sanitize(os.getenv('OPENROUTER_API_KEY') or os.getenv('OPENAI_API_KEY'))
-    if key:
-        return key
-    try:
-        ai_dir = Path(__file__).resolve().parent
-        ai_key_path = ai_dir / 'openrouter.key'
-        if ai_key_path.exists():
-            return _sanitize(ai_key_path.read_text(encoding='utf-8'))
-        backend_dir = ai_dir.parent
-        backend_key_path = backend_dir / 'openrouter.key'
-        if backend_key_path.exists():
-            return _sanitize(backend_key_path.read_text(encoding='utf-8'))
-    except Exception:
-        pass
-    return None
-
-
 class AIRecommendView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [AIRateThrottle]
 
     def post(self, request):
+        return run_sync(self.post_steps(request))
+
+    def post_steps(self, request):
         prompt = request.data.get('prompt') or 'öğrenci için kariyer öner'
         
         tyt_target = request.data.get('tyt_target', '')
@@ -66,29 +55,21 @@ class AIRecommendView(views.APIView):
         ranking_goal = request.data.get('ranking_goal', '')
         subjects_interest = request.data.get('subjects_interest', [])
         
-        api_key = _get_ai_api_key()
+        client = get_client()
+        api_key = client.api_key
         if api_key:
             try:
-                provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-                headers = {
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json',
-                    'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                    'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-                }
-                
                 enhanced_prompt = self._create_career_recommendation_prompt(
                     prompt, tyt_target, ayt_target, ranking_goal, subjects_interest
                 )
                 
                 payload = {
-                    'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
                     'messages': [ { 'role': 'user', 'content': enhanced_prompt } ],
                     'response_format': { 'type': 'json_object' },
                     'temperature': 0.3,
                     'max_tokens': 1000,
                 }
-                resp = requests.post(provider_url, json=payload, headers=headers, timeout=12)
+                resp = yield Completion(payload, timeout=12, endpoint='recommend')
                 if resp.ok:
                     response_data = resp.json()
                     content = response_data.get('choices', [{}])[0].get('message', {}).get('content') or '{}'
@@ -178,25 +159,38 @@ class AIRecommendView(views.APIView):
 
 class AISummarizeView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [AIRateThrottle]
+    # 'extractive' answers locally (TextRank); 'abstractive' asks the model. Overridable per request.
+    MODE = os.getenv('SUMMARIZE_MODE', 'extractive')
+    # Longer texts are summarized chunk by chunk, then the chunk summaries are summarized
+    CHUNK_CHARS = int(os.getenv('SUMMARIZE_CHUNK_CHARS', '4000'))
+    MAX_CHARS = int(os.getenv('SUMMARIZE_MAX_CHARS', '200000'))
+    # Abstractive long mode: model calls in flight at once, and estimated tokens (prompt + output) for all calls
+    CONCURRENCY = int(os.getenv('SUMMARIZE_CONCURRENCY', '4'))
+    TOKEN_BUDGET = int(os.getenv('SUMMARIZE_TOKEN_BUDGET', '32000'))
+    MAP_TOKENS = int(os.getenv('SUMMARIZE_MAP_TOKENS', '250'))
+    PROMPT_OVERHEAD = 150
 
     def post(self, request):
+        return run_sync(self.post_steps(request))
+
+    def post_steps(self, request):
         raw_text = (request.data.get('text') or '').strip()
-        # Enforce a reasonable max length to avoid echoing long text and control cost
-        if len(raw_text) > 4000:
-            raw_text = raw_text[:4000]
+        if len(raw_text) > self.MAX_CHARS:
+            return Response({ 'error': f'Metin en fazla {self.MAX_CHARS} karakter olabilir' }, status=status.HTTP_400_BAD_REQUEST)
+        mode = str(request.data.get('mode') or self.MODE).strip().lower()
+        if len(raw_text) > self.CHUNK_CHARS:
+            return (yield from self._long_summary_steps(raw_text, mode))
         # Minimal de-duplication/whitespace normalization
         import re as _re
         text = _re.sub(r"\s+", " ", raw_text)
-        api_key = _get_ai_api_key()
+        if mode != 'abstractive':
+            # Split before whitespace collapsing so line breaks still end sentences
+            return Response({ 'summary': self._local_extractive_summary(raw_text) or text[:200], 'source': 'local_extractive' })
+        client = get_client()
+        api_key = client.api_key
         if api_key and text:
             try:
-                provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-                headers = {
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json',
-                    'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                    'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-                }
                 prompt = (
                     "Aşağıdaki metni gerçekten ÖZETLE ve YENİDEN İFADE ET.\n"
                     "- Türkçe, maddeler halinde, 5-8 madde.\n"
@@ -206,15 +200,11 @@ class AISummarizeView(views.APIView):
                     f"METİN:\n{text}"
                 )
                 payload = {
-                    'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
                     'messages': [ { 'role': 'system', 'content': 'Kısa, maddeli, özgün Türkçe ÖZET üret. Metni kopyalama.' }, { 'role': 'user', 'content': prompt } ],
                     'temperature': 0.2,
                     'max_tokens': int(os.getenv('SUMMARIZE_MAX_TOKENS', '400')),
                 }
-                resp = requests.post(provider_url, json=payload, headers=headers, timeout=20)
-                if resp.status_code == 402:
-                    payload['max_tokens'] = max(150, int(payload['max_tokens']) // 2)
-                    resp = requests.post(provider_url, json=payload, headers=headers, timeout=15)
+                resp = yield Completion(payload, timeout=20, endpoint='summarize')
                 if resp.ok:
                     content = resp.json().get('choices', [{}])[0].get('message', {}).get('content') or ''
                     # Basic check: if model echoed the input, fall back to extractive summary
@@ -229,92 +219,134 @@ class AISummarizeView(views.APIView):
         # No API key: use local summarizer (extractive + bullets)
         return Response({ 'summary': self._local_extractive_summary(text) or text[:200] })
 
+    def _long_summary_steps(self, text: str, mode: str):
+        """Map-reduce summary of a text longer than CHUNK_CHARS."""
+        client = get_client()
+        if mode != 'abstractive' or not client.api_key:
+            sentences, chunk_count = summarizer.summarize_long(text, self.CHUNK_CHARS)
+            return Response({ 'summary': summarizer.bullets(sentences) or text[:200], 'source': 'local_extractive', 'chunks': chunk_count })
+
+        # Each chunk costs its prompt and output, and its output is read again by the reduce call
+        reduce_tokens = int(os.getenv('SUMMARIZE_MAX_TOKENS', '400'))
+        per_chunk = summarizer.estimate_tokens('x' * self.CHUNK_CHARS) + self.PROMPT_OVERHEAD + 2 * self.MAP_TOKENS
+        max_chunks = max(1, (self.TOKEN_BUDGET - reduce_tokens - self.PROMPT_OVERHEAD) // per_chunk)
+        chunks = summarizer.chunk_text(text, self.CHUNK_CHARS)
+        condensed = len(chunks) > max_chunks
+        if condensed:
+            # Over budget: keep the best-ranked sentences locally before spending tokens
+            text = summarizer.condense(text, int(max_chunks * self.CHUNK_CHARS * 0.9), self.CHUNK_CHARS)
+            chunks = summarizer.chunk_text(text, self.CHUNK_CHARS)[:max_chunks]
+
+        partials: List[str] = []
+        for start in range(0, len(chunks), self.CONCURRENCY):
+            wave = chunks[start:start + self.CONCURRENCY]
+            responses = yield [
+                Completion(self._chunk_payload(chunk, start + i + 1, len(chunks)), timeout=20, endpoint='summarize')
+                for i, chunk in enumerate(wave)
+            ]
+            for chunk, resp in zip(wave, responses):
+                content = ''
+                if not isinstance(resp, Exception) and resp.ok:
+                    content = (resp.json().get('choices', [{}])[0].get('message', {}).get('content') or '').strip()
+                # A failed chunk still contributes, summarized locally
+                partials.append(content if len(content) >= 10 else summarizer.bullets(summarizer.summarize(chunk, 3)))
+
+        combined = "\n".join(partials)
+        summary = ''
+        try:
+            resp = yield Completion(self._reduce_payload(combined, reduce_tokens), timeout=30, endpoint='summarize')
+            if resp.ok:
+                summary = (resp.json().get('choices', [{}])[0].get('message', {}).get('content') or '').strip()
+        except Exception as e:
+            print(f"Summarize reduce failed: {e}")
+        if len(summary) < 10:
+            lines = [line.strip().lstrip('-•*').strip() for line in combined.splitlines()]
+            summary = summarizer.bullets(summarizer.summarize("\n".join(l for l in lines if l), min(10, 3 + len(chunks))))
+        body = { 'summary': summary or text[:200], 'source': 'map_reduce', 'chunks': len(chunks) }
+        if condensed:
+            body['note'] = 'condensed'
+        return Response(body)
+
+    def _chunk_payload(self, chunk: str, index: int, total: int) -> Dict[str, Any]:
+        prompt = (
+            f"Aşağıdaki metin uzun bir belgenin {index}/{total}. bölümü.\n"
+            "- Bu bölümün en önemli noktalarını Türkçe 3-5 kısa madde halinde özetle.\n"
+            "- Sadece maddeleri döndür, metni tekrar etme.\n\n"
+            f"METİN:\n{chunk}"
+        )
+        return {
+            'messages': [ { 'role': 'system', 'content': 'Kısa, maddeli, özgün Türkçe ÖZET üret. Metni kopyalama.' }, { 'role': 'user', 'content': prompt } ],
+            'temperature': 0.2,
+            'max_tokens': self.MAP_TOKENS,
+        }
+
+    def _reduce_payload(self, partials: str, max_tokens: int) -> Dict[str, Any]:
+        prompt = (
+            "Aşağıda uzun bir belgenin bölüm bölüm özetleri var. Bunları birleştirerek TÜM belgenin özetini çıkar.\n"
+            "- Türkçe, maddeler halinde, 6-10 madde.\n"
+            "- Tekrarları at, en önemli kavramları koru.\n"
+            "- Sadece ÖZET döndür.\n\n"
+            f"BÖLÜM ÖZETLERİ:\n{partials}"
+        )
+        return {
+            'messages': [ { 'role': 'system', 'content': 'Kısa, maddeli, özgün Türkçe ÖZET üret. Metni kopyalama.' }, { 'role': 'user', 'content': prompt } ],
+            'temperature': 0.2,
+            'max_tokens': max_tokens,
+        }
+
     def _local_extractive_summary(self, text: str) -> str:
         try:
-            raw = (text or '').strip()
-            if not raw:
-                return ''
-            # Split into sentences (very lightweight Turkish-friendly splitter)
-            import re
-            sentences = [s.strip() for s in re.split(r"(?<=[\.!?])\s+|\n+", raw) if s and len(s.strip()) > 0]
-            if not sentences:
-                return raw[:200]
-            # Build term frequency excluding very short/common tokens
-            tokens = re.findall(r"[A-Za-zÇĞİÖŞÜçğıöşü0-9']+", raw.lower())
-            stop = set(['ve','ile','da','de','ki','bu','şu','o','bir','çok','az','için','gibi','olan','olarak','the','a','an','to','of','in','on','at','is','are','was','were'])
-            freq = {}
-            for t in tokens:
-                if len(t) < 3 or t in stop:
-                    continue
-                freq[t] = freq.get(t, 0) + 1
-            # Score sentences by token frequency
-            def score_sentence(s: str) -> float:
-                words = re.findall(r"[A-Za-zÇĞİÖŞÜçğıöşü0-9']+", s.lower())
-                if not words:
-                    return 0.0
-                return sum(freq.get(w, 0) for w in words) / (len(words) + 1e-6)
-            scored = [(score_sentence(s), idx, s) for idx, s in enumerate(sentences)]
-            scored.sort(key=lambda x: (-x[0], x[1]))
-            # Select top 3-6 sentences depending on length
-            target = 5 if len(sentences) > 8 else min(3, len(sentences))
-            top = sorted(scored[:target], key=lambda x: x[1])
-            bullets = [f"- {s.strip()}" for _, _, s in top]
-            return "\n".join(bullets)
+            return summarizer.bullets(summarizer.summarize(text)) or (text or '').strip()[:200]
         except Exception:
             return text[:200]
 
 
+def _weak_topics(request) -> List[str]:
+    """Topics of the user's last quiz result; the scheduler gives them green hours first."""
+    if not hasattr(request, 'user') or not request.user.is_authenticated:
+        return []
+    last_quiz = Assessment.objects.filter(user=request.user, kind=Assessment.QUIZ_RESULT).order_by('-created_at').first()  # type: ignore[attr-defined]
+    if not last_quiz:
+        return []
+    topics = ((last_quiz.data or {}).get('topics') or '').strip()
+    return [t.strip() for t in topics.split(',') if t.strip()]
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class AIStudyScheduleView(views.APIView):
     permission_classes = [permissions.AllowAny]  # Public; CSRF-exempt for frontend POST
+    throttle_classes = [AIRateThrottle]
+    # 'optimal' (solver), 'greedy' (bitmask pass) or 'ai' (ask the model first); overridable per request
+    MODE = os.getenv('SCHEDULE_MODE', 'optimal')
 
     def post(self, request):
+        if jobs_queue.wants_background(request):
+            return jobs_queue.accepted(jobs_queue.enqueue('schedule', request))
+        return run_sync(self.post_steps(request))
+
+    def post_steps(self, request):
         courses = (request.data.get('courses') or '').strip()
         subjects = request.data.get('subjects') or []
-        available_days = request.data.get('available_days') or ['Pzt','Sal','Çar','Per','Cum']
+        available_days = request.data.get('available_days') or scheduler.DEFAULT_DAYS
         cell_states = request.data.get('cell_states') or {}  # {"Pzt-8": "green"|"yellow"|"red"}
         day_states = request.data.get('day_states') or {}    # {"Pzt": "green"|"yellow"|"red"}
-        preferences = request.data.get('preferences', {})
-        study_goals = request.data.get('goals', '')
+        mode = str(request.data.get('mode') or self.MODE).strip().lower()
         
-        last_quiz = None
-        weak_topics: list[str] = []
-        strong_topics: list[str] = []
-        
-        if hasattr(request, 'user') and request.user.is_authenticated:
-            last_quiz = Assessment.objects.filter(user=request.user, title__icontains='QuizResult').order_by('-created_at').first()  # type: ignore[attr-defined]
-            if last_quiz:
-                data = last_quiz.data or {}
-                topics = (data.get('topics') or '').strip()
-                weak_topics = [t.strip() for t in topics.split(',') if t.strip()]
-                strong_topics = ['temel konular', 'alıştırmalar']
-
-        subj_list: list[tuple[str,int]] = []
-        try:
-            for s in subjects:
-                if isinstance(s, dict):
-                    name = (s.get('name') or '').strip()
-                    hours = int(s.get('hours') or 0)
-                    if name and hours > 0:
-                        subj_list.append((name, hours))
-        except Exception:
-            pass
-    
-        if not subj_list:
-            fallback = [s.strip() for s in (courses or '').split(',') if s.strip()] or ['Genel Çalışma']
-            subj_list = [(n, 2) for n in fallback]
+        weak_topics = _weak_topics(request)
+
+        subj_list = scheduler.parse_subjects(subjects, courses)
 
-        # Try AI-powered scheduling first if key exists
-        api_key = _get_ai_api_key()
-        if api_key and subj_list:
+        print(f"Generating schedule for {len(subj_list)} subjects with {len(cell_states)} cell states ({mode})")
+
+        # Local plan respects availability (never red); the solver places every hour the grid has room for
+        result = scheduler.plan(subj_list, cell_states, day_states, available_days, weak_topics,
+                                'greedy' if mode == 'greedy' else 'optimal')
+
+        # Ask the model only when asked to, or when the local plan could not place every hour
+        client = get_client()
+        api_key = client.api_key
+        if api_key and subj_list and (mode == 'ai' or result.unplaced):
             try:
-                provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-                headers = {
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json',
-                    'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                    'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-                }
                 import json
                 # Compact availability summary by priority and day
                 def summarize_availability():
@@ -340,13 +372,12 @@ class AIStudyScheduleView(views.APIView):
                     "ÇIKTI ŞEMASI:\n{\n  \"schedule\": [ { \"day\": \"Pzt\", \"items\": [\"Matematik 09:00-10:00\"] } ],\n  \"tips\": [\"kısa ipucu\"]\n}"
                 )
                 payload = {
-                    'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
                     'messages': [{ 'role': 'user', 'content': prompt }],
                     'response_format': { 'type': 'json_object' },
                     'temperature': 0.2,
                     'max_tokens': 1400,
                 }
-                resp = requests.post(provider_url, json=payload, headers=headers, timeout=20)
+                resp = yield Completion(payload, timeout=20, endpoint='schedule')
                 if resp.ok:
                     data = resp.json().get('choices', [{}])[0].get('message', {}).get('content') or '{}'
                     try:
@@ -372,7 +403,8 @@ class AIStudyScheduleView(views.APIView):
                             return cnt
                         total_needed = sum(h for _, h in subj_list)
                         total_scheduled = sum(count_hours(d.get('items') or []) for d in ai_schedule)
-                        if ok and total_scheduled >= min(total_needed, 1):
+                        # Outside 'ai' mode the model has to beat the local plan
+                        if ok and total_scheduled >= min(total_needed, 1) and (mode == 'ai' or total_scheduled > result.hours_scheduled):
                             tips = parsed.get('tips') or []
                             return Response({ 'schedule': ai_schedule, 'tips': tips[:6], 'source': 'ai_generated', 'hours_needed': total_needed, 'hours_scheduled': total_scheduled })
                     except Exception:
@@ -380,409 +412,22 @@ class AIStudyScheduleView(views.APIView):
             except Exception:
                 pass
 
-        print(f"Generating schedule for {len(subj_list)} subjects with {len(cell_states)} cell states")
-        
-        # Always use smart algorithm that respects availability
-        # Kırmızıyı asla kullanma; kapasite yetmezse uyarı döndür
-        def _capacity(slots_map):
-            # count distinct slot keys
-            return len({ f"{d}-{h}" for pr in ['green','yellow'] for (d,h) in slots_map.get(pr, []) })
-
-        tentative_slots = self._get_available_slots(cell_states, day_states, available_days, list(range(8,22)))
-        needed_hours = sum(h for _, h in subj_list)
-        # remove red unconditionally
-        tentative_slots['red'] = []
-        # monkey-patch available_slots provider inside generator via wrapper
-        original_get = self._get_available_slots
-        def _patched_get(cell_states_p, day_states_p, available_days_p, all_hours_p):
-            return tentative_slots
-        self._get_available_slots = _patched_get  # type: ignore[assignment]
-
-        smart_schedule = self._generate_smart_schedule_with_availability(
-            subj_list, available_days, cell_states, day_states, weak_topics, strong_topics, preferences
-        )
-        # restore
-        self._get_available_slots = original_get  # type: ignore[assignment]
-        
-        # Validate that all hours are scheduled
-        total_hours_needed = sum(hours for _, hours in subj_list)
-        total_hours_scheduled = sum(len(day['items']) for day in smart_schedule)
-        
-        print(f"Total hours needed: {total_hours_needed}, scheduled: {total_hours_scheduled}")
-        
-        # If we couldn't schedule all hours, try to force schedule the remaining
-        if total_hours_scheduled < total_hours_needed:
-            print(f"Warning: Only scheduled {total_hours_scheduled}/{total_hours_needed} hours. Trying to force schedule remaining hours.")
-            # Add a warning tip to inform the user
-            fallback_tips = [
-                f"Uyarı: Sadece {total_hours_scheduled}/{total_hours_needed} saat planlanabildi. Daha fazla müsait saat eklemeyi deneyin.",
-                "Yeşil saatlerde daha verimli çalışırsınız",
-                "2'şerli ders blokları odaklanmanızı artırır", 
-                "Her 3-4 saatte bir 15-30 dakika mola verin",
-                "Zayıf konularınıza yeşil saatlerde odaklanın",
-                "Düzenli tekrarlar bilgiyi kalıcı hale getirir"
-            ]
-            # Do NOT use red unless strictly required; attempt to place remaining only in yellow if green is exhausted
-        else:
-            fallback_tips = [
-                "Yeşil saatlerde daha verimli çalışırsınız",
-                "2'şerli ders blokları odaklanmanızı artırır", 
-                "Her 3-4 saatte bir 15-30 dakika mola verin",
-                "Zayıf konularınıza yeşil saatlerde odaklanın",
-                "Düzenli tekrarlar bilgiyi kalıcı hale getirir"
-            ]
-        
-        if weak_topics:
-            fallback_tips.insert(0, f"{', '.join(weak_topics[:2])} konularına daha fazla zaman ayırın")
-        
-        return Response({ 
-            'schedule': smart_schedule,
-            'tips': fallback_tips[:6],
-            'source': 'smart_algorithm_generated',
-            'hours_needed': total_hours_needed,
-            'hours_scheduled': total_hours_scheduled
-        })
-
-    def _generate_smart_schedule_with_availability(self, subj_list, available_days, cell_states, day_states, weak_topics, strong_topics, preferences):
-        """
-        Generate a complete schedule respecting user availability
-        """
-        base_schedule = [
-            { 'day': 'Pzt', 'items': [] },
-            { 'day': 'Sal', 'items': [] },
-            { 'day': 'Çar', 'items': [] },
-            { 'day': 'Per', 'items': [] },
-            { 'day': 'Cum', 'items': [] },
-            { 'day': 'Cmt', 'items': [] },
-            { 'day': 'Paz', 'items': [] },
-        ]
-        
-        all_hours = list(range(8, 22))  # 08:00 to 21:00
-        
-        # Get available slots based on user's cell states
-        available_slots = self._get_available_slots(cell_states, day_states, available_days, all_hours)
-        
-        print(f"Available slots: {len(available_slots)}")
-        for priority, slots in available_slots.items():
-            print(f"  {priority}: {len(slots)} slots")
-        
-        # Calculate total hours needed
-        total_hours_needed = sum(hours for _, hours in subj_list)
-        print(f"Total hours needed: {total_hours_needed}")
-        
-        # Sort subjects by priority (weak topics first)
-        def get_priority(name: str) -> int:
-            if weak_topics and any(weak.lower() in name.lower() for weak in weak_topics):
-                return 1
-            return 2
-        
-        subj_list.sort(key=lambda x: (get_priority(x[0]), -x[1]))
-        
-        # Track used slots to avoid conflicts
-        used_slots = set()
-        
-        # Place all subjects in order of priority
-        for subject_tuple in subj_list:
-            subject_name, total_hours = subject_tuple
-            remaining_hours = total_hours
-            print(f"\nScheduling {subject_name}: {total_hours} hours (Priority: {get_priority(subject_name)})")
-            
-            # For subjects with 2+ hours, create 2-hour blocks
-            if total_hours >= 2:
-                if total_hours % 2 == 0:
-                    # Even hours: create all 2-hour blocks
-                    while remaining_hours >= 2:
-                        before_placement = remaining_hours
-                        remaining_hours = self._place_consecutive_hours(
-                            base_schedule, subject_name, remaining_hours, available_slots, used_slots, 2
-                        )
-                        # If no progress, break to avoid infinite loop
-                        if remaining_hours == before_placement:
-                            break
-                else:
-                    # Odd hours: create 2-hour blocks + 1 single hour
-                    target_blocks = (total_hours - 1) // 2
-                    blocks_to_place = target_blocks * 2
-                    
-                    # Place 2-hour blocks first
-                    while remaining_hours > 1 and blocks_to_place > 0:
-                        before_placement = remaining_hours
-                        remaining_hours = self._place_consecutive_hours(
-                            base_schedule, subject_name, min(2, remaining_hours), available_slots, used_slots, 2
-                        )
-                        if remaining_hours == before_placement:
-                            break
-                        blocks_to_place -= 2
-        
-            # Place remaining single hours
-            if remaining_hours > 0:
-                before_placement = remaining_hours
-                remaining_hours = self._place_single_hours(
-                    base_schedule, subject_name, remaining_hours, available_slots, used_slots
-                )
-                # If still can't place, try allowing same day placement
-                if remaining_hours == before_placement and remaining_hours > 0:
-                    remaining_hours = self._force_place_remaining_hours(
-                        base_schedule, subject_name, remaining_hours, available_slots, used_slots
-                    )
-            
-            if remaining_hours > 0:
-                print(f"  WARNING: Could not schedule {remaining_hours} hours for {subject_name}")
-        
-        # Add some breaks if requested
-        self._add_study_breaks(base_schedule, used_slots)
-        
-        # Final validation - try to place any remaining hours with a more aggressive approach
-        for subject_tuple in subj_list:
-            subject_name, total_hours = subject_tuple
-            # Count how many hours were actually scheduled for this subject
-            scheduled_hours = 0
-            for day_schedule in base_schedule:
-                for item in day_schedule['items']:
-                    if subject_name in item and '-' in item and ':' in item:
-                        scheduled_hours += 1
-            
-            remaining_hours = total_hours - scheduled_hours
-            if remaining_hours > 0:
-                print(f"Final attempt to schedule remaining {remaining_hours} hours for {subject_name}")
-                # Try one last aggressive placement
-                remaining_hours = self._force_place_remaining_hours(
-                    base_schedule, subject_name, remaining_hours, available_slots, used_slots
-                )
-        
-        return base_schedule
-    
-    def _get_available_slots(self, cell_states, day_states, available_days, all_hours):
-        """
-        Get available time slots organized by priority
-        """
-        slots = {
-            'green': [],    # Most preferred
-            'yellow': [],   # Moderately preferred
-            'red': []       # Least preferred (only if desperate)
-        }
-        
-        for day in available_days:
-            for hour in all_hours:
-                slot_key = f"{day}-{hour}"
-                
-                # Check specific cell state first
-                if slot_key in cell_states:
-                    state = cell_states[slot_key]
-                # Fall back to day state
-                elif day in day_states:
-                    state = day_states[day]
-                # Default availability for work hours
-                elif 9 <= hour <= 17:  # Work hours
-                    if hour in [9, 10, 14, 15]:  # Prime study hours
-                        state = 'green'
-                    elif hour in [11, 12, 16, 17]:  # Good study hours
-                        state = 'yellow'
-                    else:
-                        state = 'yellow'
-                else:
-                    state = 'red'  # Early morning/late evening
-                
-                slots[state].append((day, hour))
-        
-        return slots
-    
-    def _place_consecutive_hours(self, schedule, subject_name, remaining_hours, available_slots, used_slots, block_size=2):
-        """
-        Try to place consecutive hour blocks (e.g., 2-hour sessions)
-        Only move to next priority when current priority is exhausted
-        """
-        def has_free_block(slots_list, size):
-            # any consecutive unused block exists in these slots?
-            by_day = {}
-            for d, h in slots_list:
-                by_day.setdefault(d, []).append(h)
-            for d, hours in by_day.items():
-                hours.sort()
-                for i in range(len(hours) - size + 1):
-                    block = [(d, hh) for hh in hours[i:i+size]]
-                    if all(block[j][1] + 1 == block[j+1][1] for j in range(len(block)-1)) and not any(f"{dd}-{hh}" in used_slots for dd, hh in block):
-                        return True
-            return False
-
-        for priority in ['green', 'yellow', 'red']:
-            if remaining_hours < block_size:
-                break
-                
-            slots = available_slots[priority]
-            blocks_placed = 0
-            
-            for day in ['Pzt', 'Sal', 'Çar', 'Per', 'Cum', 'Cmt', 'Paz']:
-                if remaining_hours < block_size:
-                    break
-                    
-                day_slots = [(d, h) for d, h in slots if d == day]
-                day_slots.sort(key=lambda x: x[1])  # Sort by hour
-                
-                # Check if this day already has this subject (avoid consecutive same subject)
-                day_schedule = next(d for d in schedule if d['day'] == day)
-                has_same_subject = any(subject_name in item for item in day_schedule['items'])
-                
-                for i in range(len(day_slots) - block_size + 1):
-                    # Check if we can create a consecutive block
-                    block = day_slots[i:i + block_size]
-                    hours = [h for _, h in block]
-                    
-                    # Check if hours are consecutive and not used
-                    if (all(hours[j] + 1 == hours[j + 1] for j in range(len(hours) - 1)) and
-                        not any(f"{d}-{h}" in used_slots for d, h in block)):
-                        
-                        # Avoid placing same subject on same day if possible
-                        if has_same_subject and blocks_placed == 0:
-                            continue
-                            
-                        # Place the block
-                        start_hour = hours[0]
-                        end_hour = hours[-1] + 1
-                        session = f"{subject_name} {str(start_hour).zfill(2)}:00-{str(end_hour).zfill(2)}:00"
-                        
-                        day_schedule['items'].append(session)
-                        
-                        # Mark slots as used
-                        for d, h in block:
-                            used_slots.add(f"{d}-{h}")
-                        
-                        remaining_hours -= block_size
-                        blocks_placed += 1
-                        print(f"    Placed {block_size}h block: {session} [{priority}]")
-                        break
-            
-            # Only move to next priority if we couldn't place any more blocks in current priority
-            # Only proceed to next priority if there are truly no free blocks left in this priority
-            if has_free_block(slots, block_size) and remaining_hours >= block_size:
-                # Try again within the same priority to fully exhaust it
-                return self._place_consecutive_hours(schedule, subject_name, remaining_hours, {priority: slots}, used_slots, block_size)
-            # else continue to next priority
-        
-        return remaining_hours
-    
-    def _place_single_hours(self, schedule, subject_name, remaining_hours, available_slots, used_slots):
-        """
-        Place single hour sessions - don't move to next priority until current is exhausted
-        """
-        def has_free_slot(slots_list):
-            return any(f"{d}-{h}" not in used_slots for d, h in slots_list)
-
-        for priority in ['green', 'yellow', 'red']:
-            if remaining_hours <= 0:
-                break
-                
-            slots = available_slots[priority]
-            hours_placed = 0
-            
-            for day, hour in slots:
-                if remaining_hours <= 0:
-                    break
-                    
-                slot_key = f"{day}-{hour}"
-                if slot_key not in used_slots:
-                    # Check if this day already has this subject (avoid consecutive same subject)
-                    day_schedule = next(d for d in schedule if d['day'] == day)
-                    has_same_subject = any(subject_name in item for item in day_schedule['items'])
-                    
-                    # Try to place on different day first if possible
-                    if has_same_subject and hours_placed == 0:
-                        continue
-                        
-                    session = f"{subject_name} {str(hour).zfill(2)}:00-{str(hour+1).zfill(2)}:00"
-                    day_schedule['items'].append(session)
-                    
-                    used_slots.add(slot_key)
-                    remaining_hours -= 1
-                    hours_placed += 1
-                    print(f"    Placed 1h session: {session} [{priority}]")
-            
-            # Only move to next priority if there are truly no free slots left in this priority
-            if has_free_slot(slots) and remaining_hours > 0:
-                # Try more in same priority until exhausted
-                return self._place_single_hours(schedule, subject_name, remaining_hours, {priority: slots}, used_slots)
-            # else continue to next priority
-        
-        return remaining_hours
-    
-    def _force_place_remaining_hours(self, schedule, subject_name, remaining_hours, available_slots, used_slots):
-        """
-        Force place remaining hours even if it means same subject on same day
-        """
-        for priority in ['green', 'yellow', 'red']:
-            if remaining_hours <= 0:
-                break
-                
-            slots = available_slots[priority]
-            
-            for day, hour in slots:
-                if remaining_hours <= 0:
-                    break
-                    
-                slot_key = f"{day}-{hour}"
-                if slot_key not in used_slots:
-                    session = f"{subject_name} {str(hour).zfill(2)}:00-{str(hour+1).zfill(2)}:00"
-                    
-                    day_schedule = next(d for d in schedule if d['day'] == day)
-                    day_schedule['items'].append(session)
-                    
-                    used_slots.add(slot_key)
-                    remaining_hours -= 1
-                    print(f"    FORCED placement: {session} [{priority}]")
-        
-        return remaining_hours
-    
-    def _add_study_breaks(self, schedule, used_slots):
-        """
-        Add study breaks where appropriate
-        """
-        for day_schedule in schedule:
-            items = day_schedule['items']
-            if len(items) >= 3:  # Add breaks only if there are multiple sessions
-                items.sort(key=lambda x: self._extract_start_time(x))
-                
-                # Add a break after every 3-4 hours of study
-                study_hours = 0
-                for i, item in enumerate(items[:]):
-                    if study_hours >= 3 and '(Mola)' not in item:
-                        break_time = self._get_break_time_for_item(item)
-                        items.insert(i, f"🟡 Mola (15 dk) {break_time}")
-                        study_hours = 0
-                        break
-                    
-                    if '-' in item and ':' in item:
-                        study_hours += 1
-    
-    def _extract_start_time(self, item):
-        """
-        Extract start time from schedule item
-        """
-        try:
-            if ' ' in item and ':' in item:
-                time_part = item.split(' ')[-1]  # Get last part which should be time
-                if ':' in time_part and '-' in time_part:
-                    start_time_str = time_part.split('-')[0]
-                    return int(start_time_str.split(':')[0])
-        except:
-            pass
-        return 0
-    
-    def _get_break_time_for_item(self, item):
-        """
-        Get break time for an item
-        """
-        try:
-            start_hour = self._extract_start_time(item)
-            break_hour = max(12, start_hour - 1)
-            return f"{str(break_hour).zfill(2)}:30-{str(break_hour).zfill(2)}:45"
-        except:
-            return "12:30-12:45"
+        print(f"Total hours needed: {result.hours_needed}, scheduled: {result.hours_scheduled}")
+        if result.unplaced:
+            print(f"Warning: Only scheduled {result.hours_scheduled}/{result.hours_needed} hours: {result.unplaced}")
+        return Response(scheduler.payload(result, weak_topics))
 
 
 class AIQuizGenerateView(views.APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AIRateThrottle]
 
     def post(self, request):
+        if jobs_queue.wants_background(request):
+            return jobs_queue.accepted(jobs_queue.enqueue('quiz', request))
+        return run_sync(self.post_steps(request))
+
+    def post_steps(self, request):
         try:
             topics = request.data.get('topics', '')
             try:
@@ -795,80 +440,82 @@ class AIQuizGenerateView(views.APIView):
                 return Response({'error': 'Konu girilmesi gereklidir'}, status=status.HTTP_400_BAD_REQUEST)
 
             num_questions = min(max(num_questions, 1), 20)
+
+            # Questions this student was already served, and the ones picked for this quiz,
+            # are both checked for near-duplicates (ai/dedup.py)
+            user = getattr(request, 'user', None)
+            seen = question_bank.seen_index(user)
+            picked = dedup.MinHashIndex()
+
+            # Serve from the pre-generated bank first; the provider is only asked for the rest
+            bank_questions = question_bank.take(topics, difficulty, num_questions, exclude=seen, picked=picked)
+            question_bank.request_refill(topics, difficulty, user)
+            missing = num_questions - len(bank_questions)
             
-            api_key = _get_ai_api_key()
+            client = get_client()
+            api_key = client.api_key
             questions = []
 
-            if api_key and topics:
+            if missing and api_key and topics:
                 print(f"Starting AI generation with key: {api_key[:10]}...")
+                print(f"Model: {client.default_model}")
+                # Several small concurrent completions instead of one long one: they rarely
+                # hit max_tokens, finish sooner, and a bad chunk is retried on its own.
+                pending = self._chunk_sizes(missing)
                 for attempt in range(3):
-                    try:
-                        provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-                        headers = {
-                            'Authorization': f'Bearer {api_key}',
-                            'Content-Type': 'application/json',
-                            'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                            'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-                        }
-                        
-                        current_time = datetime.now().strftime('%Y%m%d%H%M%S')
-                        random_seed = uuid.uuid4().hex[:12]
-                        
-                        topic_specific_prompt = self._create_topic_specific_prompt(topics, difficulty, num_questions, random_seed, current_time)
-                        
-                        payload = {
-                            'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
-                            'messages': [ { 'role': 'user', 'content': topic_specific_prompt } ],
-                            'response_format': { 'type': 'json_object' },
-                            'temperature': 0.5,
-                            'max_tokens': int(os.getenv('QUIZ_MAX_TOKENS', '400')),
-                            'top_p': 0.9,
-                            'frequency_penalty': 0.1,
-                            'presence_penalty': 0.1,
-                        }
-                        
-                        print(f"Attempt {attempt + 1}: Sending request to {provider_url}")
-                        print(f"Model: {payload['model']}")
-                        print(f"Headers: {list(headers.keys())}")
-                        
-                        # Multiple timeout attempts
-                        timeout = 15 if attempt == 0 else 20  # Longer timeout on retries
-                        resp = requests.post(provider_url, json=payload, headers=headers, timeout=timeout)
-
-                        # Handle credit error by retrying with fewer tokens immediately
-                        if resp.status_code == 402:
-                            payload_retry = payload.copy()
-                            payload_retry['max_tokens'] = max(150, int(payload.get('max_tokens', 400)) // 2)
-                            resp = requests.post(provider_url, json=payload_retry, headers=headers, timeout=timeout)
-                        
-                        print(f"Attempt {attempt + 1}: Response status {resp.status_code}")
-                        
-                        if resp.ok:
-                            questions = self._parse_ai_response(resp.json(), num_questions)
-                            if len(questions) >= num_questions:
-                                print(f"AI generation successful on attempt {attempt + 1}: {len(questions)} questions")
-                                break
-                            else:
-                                print(f"Attempt {attempt + 1}: Only got {len(questions)}/{num_questions} questions, retrying...")
-                        else:
+                    print(f"Attempt {attempt + 1}: Sending {len(pending)} chunk(s) {pending} to {client.provider_url}")
+                    # 402 (credit) errors are retried with fewer tokens inside the client
+                    timeout = 15 if attempt == 0 else 20  # Longer timeout on retries
+                    results = yield [
+                        Completion(self._quiz_payload(topics, difficulty, size), timeout=timeout, endpoint='quiz')
+                        for size in pending
+                    ]
+
+                    shortfall = 0
+                    for size, resp in zip(pending, results):
+                        if isinstance(resp, Exception):
+                            print(f"Attempt {attempt + 1}: Chunk of {size} failed: {resp}")
+                            shortfall += size
+                            continue
+                        if not resp.ok:
                             print(f"Attempt {attempt + 1}: API error {resp.status_code}: {resp.text[:200]}...")
-                            
-                    except Exception as e:
-                        print(f"Attempt {attempt + 1}: AI generation failed: {e}")
-                        if attempt < 2:  # Don't sleep on last attempt
-                            import time
-                            time.sleep(1)  # Brief pause before retry
+                            shortfall += size
+                            continue
+                        got = 0
+                        for q in self._parse_ai_response(resp.json(), size):
+                            sig = dedup.signature(q['q'])
+                            if picked.is_duplicate(sig) or seen.is_duplicate(sig):
+                                continue
+                            picked.add(len(bank_questions) + len(questions), sig)
+                            questions.append(q)
+                            got += 1
+                        shortfall += size - got
+
+                    if not shortfall:
+                        print(f"AI generation successful on attempt {attempt + 1}: {len(questions)} questions")
+                        break
+                    if any(isinstance(r, CircuitOpen) for r in results):
+                        # Provider is failing; retrying would only hold the worker
+                        print(f"Attempt {attempt + 1}: AI provider circuit open, giving up")
+                        break
+                    print(f"Attempt {attempt + 1}: Only got {len(questions)}/{missing} questions, retrying {shortfall}...")
+                    pending = self._chunk_sizes(shortfall)
+
+            questions = [randomize_quiz_options(q) for q in bank_questions] + questions
 
             # Do NOT use local/predefined questions. If AI fails, return error.
             if not questions or len(questions) < num_questions:
+                question_bank.put_back(topics, difficulty, bank_questions)
                 return Response({ 'error': 'AI üzerinden quiz oluşturulamadı.', 'questions': [] }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
             # Only save to database if questions were successfully generated
             if questions and hasattr(request, 'user') and request.user.is_authenticated:
+                question_bank.remember_seen(request.user, [picked.get(i) for i in range(len(questions))])
                 try:
                     Assessment.objects.create(  # type: ignore[attr-defined]
                         user=request.user,
                         title='Quiz',
+                        kind=Assessment.QUIZ,
                         score=0,
                         data={ 'topics': topics, 'difficulty': difficulty, 'questions': questions }
                     )
@@ -887,6 +534,27 @@ class AIQuizGenerateView(views.APIView):
                 'questions': []
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    CHUNK_SIZE = int(os.getenv('QUIZ_CHUNK_SIZE', '5'))
+    TOKENS_PER_QUESTION = int(os.getenv('QUIZ_TOKENS_PER_QUESTION', '180'))
+
+    def _chunk_sizes(self, count):
+        """Split ``count`` questions into near-equal chunks of at most CHUNK_SIZE."""
+        chunks = -(-count // max(1, self.CHUNK_SIZE))
+        return [count // chunks + (1 if i < count % chunks else 0) for i in range(chunks)] if count > 0 else []
+
+    def _quiz_payload(self, topics, difficulty, count):
+        current_time = datetime.now().strftime('%Y%m%d%H%M%S')
+        random_seed = uuid.uuid4().hex[:12]
+        return {
+            'messages': [ { 'role': 'user', 'content': self._create_topic_specific_prompt(topics, difficulty, count, random_seed, current_time) } ],
+            'response_format': { 'type': 'json_object' },
+            'temperature': 0.5,
+            'max_tokens': self.TOKENS_PER_QUESTION * count + 100,
+            'top_p': 0.9,
+            'frequency_penalty': 0.1,
+            'presence_penalty': 0.1,
+        }
+
     def _local_quiz_generation(self, topics: str, difficulty: str, count: int):
         try:
             import re
@@ -1210,14 +878,6 @@ class AIQuizGenerateView(views.APIView):
             return questions
             
         try:
-            provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-            headers = {
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json',
-                'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-            }
-            
             # Simpler, more direct prompt
             simple_prompt = (
                 f"{topics} konusunda {difficulty} seviyesinde {num_questions} okul sorusu yaz. "
@@ -1232,7 +892,7 @@ class AIQuizGenerateView(views.APIView):
                 'max_tokens': 1000,
             }
             
-            resp = requests.post(provider_url, json=payload, headers=headers, timeout=15)
+            resp = get_client().chat_completion(payload, timeout=15)
             if resp.ok:
                 questions = self._parse_ai_response(resp.json(), num_questions)
                 print(f"Secondary AI generated {len(questions)} questions")
@@ -1250,25 +910,16 @@ class AIQuizGenerateView(views.APIView):
             return questions
         
         try:
-            provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-            headers = {
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json',
-                'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-            }
-            
             # Very simple emergency prompt
             emergency_prompt = f"{topics} konusu {num_questions} soru JSON format"
             
             payload = {
-                'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
                 'messages': [ { 'role': 'user', 'content': emergency_prompt } ],
                 'temperature': 0.5,
                 'max_tokens': 800,
             }
             
-            resp = requests.post(provider_url, json=payload, headers=headers, timeout=10)
+            resp = get_client().chat_completion(payload, timeout=10)
             if resp.ok:
                 questions = self._parse_ai_response(resp.json(), num_questions)
                 print(f"Emergency AI generated {len(questions)} questions")
@@ -1289,19 +940,26 @@ class AIReportGenerateView(views.APIView):
         date = request.data.get('date', '')
         summary = f'Rapor özeti: {notes[:140]}'
         metrics = { 'math': 72, 'physics': 55, 'chemistry': 63 }
-        assessment = Assessment.objects.create(user=request.user, title=f'Rapor {date or "bugün"}', score=0, data={ 'summary': summary, 'metrics': metrics })  # type: ignore[attr-defined]
+        assessment = Assessment.objects.create(user=request.user, title=f'Rapor {date or "bugün"}', kind=Assessment.REPORT, score=0, data={ 'summary': summary, 'metrics': metrics })  # type: ignore[attr-defined]
         return Response({ 'summary': summary, 'metrics': metrics })
 
 
 class AIExamAnalysisView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [AIRateThrottle]
 
     def post(self, request):
+        if jobs_queue.wants_background(request):
+            return jobs_queue.accepted(jobs_queue.enqueue('exam_analysis', request))
+        return run_sync(self.post_steps(request))
+
+    def post_steps(self, request):
         exam_type = request.data.get('exam_type', 'TYT')
         subjects = request.data.get('subjects', [])  # [{name, net, blank, wrong}]
         goals = request.data.get('goals', '')
 
-        api_key = _get_ai_api_key()
+        client = get_client()
+        api_key = client.api_key
         result = {
             'topics_to_focus': [],
             'study_plan': [],
@@ -1309,13 +967,6 @@ class AIExamAnalysisView(views.APIView):
         }
         if api_key and subjects:
             try:
-                provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-                headers = {
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json',
-                    'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                    'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-                }
                 import json
                 prompt = (
                     "Aşağıdaki öğrenci sınav sonuçlarını analiz et ve SADECE JSON yanıt ver. "
@@ -1323,13 +974,12 @@ class AIExamAnalysisView(views.APIView):
                     f"Sınav: {exam_type}. Hedefler: {goals}. Sonuçlar: {json.dumps(subjects, ensure_ascii=False)}."
                 )
                 payload = {
-                    'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
                     'messages': [ { 'role': 'user', 'content': prompt } ],
                     'response_format': { 'type': 'json_object' },
                     'temperature': 0.2,
                     'max_tokens': 1000,
                 }
-                resp = requests.post(provider_url, json=payload, headers=headers, timeout=12)
+                resp = yield Completion(payload, timeout=12, endpoint='exam_analysis')
                 if resp.ok:
                     data = resp.json().get('choices', [{}])[0].get('message', {}).get('content') or '{}'
                     try:
@@ -1358,6 +1008,7 @@ class AIExamAnalysisView(views.APIView):
         Assessment.objects.create(  # type: ignore[attr-defined]
             user=request.user,
             title=f'ExamAnalysis {exam_type}',
+            kind=Assessment.EXAM_ANALYSIS,
             score=0,
             data={ 'exam_type': exam_type, 'subjects': subjects, 'result': result }
         )
@@ -1366,6 +1017,7 @@ class AIExamAnalysisView(views.APIView):
 
 class AIPsychSupportView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [AIRateThrottle]
 
     class _Serializer(serializers.Serializer):
         message = serializers.CharField(allow_blank=True, required=False)
@@ -1373,21 +1025,18 @@ class AIPsychSupportView(views.APIView):
         history = serializers.ListField(child=serializers.DictField(), required=False)
 
     def post(self, request):
+        return run_sync(self.post_steps(request))
+
+    def post_steps(self, request):
         ser = self._Serializer(data=request.data)
         ser.is_valid(raise_exception=True)
         message = ser.validated_data.get('message') or ''  # type: ignore[attr-defined]
         mood = ser.validated_data.get('mood') or ''  # type: ignore[attr-defined]
         history = ser.validated_data.get('history') or []  # type: ignore[attr-defined]
-        api_key = _get_ai_api_key()
+        client = get_client()
+        api_key = client.api_key
         if api_key and (message or mood):
             try:
-                provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-                headers = {
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json',
-                    'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                    'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-                }
                 # Build messages array for chat with short system prompt
                 msgs = [{ 'role': 'system', 'content': 'Kısa, nazik ve pratik destek ver. Klinik teşhis koyma. 4-6 maddelik öneriler ekle. Türkçe yaz.' }]
                 # include brief history if provided
@@ -1399,25 +1048,17 @@ class AIPsychSupportView(views.APIView):
                 user_prompt = f"Duygu/Hal: {mood}\nMesaj: {message}"
                 msgs.append({ 'role': 'user', 'content': user_prompt })
                 payload = {
-                    'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
                     'messages': msgs,
                     'temperature': 0.3,
                     'max_tokens': 600,
                 }
-                resp = requests.post(provider_url, json=payload, headers=headers, timeout=8)
                 # Handle credit/max_tokens errors by retrying with a lower limit
-                if resp.status_code == 402:
-                    try:
-                        payload_retry = { **payload, 'max_tokens': 300 }
-                    except Exception:
-                        payload_retry = payload
-                        payload_retry['max_tokens'] = 300
-                    resp = requests.post(provider_url, json=payload_retry, headers=headers, timeout=8)
+                resp = yield Completion(payload, timeout=8, retry_max_tokens=300, endpoint='psych_support')
                 if resp.ok:
                     content = resp.json().get('choices', [{}])[0].get('message', {}).get('content') or ''
                     # log assessment
                     try:
-                        Assessment.objects.create(user=request.user, title='PsychSupportChat', score=0, data={ 'mood': mood, 'message': message, 'reply': content })  # type: ignore[attr-defined]
+                        Assessment.objects.create(user=request.user, title='PsychSupportChat', kind=Assessment.PSYCH_CHAT, score=0, data={ 'mood': mood, 'message': message, 'reply': content })  # type: ignore[attr-defined]
                     except Exception:
                         pass
                     return Response({ 'support': content })
@@ -1431,91 +1072,82 @@ class AIPsychSupportView(views.APIView):
             "- Su iç ve kısa bir yürüyüş yap\n- Bugün için tek bir küçük hedef belirle"
         )
         try:
-            Assessment.objects.create(user=request.user, title='PsychSupportChat', score=0, data={ 'mood': mood, 'message': message, 'reply': fallback })  # type: ignore[attr-defined]
+            Assessment.objects.create(user=request.user, title='PsychSupportChat', kind=Assessment.PSYCH_CHAT, score=0, data={ 'mood': mood, 'message': message, 'reply': fallback })  # type: ignore[attr-defined]
         except Exception:
             pass
         return Response({ 'support': fallback })
 
 
+class EventStreamRenderer(BaseRenderer):
+    """Lets clients send ``Accept: text/event-stream``; streamed bodies bypass rendering."""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only reached for non-streamed responses (e.g. validation errors)
+        return sse_event(data, event='error')
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    import json
+    prefix = f"event: {event}\n" if event else ''
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class AIChatView(views.APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AIRateThrottle]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+    # Subclass/route flag; otherwise streaming is opt-in with ?stream=1
+    streaming = False
 
     class _Serializer(serializers.Serializer):
         message = serializers.CharField()
         history = serializers.ListField(child=serializers.DictField(), required=False)
 
     def post(self, request):
+        return run_sync(self.post_steps(request))
+
+    def post_steps(self, request):
         ser = self._Serializer(data=request.data)
         ser.is_valid(raise_exception=True)
         message = ser.validated_data['message']  # type: ignore[attr-defined]
         history = ser.validated_data.get('history') or []  # type: ignore[attr-defined]
+        stream = self.streaming or request.query_params.get('stream') in ('1', 'true')
         
-        api_key = _get_ai_api_key()
+        client = get_client()
+        api_key = client.api_key
         
         # For testing purposes, we'll allow chat to work even without API key
         # In production, you should require a valid API key
         if not api_key or api_key.startswith('sk-or-v1-your-api-key') or api_key.startswith('#'):
             # Return a mock response for testing
-            return Response({ 
-                'reply': f'(TEST) AI sohbet yanıtı: "{message}" için yardımcı olabilirim. Bu bir test yanıtıdır, gerçek AI entegrasyonu için geçerli bir API anahtarı gereklidir.' 
-            })
-        
-        # Check if API key is configured properly
-        if not api_key:
-            return Response({ 
-                'reply': 'AI sohbet özelliği henüz yapılandırılmamış. Lütfen yöneticiye OpenRouter API anahtarını backend/openrouter.key dosyasına eklenmesi gerektiğini bildirin.' 
-            })
+            reply = f'(TEST) AI sohbet yanıtı: "{message}" için yardımcı olabilirim. Bu bir test yanıtıdır, gerçek AI entegrasyonu için geçerli bir API anahtarı gereklidir.'
+            return self._stream_reply(reply) if stream else Response({ 'reply': reply })
         
         if api_key and message:
+            payload = {
+                'messages': self._build_messages(message, history),
+                'temperature': 0.7,  # Increased for more natural conversation
+                'max_tokens': 800,   # Increased for more detailed responses
+                'top_p': 0.9,
+            }
+            
+            print(f"Sending chat request to: {client.provider_url}")
+            print(f"Model: {client.default_model}")
+            print(f"Message: {message[:50]}...")
+            
+            if stream:
+                return self._stream_response(payload)
+            
             try:
-                provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-                headers = {
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json',
-                    'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                    'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-                }
-                
-                # Build conversation history
-                msgs = [{'role': 'system', 'content': 'Sen yardımcı bir öğretmensin. Türkçe, açık ve eğitici yanıtlar ver. Öğrencilere sabırla yardım et.'}]
-                
-                # Add recent conversation history
-                for m in history[-12:]:
-                    role = m.get('role') in ('user','assistant') and m.get('role') or 'user'
-                    content = m.get('content') or ''
-                    if content:
-                        msgs.append({'role': role, 'content': content})
-                
-                # Add current message
-                msgs.append({'role': 'user', 'content': message})
-                
-                payload = {
-                    'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
-                    'messages': msgs,
-                    'temperature': 0.7,  # Increased for more natural conversation
-                    'max_tokens': 800,   # Increased for more detailed responses
-                    'top_p': 0.9,
-                }
-                
-                print(f"Sending chat request to: {provider_url}")
-                print(f"Model: {payload['model']}")
-                print(f"Message: {message[:50]}...")
-                
-                resp = requests.post(provider_url, json=payload, headers=headers, timeout=15)
+                # Retry with lower max_tokens if credit error (402)
+                resp = yield Completion(payload, timeout=15, retry_max_tokens=300, endpoint='chat')
                 
                 print(f"API Response Status: {resp.status_code}")
                 
-                # Retry with lower max_tokens if credit error (402)
-                if resp.status_code == 402:
-                    try:
-                        payload_retry = { **payload, 'max_tokens': 300 }
-                    except Exception:
-                        payload_retry = payload
-                        payload_retry['max_tokens'] = 300
-                    resp = requests.post(provider_url, json=payload_retry, headers=headers, timeout=12)
-                    print(f"Retry Response Status: {resp.status_code}")
-                
                 if resp.ok:
                     response_data = resp.json()
                     content = response_data.get('choices', [{}])[0].get('message', {}).get('content') or ''
@@ -1525,37 +1157,117 @@ class AIChatView(views.APIView):
                         return Response({ 'reply': content })
                     else:
                         print("❌ Empty response from AI")
-                        return Response({ 'reply': 'AI den boş yanıt alındı. Lütfen tekrar deneyin.' })
+                        return Response({ 'reply': self.EMPTY_REPLY })
                 else:
-                    error_text = resp.text
-                    print(f"❌ API Error {resp.status_code}: {error_text[:200]}")
-                    
-                    if resp.status_code == 401:
-                        return Response({ 'reply': 'API anahtarı geçersiz. Lütfen yöneticiye OpenRouter API anahtarının güncelleştirilmesi gerektiğini bildirin.' })
-                    elif resp.status_code == 429:
-                        return Response({ 'reply': 'API kullanım limitine ulaşıldı. Lütfen birkaç dakika sonra tekrar deneyin.' })
-                    else:
-                        fallback_reply = (
-                            "Şu an dış servis kısıtlı görünüyor, ama yine de yardımcı olayım.\n"
-                            "- Hedefini küçük adımlara böl\n- 25 dk odak + 5 dk mola (Pomodoro)\n"
-                            "- 4x4 nefes egzersizi dene\n- Bugün tek bir küçük iş seç ve tamamla"
-                        )
-                        return Response({ 'reply': fallback_reply })
-
-            except requests.exceptions.Timeout:
-                print("❌ Request timeout")
-                return Response({ 'reply': 'AI yanıt verme süresi aşıldı. Lütfen tekrar deneyin.' })
-            except requests.exceptions.ConnectionError:
-                print("❌ Connection error")
-                return Response({ 'reply': 'AI servisine bağlanılamıyor. İnternet bağlantınızı kontrol edin.' })
+                    print(f"❌ API Error {resp.status_code}: {resp.text[:200]}")
+                    return Response({ 'reply': self._error_reply(resp.status_code) })
+
             except Exception as e:
-                print(f"❌ Chat error: {e}")
-                import traceback
-                traceback.print_exc()
-                return Response({ 'reply': f'Sohbet sırasında beklenmeyen bir hata oluştu: {str(e)}' })
+                return Response({ 'reply': self._exception_reply(e) })
         
         # If no API key or message
-        return Response({ 'reply': 'Mesaj gönderilemedi. Lütfen tekrar deneyin.' })
+        reply = 'Mesaj gönderilemedi. Lütfen tekrar deneyin.'
+        return self._stream_reply(reply) if stream else Response({ 'reply': reply })
+
+    EMPTY_REPLY = 'AI den boş yanıt alındı. Lütfen tekrar deneyin.'
+
+    def _build_messages(self, message, history):
+        # Build conversation history
+        msgs = [{'role': 'system', 'content': 'Sen yardımcı bir öğretmensin. Türkçe, açık ve eğitici yanıtlar ver. Öğrencilere sabırla yardım et.'}]
+        
+        # Add recent conversation history
+        for m in history[-12:]:
+            role = m.get('role') in ('user','assistant') and m.get('role') or 'user'
+            content = m.get('content') or ''
+            if content:
+                msgs.append({'role': role, 'content': content})
+        
+        # Add current message
+        msgs.append({'role': 'user', 'content': message})
+        return msgs
+
+    def _error_reply(self, status_code):
+        if status_code == 401:
+            return 'API anahtarı geçersiz. Lütfen yöneticiye OpenRouter API anahtarının güncelleştirilmesi gerektiğini bildirin.'
+        elif status_code == 429:
+            return 'API kullanım limitine ulaşıldı. Lütfen birkaç dakika sonra tekrar deneyin.'
+        return (
+            "Şu an dış servis kısıtlı görünüyor, ama yine de yardımcı olayım.\n"
+            "- Hedefini küçük adımlara böl\n- 25 dk odak + 5 dk mola (Pomodoro)\n"
+            "- 4x4 nefes egzersizi dene\n- Bugün tek bir küçük iş seç ve tamamla"
+        )
+
+    def _exception_reply(self, e):
+        if isinstance(e, CircuitOpen):
+            print(f"❌ {e}")
+            return 'AI servisi şu anda yanıt veremiyor. Lütfen biraz sonra tekrar deneyin.'
+        if isinstance(e, ProviderTimeout):
+            print("❌ Request timeout")
+            return 'AI yanıt verme süresi aşıldı. Lütfen tekrar deneyin.'
+        if isinstance(e, ProviderConnectionError):
+            print("❌ Connection error")
+            return 'AI servisine bağlanılamıyor. İnternet bağlantınızı kontrol edin.'
+        print(f"❌ Chat error: {e}")
+        import traceback
+        traceback.print_exc()
+        return f'Sohbet sırasında beklenmeyen bir hata oluştu: {str(e)}'
+
+    # --- Server-Sent Events ---
+    # Each content delta is sent as ``data: {"delta": "..."}``; the stream ends with
+    # ``event: done`` carrying the full ``{"reply": ...}``, the same body as the JSON mode.
+    # Provider errors and fallbacks are sent as a single delta followed by ``done``.
+
+    def _stream_response(self, payload):
+        return self._sse_response(self.event_stream(payload))
+
+    def _stream_reply(self, reply):
+        return self._sse_response(iter([sse_event({ 'delta': reply }), self._done_event([reply])]))
+
+    def _sse_response(self, events):
+        response = StreamingHttpResponse(events, content_type='text/event-stream; charset=utf-8')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # disable proxy buffering (nginx)
+        return response
+
+    def _stream_error_events(self, error):
+        """Events for a stream that failed before any content (exception or non-2xx stream): fallback delta, then done."""
+        if isinstance(error, Exception):
+            reply = self._exception_reply(error)
+        else:
+            print(f"❌ API Error {error.status_code}: {error.text[:200]}")
+            reply = self._error_reply(error.status_code)
+        return [sse_event({ 'delta': reply }), self._done_event([reply])]
+
+    def _done_event(self, parts):
+        return sse_event({ 'reply': ''.join(parts) or self.EMPTY_REPLY }, event='done')
+
+    def event_stream(self, payload):
+        # AsyncAIChatView._async_event_stream is the same loop over the async client
+        try:
+            stream = get_client().open_stream(payload, timeout=15, retry_max_tokens=300)
+        except Exception as e:
+            yield from self._stream_error_events(e)
+            return
+        if not stream.ok:
+            events = self._stream_error_events(stream)
+            stream.close()
+            yield from events
+            return
+        parts: list[str] = []
+        try:
+            for delta in stream:
+                parts.append(delta)
+                yield sse_event({ 'delta': delta })
+        except Exception as e:
+            # Keep what was already streamed; tell the client why it stopped
+            yield sse_event({ 'error': self._exception_reply(e) }, event='error')
+        finally:
+            stream.close()
+        yield self._done_event(parts)
+
+
+class AIChatStreamView(AIChatView):
+    streaming = True
 
 
 class AIChatSaveThreadView(views.APIView):
@@ -1570,34 +1282,22 @@ class AIChatSaveThreadView(views.APIView):
         ser = self._Serializer(data=request.data)
         ser.is_valid(raise_exception=True)
         chat_id = ser.validated_data.get('id')  # type: ignore[attr-defined]
-        title = ser.validated_data.get('title') or 'ChatThread'  # type: ignore[attr-defined]
+        title = ser.validated_data.get('title') or chat_store.DEFAULT_TITLE  # type: ignore[attr-defined]
         history = ser.validated_data['history']  # type: ignore[attr-defined]
         
         # Generate title from first message if not provided
-        if title == 'ChatThread' and history:
-            first_user_msg = None
-            for msg in history:
-                if msg.get('role') == 'user' and msg.get('content'):
-                    first_user_msg = msg.get('content', '').strip()
-                    break
-            if first_user_msg:
-                # Use first 30 chars of first user message as title
-                title = f"Chat: {first_user_msg[:30]}..."
+        if title == chat_store.DEFAULT_TITLE:
+            title = chat_store.title_from(chat_store.clean(history))
         
-        # Update existing chat if id provided and belongs to user
+        # Append new turns to the existing chat if id provided and belongs to user
         if chat_id:
-            try:
-                a = Assessment.objects.get(id=chat_id, user=request.user)  # type: ignore[attr-defined]
-                a.title = title or a.title
-                a.data = { **(a.data or {}), 'history': history, 'type': 'chat' }
-                a.save(update_fields=['title', 'data'])
-                return Response({ 'ok': True, 'id': a.id, 'created_at': a.created_at, 'title': a.title })
-            except Assessment.DoesNotExist:  # type: ignore[attr-defined]
-                pass
+            thread, written = chat_store.save_history(chat_id, request.user, history, title)
+            if thread is not None:
+                return Response({ 'ok': True, 'id': thread.id, 'created_at': thread.created_at, 'title': thread.title, 'written': written })
 
         # Otherwise create new
-        a = Assessment.objects.create(user=request.user, title=title, score=0, data={ 'history': history, 'type': 'chat' })  # type: ignore[attr-defined]
-        return Response({ 'ok': True, 'id': a.id, 'created_at': a.created_at, 'title': a.title })
+        thread = chat_store.create_thread(request.user, title, history)
+        return Response({ 'ok': True, 'id': thread.id, 'created_at': thread.created_at, 'title': thread.title, 'written': thread.message_count })
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -1607,42 +1307,21 @@ class AIChatHistoryView(views.APIView):
     def get(self, request):
         """Get all chat histories for the user"""
         try:
-            # Get all chat threads for the user
-            chat_assessments = Assessment.objects.filter(  # type: ignore[attr-defined]
-                user=request.user,
-                data__type='chat'  # Filter for chat type
-            ).order_by('-created_at')
-            
-            # If no chat type filter works, fall back to title-based filtering
-            if not chat_assessments.exists():
-                chat_assessments = Assessment.objects.filter(  # type: ignore[attr-defined]
-                    user=request.user
-                ).filter(
-                    title__icontains='chat'
-                ).order_by('-created_at')
+            # Preview and count are stored on the thread; no message is read here
+            threads = ChatThread.objects.filter(  # type: ignore[attr-defined]
+                user=request.user
+            ).order_by('-updated_at').values('id', 'title', 'preview', 'message_count', 'created_at', 'updated_at')
             
             chats = []
-            for assessment in chat_assessments[:50]:  # Limit to last 50 chats
-                history = assessment.data.get('history', []) if assessment.data else []
-                
-                # Get preview (first user message)
-                preview = "Empty chat"
-                message_count = 0
-                for msg in history:
-                    if msg.get('role') == 'user' and msg.get('content'):
-                        if preview == "Empty chat":
-                            preview = msg.get('content', '')[:50] + "..." if len(msg.get('content', '')) > 50 else msg.get('content', '')
-                    message_count += 1
-                
-                chat_data = {
-                    'id': assessment.id,
-                    'title': assessment.title,
-                    'preview': preview,
-                    'message_count': message_count,
-                    'created_at': assessment.created_at.isoformat(),
-                    'last_updated': assessment.created_at.isoformat()
-                }
-                chats.append(chat_data)
+            for thread in threads[:50]:  # Limit to last 50 chats
+                chats.append({
+                    'id': thread['id'],
+                    'title': thread['title'],
+                    'preview': thread['preview'] or "Empty chat",
+                    'message_count': thread['message_count'],
+                    'created_at': thread['created_at'].isoformat(),
+                    'last_updated': thread['updated_at'].isoformat()
+                })
             
             return Response({
                 'chats': chats,
@@ -1664,9 +1343,9 @@ class AIChatHistoryView(views.APIView):
                     'error': 'Chat ID gereklidir'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Find and delete the chat
+            # Find and delete the chat (its messages cascade)
             try:
-                chat = Assessment.objects.get(  # type: ignore[attr-defined]
+                chat = ChatThread.objects.get(  # type: ignore[attr-defined]
                     id=chat_id,
                     user=request.user
                 )
@@ -1679,7 +1358,7 @@ class AIChatHistoryView(views.APIView):
                     'deleted_id': chat_id
                 })
                 
-            except Assessment.DoesNotExist:  # type: ignore[attr-defined]
+            except ChatThread.DoesNotExist:  # type: ignore[attr-defined]
                 return Response({
                     'error': 'Sohbet bulunamadı veya size ait değil'
                 }, status=status.HTTP_404_NOT_FOUND)
@@ -1692,18 +1371,33 @@ class AIChatHistoryView(views.APIView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class AIChatLoadView(views.APIView):
+    """Load a chat. Without parameters the whole transcript is returned; with
+    ``?limit=N`` the newest N messages, then ``?before=<next_before>&limit=N``
+    pages back and ``?after=<seq>`` fetches messages newer than ``seq``."""
     permission_classes = [permissions.AllowAny]
+    MAX_LIMIT = 500
 
     def get(self, request, chat_id):
         """Load a specific chat history by ID"""
         try:
             # Find the chat
-            chat = Assessment.objects.get(  # type: ignore[attr-defined]
+            chat = ChatThread.objects.get(  # type: ignore[attr-defined]
                 id=chat_id,
                 user=request.user
             )
+            try:
+                before = self._int_param(request, 'before')
+                after = self._int_param(request, 'after')
+                limit = self._int_param(request, 'limit')
+            except ValueError:
+                return Response({
+                    'error': 'before, after ve limit tam sayı olmalıdır'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if limit is not None:
+                limit = max(1, min(limit, self.MAX_LIMIT))
             
-            history = chat.data.get('history', []) if chat.data else []
+            rows, has_more = chat_store.page(chat, before=before, after=after, limit=limit)
+            history = [{ 'role': r['role'], 'content': r['content'] } for r in rows]
             
             return Response({
                 'ok': True,
@@ -1712,11 +1406,15 @@ class AIChatLoadView(views.APIView):
                     'title': chat.title,
                     'history': history,
                     'created_at': chat.created_at.isoformat(),
-                    'message_count': len(history)
+                    'message_count': chat.message_count,
+                    'first_seq': rows[0]['seq'] if rows else None,
+                    'last_seq': rows[-1]['seq'] if rows else None,
+                    'next_before': rows[0]['seq'] if has_more else None,
+                    'has_more': has_more
                 }
             })
             
-        except Assessment.DoesNotExist:  # type: ignore[attr-defined]
+        except ChatThread.DoesNotExist:  # type: ignore[attr-defined]
             return Response({
                 'error': 'Sohbet bulunamadı veya size ait değil'
             }, status=status.HTTP_404_NOT_FOUND)
@@ -1725,6 +1423,11 @@ class AIChatLoadView(views.APIView):
                 'error': f'Sohbet yüklenirken hata oluştu: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @staticmethod
+    def _int_param(request, name):
+        value = request.query_params.get(name)
+        return int(value) if value not in (None, '') else None
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class AIScheduleSaveView(views.APIView):
@@ -1754,8 +1457,9 @@ class AIScheduleSaveView(views.APIView):
             # Single-record per user: update_or_create last schedule
             assessment, _ = Assessment.objects.update_or_create(  # type: ignore[attr-defined]
                 user=request.user,
-                title='CurrentSchedule',
+                kind=Assessment.SCHEDULE,
                 defaults={
+                    'title': 'CurrentSchedule',
                     'score': 0,
                     'data': {
                         'schedule': schedule_data,
@@ -1784,7 +1488,7 @@ class AIScheduleSaveView(views.APIView):
                 return Response({ 'schedule': None })
             latest = Assessment.objects.filter(  # type: ignore[attr-defined]
                 user=request.user,
-                data__type='schedule'
+                kind=Assessment.SCHEDULE
             ).order_by('-created_at').first()
             if not latest:
                 return Response({ 'schedule': None })
@@ -1804,6 +1508,184 @@ class AIScheduleSaveView(views.APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class AIScheduleRepairView(views.APIView):
+    """Apply availability edits to the saved CurrentSchedule and move only the sessions they hit.
+
+    Body: {"changes": {"Pzt-9": "red", "Sal-14": null}, "day_changes": {"Cmt": "green"}, "save": true}
+    A null state clears the cell (back to the day state / default).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        changes = request.data.get('changes') or {}
+        day_changes = request.data.get('day_changes') or {}
+        if not isinstance(changes, dict) or not isinstance(day_changes, dict):
+            return Response({ 'error': 'changes ve day_changes nesne olmalı' }, status=status.HTTP_400_BAD_REQUEST)
+        bad = [k for k, v in list(changes.items()) + list(day_changes.items()) if v not in scheduler.STATES and v is not None]
+        if bad:
+            return Response({ 'error': f'Geçersiz durum: {", ".join(map(str, bad[:5]))}' }, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            assessment = Assessment.objects.select_for_update().filter(user=request.user, kind=Assessment.SCHEDULE).first()  # type: ignore[attr-defined]
+            if not assessment:
+                return Response({ 'error': 'Kayıtlı ders programı bulunamadı' }, status=status.HTTP_404_NOT_FOUND)
+            saved = (assessment.data or {}).get('schedule')
+            # The frontend saves {schedule, subjects, availability, dayStates, ...}; older saves are the bare list
+            if not isinstance(saved, dict):
+                saved = { 'schedule': saved or [] }
+            cells_before = dict(saved.get('availability') or {})
+            days_before = dict(saved.get('dayStates') or {})
+            cells_after = { **cells_before, **changes }
+            days_after = { **days_before, **day_changes }
+            cells_after = { k: v for k, v in cells_after.items() if v }
+            days_after = { k: v for k, v in days_after.items() if v }
+
+            subjects = saved.get('subjects')
+            subj_list = None
+            if isinstance(subjects, dict) and subjects:
+                subj_list = scheduler.parse_subjects([{ 'name': n, 'hours': h } for n, h in subjects.items()])
+
+            before = scheduler.availability_masks(cells_before, days_before, scheduler.usable_days(cells_before, days_before))
+            after = scheduler.availability_masks(cells_after, days_after, scheduler.usable_days(cells_after, days_after))
+            repair = scheduler.repair_week(saved.get('schedule'), before, after, subj_list, _weak_topics(request))
+            result = repair.result
+
+            saved_now = False
+            if request.data.get('save', True):
+                assessment.data = {
+                    **(assessment.data or {}),
+                    'schedule': { **saved, 'schedule': result.schedule, 'availability': cells_after, 'dayStates': days_after },
+                    'created_at': datetime.now().isoformat(),
+                }
+                assessment.save(update_fields=['data'])
+                saved_now = True
+
+        print(f"Schedule repair for user {request.user.pk}: +{len(repair.added)} -{len(repair.removed)} sessions")
+        return Response({
+            'schedule': result.schedule,
+            'added': repair.added,
+            'removed': repair.removed,
+            'unplaced': result.unplaced,
+            'hours_needed': result.hours_needed,
+            'hours_scheduled': result.hours_scheduled,
+            'source': 'incremental_repair',
+            'saved': saved_now,
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AIScheduleBatchView(views.APIView):
+    """Plan study schedules for a whole class in one call (staff/teachers).
+
+    Body: {"students": [{"user": <id or username>, "subjects": [...], "cell_states": {...},
+    "day_states": {...}, "available_days": [...]}, ...], "mode": "optimal"|"greedy", "save": true}
+    Plans locally (no model calls), identical inputs once. With save, each student's
+    CurrentSchedule is replaced in a single transaction.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    MAX_STUDENTS = int(os.getenv('SCHEDULE_BATCH_MAX', '500'))
+
+    def post(self, request):
+        students = request.data.get('students')
+        if not isinstance(students, list) or not students:
+            return Response({ 'error': 'students listesi gerekli' }, status=status.HTTP_400_BAD_REQUEST)
+        if len(students) > self.MAX_STUDENTS:
+            return Response({ 'error': f'En fazla {self.MAX_STUDENTS} öğrenci gönderilebilir' }, status=status.HTTP_400_BAD_REQUEST)
+        mode = 'greedy' if str(request.data.get('mode') or '').lower() == 'greedy' else 'optimal'
+
+        users = self._resolve_users(students)
+        errors = []
+        entries = []
+        seen = set()
+        for index, entry in enumerate(students):
+            user = users.get(str(entry.get('user'))) if isinstance(entry, dict) else None
+            if user is None:
+                errors.append({ 'index': index, 'user': entry.get('user') if isinstance(entry, dict) else None, 'error': 'Öğrenci bulunamadı' })
+                continue
+            if user.pk in seen:
+                errors.append({ 'index': index, 'user': entry.get('user'), 'error': 'Öğrenci listede tekrar ediyor' })
+                continue
+            problem = schedule_batch.entry_error(entry)
+            if problem:
+                errors.append({ 'index': index, 'user': entry.get('user'), 'error': problem })
+                continue
+            seen.add(user.pk)
+            entries.append((user, entry))
+
+        weak = self._weak_topics([user.pk for user, _ in entries])
+        payloads, unique = schedule_batch.plan_many([(entry, weak.get(user.pk, [])) for user, entry in entries], mode)
+
+        now = datetime.now().isoformat()
+        today = timezone.localdate()
+        records = [
+            Assessment(
+                user=user,
+                title='CurrentSchedule',
+                kind=Assessment.SCHEDULE,
+                event_date=today,
+                score=0,
+                data={
+                    'schedule': {
+                        'schedule': result['schedule'],
+                        'subjects': { name: hours for name, hours in scheduler.parse_subjects(entry.get('subjects'), entry.get('courses') or '') },
+                        'availability': entry.get('cell_states') or {},
+                        'dayStates': entry.get('day_states') or {},
+                        'createdAt': now,
+                    },
+                    'type': 'schedule',
+                    'created_at': now,
+                    'generated_by': request.user.pk,
+                },
+            )
+            for (user, entry), result in zip(entries, payloads)
+        ]
+        saved = False
+        if request.data.get('save', True) and records:
+            # One CurrentSchedule per student, as AIScheduleSaveView keeps it
+            with transaction.atomic():
+                Assessment.objects.filter(user_id__in=[user.pk for user, _ in entries], kind=Assessment.SCHEDULE).delete()  # type: ignore[attr-defined]
+                Assessment.objects.bulk_create(records, batch_size=500)  # type: ignore[attr-defined]
+            saved = True
+
+        print(f"Schedule batch by {request.user.pk}: {len(entries)} students, {unique} unique inputs, {len(errors)} errors")
+        return Response({
+            'results': [
+                { 'user': user.pk, 'username': user.username, 'assessment_id': record.pk if saved else None, **result }
+                for (user, _), result, record in zip(entries, payloads, records)
+            ],
+            'errors': errors,
+            'unique_inputs': unique,
+            'saved': saved,
+        })
+
+    def _resolve_users(self, students):
+        """{str(id) or username: User} for the referenced students, in two queries."""
+        refs = [str(s.get('user')) for s in students if isinstance(s, dict) and s.get('user') not in (None, '')]
+        ids = [int(r) for r in refs if r.isdigit()]
+        names = [r for r in refs if not r.isdigit()]
+        found = {}
+        if ids:
+            for user in User.objects.filter(pk__in=ids):  # type: ignore[attr-defined]
+                found[str(user.pk)] = user
+        if names:
+            for user in User.objects.filter(username__in=names):  # type: ignore[attr-defined]
+                found[user.username] = user
+        return found
+
+    def _weak_topics(self, user_ids):
+        """Weak topics (last quiz result's topics) per user id, in two queries."""
+        if not user_ids:
+            return {}
+        latest = Assessment.objects.filter(user=OuterRef('pk'), kind=Assessment.QUIZ_RESULT).order_by('-created_at').values('pk')[:1]  # type: ignore[attr-defined]
+        quiz_ids = User.objects.filter(pk__in=user_ids).annotate(last_quiz=Subquery(latest)).values_list('last_quiz', flat=True)  # type: ignore[attr-defined]
+        weak = {}
+        for quiz in Assessment.objects.filter(pk__in=[q for q in quiz_ids if q]).only('user_id', 'data'):  # type: ignore[attr-defined]
+            topics = ((quiz.data or {}).get('topics') or '').strip()
+            weak[quiz.user_id] = [t.strip() for t in topics.split(',') if t.strip()]
+        return weak
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class AIChatNewView(views.APIView):
     permission_classes = [permissions.AllowAny]
@@ -1816,12 +1698,7 @@ class AIChatNewView(views.APIView):
             
             # For authenticated users, create a new chat record
             if hasattr(request, 'user') and request.user.is_authenticated:
-                new_chat = Assessment.objects.create(  # type: ignore[attr-defined]
-                    user=request.user,
-                    title=title,
-                    score=0,
-                    data={'history': [], 'type': 'chat'}
-                )
+                new_chat = chat_store.create_thread(request.user, title)
                 
                 return Response({
                     'ok': True,
@@ -1847,11 +1724,12 @@ class AIDailyReportView(views.APIView):
         """Get daily report for a specific date"""
         try:
             # Try to find existing report for this date
+            day = event_date_for(Assessment.DAILY_REPORT, '', { 'date': date })
             report = Assessment.objects.filter(  # type: ignore[attr-defined]
                 user=request.user,
-                title=f'DailyReport {date}',
-                data__type='daily_report'
-            ).first()
+                kind=Assessment.DAILY_REPORT,
+                event_date=day
+            ).first() if day else None
             
             if report:
                 # Ensure sessions are ordered by start time
@@ -1882,7 +1760,7 @@ class AIDailyReportView(views.APIView):
                     day_label = labels[weekday] if 0 <= weekday <= 6 else 'Pzt'
                     latest = Assessment.objects.filter(  # type: ignore[attr-defined]
                         user=request.user,
-                        data__type='schedule'
+                        kind=Assessment.SCHEDULE
                     ).order_by('-created_at').first()
                     if latest and latest.data:
                         sched = latest.data.get('schedule')
@@ -1939,12 +1817,19 @@ class AIDailyReportView(views.APIView):
                 return Response({
                     'error': 'Tarih bilgisi gereklidir'
                 }, status=status.HTTP_400_BAD_REQUEST)
+            day = event_date_for(Assessment.DAILY_REPORT, '', { 'date': date })
+            if day is None:
+                return Response({
+                    'error': 'Geçersiz tarih (YYYY-AA-GG bekleniyor)'
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             # Create or update the report
             report, created = Assessment.objects.update_or_create(  # type: ignore[attr-defined]
                 user=request.user,
-                title=f'DailyReport {date}',
+                kind=Assessment.DAILY_REPORT,
+                event_date=day,
                 defaults={
+                    'title': f'DailyReport {date}',
                     'score': 0,
                     'data': {
                         'type': 'daily_report',
@@ -1973,8 +1858,14 @@ class AIDailyReportView(views.APIView):
 @method_decorator(csrf_exempt, name='dispatch')
 class AIDailyReportAnalyzeView(views.APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AIRateThrottle]
 
     def post(self, request):
+        if jobs_queue.wants_background(request):
+            return jobs_queue.accepted(jobs_queue.enqueue('daily_report_analyze', request))
+        return run_sync(self.post_steps(request))
+
+    def post_steps(self, request):
         """Analyze daily report with AI"""
         try:
             date = request.data.get('date')
@@ -1994,7 +1885,7 @@ class AIDailyReportAnalyzeView(views.APIView):
                     day_label = labels[weekday] if 0 <= weekday <= 6 else 'Pzt'
                     latest = Assessment.objects.filter(  # type: ignore[attr-defined]
                         user=request.user,
-                        data__type='schedule'
+                        kind=Assessment.SCHEDULE
                     ).order_by('-created_at').first()
                     if latest and latest.data:
                         sched = latest.data.get('schedule')
@@ -2030,7 +1921,8 @@ class AIDailyReportAnalyzeView(views.APIView):
             if not sessions:
                 return Response({ 'error': 'Analiz için oturum bulunamadı' }, status=status.HTTP_400_BAD_REQUEST)
             
-            api_key = _get_ai_api_key()
+            client = get_client()
+            api_key = client.api_key
             
             if not api_key:
                 # Return mock analysis if no API key
@@ -2079,28 +1971,14 @@ class AIDailyReportAnalyzeView(views.APIView):
             )
             
             # Call AI API
-            provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-            headers = {
-                'Authorization': f'Bearer {api_key}',
-                'Content-Type': 'application/json',
-                'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-            }
-            
             payload = {
-                'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
                 'messages': [{'role': 'user', 'content': prompt}],
                 'temperature': 0.4,
                 'max_tokens': int(os.getenv('DAILY_REPORT_MAX_TOKENS', '500')),
                 'top_p': 0.9,
             }
             
-            resp = requests.post(provider_url, json=payload, headers=headers, timeout=15)
-            
-            if resp.status_code == 402:
-                payload_retry = payload.copy()
-                payload_retry['max_tokens'] = max(150, int(payload.get('max_tokens', 500)) // 2)
-                resp = requests.post(provider_url, json=payload_retry, headers=headers, timeout=12)
+            resp = yield Completion(payload, timeout=15, endpoint='daily_report_analyze')
             
             if resp.ok:
                 response_data = resp.json()
@@ -2110,6 +1988,7 @@ class AIDailyReportAnalyzeView(views.APIView):
                 Assessment.objects.create(  # type: ignore[attr-defined]
                     user=request.user,
                     title=f'DailyReportAnalysis {date}',
+                    kind=Assessment.DAILY_REPORT_ANALYSIS,
                     score=avg_productivity,
                     data={
                         'type': 'daily_report_analysis',
@@ -2126,7 +2005,11 @@ class AIDailyReportAnalyzeView(views.APIView):
                 return Response({
                     'analysis': f'AI analizi yapılırken hata oluştu. Durum kodu: {resp.status_code}'
                 })
-                
+
+        except CircuitOpen:
+            return Response({
+                'analysis': 'AI servisi şu anda yanıt veremiyor. Lütfen biraz sonra tekrar deneyin.'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={ 'Retry-After': str(int(health.breaker.retry_after()) + 1) })
         except Exception as e:
             return Response({
                 'analysis': f'AI analizi yapılırken beklenmeyen hata oluştu: {str(e)}'
@@ -2166,12 +2049,16 @@ class TargetNetsView(views.APIView):
     This uses simple heuristics/mappings and can be later upgraded to pull real data.
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AIRateThrottle]
 
     class _Serializer(serializers.Serializer):
         university = serializers.CharField()
         department = serializers.CharField()
 
     def post(self, request):
+        return run_sync(self.post_steps(request))
+
+    def post_steps(self, request):
         ser = self._Serializer(data=request.data)
         ser.is_valid(raise_exception=True)
         university = ser.validated_data['university']  # type: ignore[attr-defined]
@@ -2234,16 +2121,10 @@ class TargetNetsView(views.APIView):
         }
 
         # If AI key exists, ask AI to compute generalized targets using provided info
-        api_key = _get_ai_api_key()
+        client = get_client()
+        api_key = client.api_key
         if api_key:
             try:
-                provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-                headers = {
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json',
-                    'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                    'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-                }
                 import json
                 prompt = (
                     "Üniversite ve bölüm hedefine göre TYT/AYT genel hedef net aralıklarını tahmin et. "
@@ -2253,13 +2134,12 @@ class TargetNetsView(views.APIView):
                     "{\n  \"tyt_requirement\": \"ör: 70+\",\n  \"ayt_requirement\": \"ör: 40+\",\n  \"subject_nets\": { ders: \"ör: 20+\" }\n}"
                 )
                 payload = {
-                    'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
                     'messages': [ { 'role': 'user', 'content': prompt } ],
                     'response_format': { 'type': 'json_object' },
                     'temperature': 0.3,
                     'max_tokens': 600,
                 }
-                resp = requests.post(provider_url, json=payload, headers=headers, timeout=12)
+                resp = yield Completion(payload, timeout=12, endpoint='target_nets')
                 if resp.ok:
                     data = resp.json().get('choices', [{}])[0].get('message', {}).get('content') or '{}'
                     try:
@@ -2295,9 +2175,14 @@ class AIPerCourseAveragesView(views.APIView):
     Falls back to simple averages based on last assessments if AI key is missing.
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AIRateThrottle]
 
     def get(self, request):
-        api_key = _get_ai_api_key()
+        return run_sync(self.get_steps(request))
+
+    def get_steps(self, request):
+        client = get_client()
+        api_key = client.api_key
 
         # Try to derive simple per-course averages from recent assessments
         recent = Assessment.objects.filter(user=request.user).order_by('-created_at')[:10]  # type: ignore[attr-defined]
@@ -2324,13 +2209,6 @@ class AIPerCourseAveragesView(views.APIView):
         # If AI key exists, optionally refine with AI prompt using user's context
         if api_key and simple_avg:
             try:
-                provider_url = os.getenv('OPENROUTER_URL', 'https://openrouter.ai/api/v1/chat/completions')
-                headers = {
-                    'Authorization': f'Bearer {api_key}',
-                    'Content-Type': 'application/json',
-                    'HTTP-Referer': os.getenv('OPENROUTER_SITE_URL', 'http://localhost:5173'),
-                    'X-Title': os.getenv('OPENROUTER_TITLE', 'E-Teacher'),
-                }
                 import json
                 prompt = (
                     "Öğrencinin geçmiş sınav verilerine göre her ders için genel net ortalamasını tahmin et ve SADECE JSON ver. "
@@ -2338,13 +2216,12 @@ class AIPerCourseAveragesView(views.APIView):
                     f"Girdi: {json.dumps(simple_avg, ensure_ascii=False)}"
                 )
                 payload = {
-                    'model': os.getenv('OPENROUTER_MODEL', 'deepseek/deepseek-chat'),
                     'messages': [{ 'role': 'user', 'content': prompt }],
                     'response_format': { 'type': 'json_object' },
                     'temperature': 0.2,
                     'max_tokens': 600,
                 }
-                resp = requests.post(provider_url, json=payload, headers=headers, timeout=10)
+                resp = yield Completion(payload, timeout=10, endpoint='per_course_averages')
                 if resp.ok:
                     data = resp.json().get('choices', [{}])[0].get('message', {}).get('content') or '{}'
                     try:
@@ -2354,7 +2231,7 @@ class AIPerCourseAveragesView(views.APIView):
                         if isinstance(ai_avg, dict) and ai_avg:
                             # store as assessment log
                             try:
-                                Assessment.objects.create(user=request.user, title='PerCourseAverages', score=0, data={'type': 'ai_avg', 'averages': ai_avg})  # type: ignore[attr-defined]
+                                Assessment.objects.create(user=request.user, title='PerCourseAverages', kind=Assessment.PER_COURSE_AVERAGES, score=0, data={'type': 'ai_avg', 'averages': ai_avg})  # type: ignore[attr-defined]
                             except Exception:
                                 pass
                             return Response({ 'averages': ai_avg })
@@ -2366,4 +2243,35 @@ class AIPerCourseAveragesView(views.APIView):
         # Fallback to simple averages or defaults
         if simple_avg:
             return Response({ 'averages': simple_avg })
-        return Response({ 'averages': { 'Türkçe': 25.0, 'Matematik': 18.0, 'Fen': 14.0, 'Sosyal': 12.0 } })
\ No newline at end of file
+        return Response({ 'averages': { 'Türkçe': 25.0, 'Matematik': 18.0, 'Fen': 14.0, 'Sosyal': 12.0 } })
+
+class AICacheStatsView(views.APIView):
+    """Hit/miss counters of the AI completion cache, per opted-in endpoint."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({ 'enabled': settings.AI_CACHE_ENABLED, 'endpoints': completion_cache.stats() })
+
+
+class AIProviderStatusView(views.APIView):
+    """Circuit breaker state and observed provider latency/timeouts per endpoint."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({ 'circuit': health.breaker.snapshot(), 'latency': health.latency.snapshot() })
+
+
+class AIThrottleStatsView(views.APIView):
+    """Rate limits, allowed/throttled counts per scope and the upstream concurrency gate."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(throttle_stats())
+
+
+class AIQuestionBankStatsView(views.APIView):
+    """Stock, low-water marks and refill metrics of the quiz question bank per topic."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({ 'topics': question_bank.stats() })
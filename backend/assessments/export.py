@@ -0,0 +1,169 @@
+"""
+Streaming export of assessments as NDJSON or CSV.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` and encoded
+one at a time into a ``StreamingHttpResponse``, so memory stays flat however
+many rows (and however large their ``data`` blobs) a user or class has.
+
+The format is picked by DRF content negotiation: ``?format=ndjson|csv`` or an
+``Accept`` header, NDJSON by default.
+
+Under ASGI the body must be an async iterator: Django consumes a sync one there
+with ``sync_to_async(list)``, i.e. buffers the whole export. ``response`` then
+wraps the lines so each batch is pulled with ``sync_to_async`` instead.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.renderers import BaseRenderer
+
+from .models import Assessment
+
+CHUNK_SIZE = 100  # rows per fetch; peak memory is about one chunk of decoded data blobs
+COLUMNS = ('id', 'kind', 'title', 'score', 'event_date', 'created_at', 'data')
+USER_COLUMNS = ('user_id', 'username')
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Declares the ``ndjson`` format; exports stream their own body, errors render as one line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        detail = (data.get('error') or data.get('detail')) if isinstance(data, dict) else data
+        return f"error\n{json.dumps(str(detail), ensure_ascii=False)}\n"
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each written line back."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def parse_filters(params) -> dict:
+    """Queryset filters from ``kind`` (comma-separated) and ``start``/``end`` (YYYY-MM-DD, inclusive).
+
+    Raises ValueError with a user-facing message.
+    """
+    filters = {}
+    kinds = [k.strip() for k in (params.get('kind') or '').split(',') if k.strip()]
+    if kinds:
+        valid = { value for value, _ in Assessment.KIND_CHOICES }
+        unknown = [k for k in kinds if k not in valid]
+        if unknown:
+            raise ValueError(f"Bilinmeyen tür: {', '.join(unknown)}")
+        filters['kind__in'] = kinds
+    tz = timezone.get_current_timezone()
+    for name, lookup, shift in (('start', 'created_at__gte', 0), ('end', 'created_at__lt', 1)):
+        if params.get(name):
+            try:
+                day = parse_date(params[name])
+            except ValueError:
+                day = None
+            if day is None:
+                raise ValueError(f"Geçersiz tarih: {name} (YYYY-AA-GG bekleniyor)")
+            filters[lookup] = datetime.combine(day + timedelta(days=shift), time.min, tzinfo=tz)
+    return filters
+
+
+def _rows(queryset, with_user: bool) -> Iterator[Sequence]:
+    columns = (*USER_COLUMNS, *COLUMNS) if with_user else COLUMNS
+    fields = [('user__username' if c == 'username' else c) for c in columns]
+    return queryset.order_by('created_at', 'id').values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def ndjson_lines(queryset, with_user: bool = False) -> Iterator[str]:
+    columns = (*USER_COLUMNS, *COLUMNS) if with_user else COLUMNS
+    for row in _rows(queryset, with_user):
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+
+
+def csv_lines(queryset, with_user: bool = False) -> Iterator[str]:
+    columns = (*USER_COLUMNS, *COLUMNS) if with_user else COLUMNS
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    data_index = columns.index('data')
+    for row in _rows(queryset, with_user):
+        values = list(row)
+        values[data_index] = json.dumps(values[data_index], ensure_ascii=False, cls=DjangoJSONEncoder)
+        yield writer.writerow(['' if v is None else v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+
+
+def response(queryset, export_format: str, filename: str, with_user: bool = False,
+             asgi: bool = False) -> StreamingHttpResponse:
+    """Streaming download of ``queryset``; pass ``asgi=True`` when the request is served over ASGI."""
+    lines: Iterator[str]
+    if export_format == 'csv':
+        # BOM so spreadsheet apps read Turkish characters correctly
+        lines, content_type, extension = _prefixed('\ufeff', csv_lines(queryset, with_user)), 'text/csv; charset=utf-8', 'csv'
+    else:
+        lines, content_type, extension = ndjson_lines(queryset, with_user), 'application/x-ndjson; charset=utf-8', 'ndjson'
+    body: Iterable[str] | AsyncIterator[str] = _batched(lines) if asgi else lines
+    resp = StreamingHttpResponse(body, content_type=content_type)
+    resp['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    resp['Cache-Control'] = 'no-store'
+    resp['X-Accel-Buffering'] = 'no'  # disable proxy buffering (nginx)
+    return resp
+
+
+def _prefixed(prefix: str, lines: Iterator[str]) -> Iterator[str]:
+    yield prefix
+    yield from lines
+
+
+def served_over_asgi(request) -> bool:
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def _next_lines(lines: Iterator[str]) -> List[str]:
+    return list(islice(lines, CHUNK_SIZE))
+
+
+async def _batched(lines: Iterator[str]) -> AsyncIterator[str]:
+    """Async body for ASGI: pulls CHUNK_SIZE lines at a time on the request's sync thread."""
+    # thread_sensitive keeps every pull (and the open DB cursor) on the same thread
+    pull = sync_to_async(_next_lines, thread_sensitive=True)
+    try:
+        while True:
+            batch = await pull(lines)
+            if not batch:
+                break
+            yield ''.join(batch)
+    finally:
+        await sync_to_async(lines.close, thread_sensitive=True)()  # type: ignore[attr-defined]
+
+
+def resolve_students(users_param: Optional[str], grade_level: Optional[str]):
+    """Users of a class: ``users`` (comma-separated ids/usernames) and/or everyone in ``grade_level``."""
+    condition = Q()
+    idents = [u.strip() for u in (users_param or '').split(',') if u.strip()]
+    if idents:
+        ids = [int(u) for u in idents if u.isdigit()]
+        condition |= Q(pk__in=ids) | Q(username__in=idents)
+    if grade_level:
+        condition |= Q(student__grade_level=grade_level)
+    if not condition:
+        return None
+    return User.objects.filter(condition)  # type: ignore[attr-defined]
@@ -0,0 +1,36 @@
+from django.db.models import F, Func, IntegerField
+
+
+class JSONArrayLength(Func):
+    """Length of the JSON array at ``path`` inside a JSON column; 0 when missing or not an array.
+
+    ``JSONArrayLength('data', 'questions')`` counts ``data['questions']`` in the
+    database instead of loading the blob to call ``len()`` on it.
+    """
+    output_field = IntegerField()
+
+    def __init__(self, field: str, *path: str):
+        self.path = path
+        super().__init__(F(field))
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        # json_array_length() is 0 for objects/scalars and NULL for a missing path
+        return f"COALESCE(json_array_length({sql}, %s), 0)", [*params, '$.' + '.'.join(self.path)]
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        value = f"({sql} #> %s::text[])"
+        path = list(self.path)
+        return (
+            f"(CASE WHEN jsonb_typeof({value}) = 'array' THEN jsonb_array_length({value}) ELSE 0 END)",
+            [*params, path, *params, path],
+        )
+
+    def as_sql(self, compiler, connection, **extra_context):  # MySQL/MariaDB
+        sql, params = compiler.compile(self.source_expressions[0])
+        path = '$.' + '.'.join(self.path)
+        return (
+            f"(CASE WHEN JSON_TYPE(JSON_EXTRACT({sql}, %s)) = 'ARRAY' THEN JSON_LENGTH({sql}, %s) ELSE 0 END)",
+            [*params, path, *params, path],
+        )
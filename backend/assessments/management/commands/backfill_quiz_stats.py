@@ -0,0 +1,75 @@
+"""
+Rebuild the per-topic quiz counters (``QuizTopicStat``) from saved quiz results.
+
+Counters are recomputed from scratch for the selected users, so the command is
+safe to re-run. Users are rebuilt in small batches; each batch is read and
+replaced inside one transaction that holds the counter table's write lock, so
+a result saved meanwhile is counted either by the rebuild or by the view after
+it, never lost.
+
+    python manage.py backfill_quiz_stats
+    python manage.py backfill_quiz_stats --user ayse --user mehmet
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from assessments.models import Assessment, QuizTopicStat, quiz_counts
+
+
+def _lock_counters(user_ids) -> None:
+    """Block counter writes until the transaction ends (and wait for the ones in flight)."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE "{QuizTopicStat._meta.db_table}" IN SHARE ROW EXCLUSIVE MODE')
+    elif connection.vendor != 'sqlite':  # SQLite: the IMMEDIATE transaction already holds the write lock
+        stats = QuizTopicStat.objects.filter(user_id__in=user_ids).select_for_update()  # type: ignore[attr-defined]
+        list(stats.values_list('pk', flat=True))
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-topic quiz statistics from saved quiz results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=[], help='Username to rebuild (repeatable; default: all)')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--users-per-batch', type=int, default=100)
+
+    def handle(self, *args, **options):
+        results = Assessment.objects.filter(kind=Assessment.QUIZ_RESULT)  # type: ignore[attr-defined]
+        if options['user']:
+            user_ids = sorted(User.objects.filter(username__in=options['user']).values_list('pk', flat=True))  # type: ignore[attr-defined]
+        else:
+            # Users with stale counters but no results left are cleared too
+            user_ids = sorted(
+                set(results.values_list('user_id', flat=True).distinct())
+                | set(QuizTopicStat.objects.values_list('user_id', flat=True).distinct())  # type: ignore[attr-defined]
+            )
+
+        counters = 0
+        size = max(options['users_per_batch'], 1)
+        for i in range(0, len(user_ids), size):
+            batch = user_ids[i:i + size]
+            with transaction.atomic():
+                _lock_counters(batch)
+                totals = self._totals(results.filter(user_id__in=batch), options['chunk_size'])
+                QuizTopicStat.objects.filter(user_id__in=batch).delete()  # type: ignore[attr-defined]
+                QuizTopicStat.objects.bulk_create(totals.values(), batch_size=500)  # type: ignore[attr-defined]
+            counters += len(totals)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {counters} topic counters for {len(user_ids)} users"))
+
+    @staticmethod
+    def _totals(results, chunk_size: int) -> dict:
+        totals = {}
+        rows = results.order_by('created_at').values_list('user_id', 'score', 'data', 'created_at')
+        for user_id, score, data, created_at in rows.iterator(chunk_size=chunk_size):
+            topic, attempts, correct = quiz_counts(data)
+            entry = totals.get((user_id, topic))
+            if entry is None:
+                entry = totals[(user_id, topic)] = QuizTopicStat(user_id=user_id, topic=topic, last_seen=created_at)
+            entry.quizzes += 1
+            entry.attempts += attempts
+            entry.correct += correct
+            entry.score_sum += score or 0
+            entry.last_seen = created_at
+        return totals
@@ -0,0 +1,110 @@
+"""
+Concurrent write benchmark for the database profile.
+
+Each worker thread runs the read-then-write transaction the AI views do (look up
+the user's latest row of a kind, then save a new ``Assessment``) and the
+command reports throughput, latency and "database is locked" failures.
+
+On SQLite it migrates two throwaway database files and runs the same load on
+the legacy settings (rollback journal, deferred transactions, 5 s timeout) and
+on the configured profile, so the two can be compared side by side. On other
+engines it runs once against ``--database`` with a temporary user that is
+deleted afterwards.
+
+    python manage.py bench_db_writes
+    python manage.py bench_db_writes --threads 16 --writes 100
+"""
+import copy
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from assessments.models import Assessment
+
+LEGACY_SQLITE_OPTIONS = {'timeout': 5}
+PAYLOAD = { 'type': 'bench', 'questions': [{ 'q': 'x' * 200, 'options': ['a', 'b', 'c', 'd'] }] * 5 }
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent Assessment write throughput on the configured database profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--writes', type=int, default=100, help='Writes per thread')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        base = connections.settings[options['database']]
+        if base['ENGINE'].endswith('sqlite3'):
+            profiles = [('legacy', LEGACY_SQLITE_OPTIONS), ('configured', base['OPTIONS'])]
+            with tempfile.TemporaryDirectory() as tmp:
+                for name, db_options in profiles:
+                    alias = f'bench_{name}'
+                    config = copy.deepcopy(base)
+                    config.update(NAME=str(Path(tmp) / f'{name}.sqlite3'), OPTIONS=dict(db_options), CONN_MAX_AGE=0)
+                    connections.settings[alias] = config
+                    try:
+                        call_command('migrate', database=alias, verbosity=0)
+                        self._report(name, self._run(alias, options['threads'], options['writes']))
+                    finally:
+                        connections[alias].close()
+                        del connections.settings[alias]
+        else:
+            self._report(options['database'], self._run(options['database'], options['threads'], options['writes']))
+
+    def _run(self, alias: str, threads: int, writes: int) -> dict:
+        users = [
+            User.objects.db_manager(alias).create_user(f'bench_db_writes_{i}', password=None)  # type: ignore[attr-defined]
+            for i in range(threads)
+        ]
+        latencies, failures, lock = [], [0], threading.Lock()
+        start_gate = threading.Barrier(threads)
+
+        def worker(user):
+            local, failed = [], 0
+            start_gate.wait()
+            try:
+                for i in range(writes):
+                    began = time.perf_counter()
+                    try:
+                        with transaction.atomic(using=alias):
+                            Assessment.objects.using(alias).filter(user=user, kind=Assessment.QUIZ).order_by('-created_at').first()  # type: ignore[attr-defined]
+                            Assessment.objects.using(alias).create(  # type: ignore[attr-defined]
+                                user=user, title=f'Bench {i}', kind=Assessment.QUIZ, score=i, data=PAYLOAD,
+                            )
+                    except OperationalError:
+                        failed += 1
+                        continue
+                    local.append(time.perf_counter() - began)
+            finally:
+                connections[alias].close()
+            with lock:
+                latencies.extend(local)
+                failures[0] += failed
+
+        pool = [threading.Thread(target=worker, args=(user,)) for user in users]
+        began = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - began
+        User.objects.db_manager(alias).filter(pk__in=[u.pk for u in users]).delete()  # type: ignore[attr-defined]
+        return { 'ok': len(latencies), 'failed': failures[0], 'elapsed': elapsed, 'latencies': sorted(latencies) }
+
+    def _report(self, name: str, result: dict) -> None:
+        latencies = result['latencies']
+        p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0
+        rate = result['ok'] / result['elapsed'] if result['elapsed'] else 0.0
+        self.stdout.write(
+            f"{name:<11} ok={result['ok']:<6} locked={result['failed']:<5} "
+            f"{rate:8.1f} writes/s  p50={p50:7.1f} ms  p95={p95:7.1f} ms  ({result['elapsed']:.2f} s)"
+        )
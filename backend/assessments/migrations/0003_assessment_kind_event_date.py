@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0002_alter_assessment_options_alter_assessment_created_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessment',
+            name='event_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='assessment',
+            name='kind',
+            field=models.CharField(blank=True, choices=[('quiz', 'Quiz'), ('quiz_result', 'Quiz result'), ('chat', 'Chat'), ('psych_chat', 'Psych support chat'), ('schedule', 'Study schedule'), ('daily_report', 'Daily report'), ('daily_report_analysis', 'Daily report analysis'), ('exam_analysis', 'Exam analysis'), ('report', 'Report'), ('per_course_averages', 'Per-course averages'), ('other', 'Other')], max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['user', 'kind', 'created_at'], name='assessments_user_id_c1603b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['user', 'kind', 'event_date'], name='assessments_user_id_04b79a_idx'),
+        ),
+    ]
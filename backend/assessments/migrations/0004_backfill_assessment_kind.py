@@ -0,0 +1,81 @@
+from django.db import migrations
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+BATCH_SIZE = 1000
+
+# Frozen copy of assessments.models.kind_for / event_date_for as of this migration
+_BY_TYPE = {
+    'chat': 'chat',
+    'schedule': 'schedule',
+    'daily_report': 'daily_report',
+    'daily_report_analysis': 'daily_report_analysis',
+    'ai_avg': 'per_course_averages',
+}
+
+
+def _kind(title, data):
+    data_type = data.get('type') if isinstance(data, dict) else None
+    if data_type in _BY_TYPE:
+        return _BY_TYPE[data_type]
+    title = title or ''
+    lower = title.lower()
+    if 'quizresult' in lower:
+        return 'quiz_result'
+    if title.startswith('DailyReportAnalysis'):
+        return 'daily_report_analysis'
+    if title.startswith('DailyReport'):
+        return 'daily_report'
+    if title.startswith('ExamAnalysis'):
+        return 'exam_analysis'
+    if title.startswith('PsychSupport'):
+        return 'psych_chat'
+    if title == 'CurrentSchedule':
+        return 'schedule'
+    if title == 'PerCourseAverages':
+        return 'per_course_averages'
+    if 'quiz' in lower:
+        return 'quiz'
+    if 'chat' in lower or 'sohbet' in lower:
+        return 'chat'
+    if lower.startswith(('rapor', 'report')):
+        return 'report'
+    return 'other'
+
+
+def _event_date(kind, title, data, created_at):
+    if kind in ('daily_report', 'daily_report_analysis'):
+        value = (data.get('date') if isinstance(data, dict) else None) or (title or '').rpartition(' ')[2]
+        try:
+            day = parse_date(str(value))
+        except ValueError:
+            day = None
+        if day:
+            return day
+    return timezone.localdate(created_at) if created_at else None
+
+
+def backfill(apps, schema_editor):
+    Assessment = apps.get_model('assessments', 'Assessment')
+    pending = []
+    rows = Assessment.objects.filter(kind='').only('id', 'title', 'data', 'created_at').order_by('pk')
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        row.kind = _kind(row.title, row.data)
+        row.event_date = _event_date(row.kind, row.title, row.data, row.created_at)
+        pending.append(row)
+        if len(pending) >= BATCH_SIZE:
+            Assessment.objects.bulk_update(pending, ['kind', 'event_date'])
+            pending = []
+    if pending:
+        Assessment.objects.bulk_update(pending, ['kind', 'event_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0003_assessment_kind_event_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
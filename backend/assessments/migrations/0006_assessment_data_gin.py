@@ -0,0 +1,30 @@
+from django.db import migrations
+
+INDEX_NAME = 'assessments_data_gin'
+
+
+def create_index(apps, schema_editor):
+    """GIN index on ``data`` for containment / key lookups; PostgreSQL only (jsonb)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('assessments', 'Assessment')._meta.db_table
+    # CONCURRENTLY keeps the table writable while a large index builds
+    schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{INDEX_NAME}" ON "{table}" USING gin ("data")')
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{INDEX_NAME}"')
+
+
+class Migration(migrations.Migration):
+    atomic = False  # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+
+    dependencies = [
+        ('assessments', '0005_quiztopicstat'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
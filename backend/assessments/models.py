@@ -1,12 +1,44 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 
 class Assessment(models.Model):
+    # What a row holds; used to live only in title prefixes and data['type']
+    QUIZ = 'quiz'
+    QUIZ_RESULT = 'quiz_result'
+    CHAT = 'chat'
+    PSYCH_CHAT = 'psych_chat'
+    SCHEDULE = 'schedule'
+    DAILY_REPORT = 'daily_report'
+    DAILY_REPORT_ANALYSIS = 'daily_report_analysis'
+    EXAM_ANALYSIS = 'exam_analysis'
+    REPORT = 'report'
+    PER_COURSE_AVERAGES = 'per_course_averages'
+    OTHER = 'other'
+    KIND_CHOICES = [
+        (QUIZ, 'Quiz'),
+        (QUIZ_RESULT, 'Quiz result'),
+        (CHAT, 'Chat'),
+        (PSYCH_CHAT, 'Psych support chat'),
+        (SCHEDULE, 'Study schedule'),
+        (DAILY_REPORT, 'Daily report'),
+        (DAILY_REPORT_ANALYSIS, 'Daily report analysis'),
+        (EXAM_ANALYSIS, 'Exam analysis'),
+        (REPORT, 'Report'),
+        (PER_COURSE_AVERAGES, 'Per-course averages'),
+        (OTHER, 'Other'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='assessments', db_index=True)
     title = models.CharField(max_length=200, db_index=True)
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES, blank=True)
     score = models.FloatField(default=0.0, db_index=True)  # type: ignore[arg-type]
     data = models.JSONField(default=dict, blank=True)
+    event_date = models.DateField(null=True, blank=True)  # day the row is about (report date, else creation day)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
@@ -14,10 +46,143 @@ class Assessment(models.Model):
             models.Index(fields=['user', 'created_at']),
             models.Index(fields=['user', 'title']),
             models.Index(fields=['title', 'created_at']),
+            models.Index(fields=['user', 'kind', 'created_at']),
+            models.Index(fields=['user', 'kind', 'event_date']),
         ]
         ordering = ['-created_at']
 
+    def save(self, *args, **kwargs):
+        # Rows written without a kind (e.g. through the REST API) are classified like the backfill did
+        if not self.kind:
+            self.kind = kind_for(self.title, self.data)
+        if self.event_date is None:
+            self.event_date = event_date_for(self.kind, self.title, self.data) or timezone.localdate(self.created_at or timezone.now())
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"Assessment({self.user.username}, {self.title})"  # type: ignore[attr-defined]
 
+
+class QuizTopicStat(models.Model):
+    """Running quiz counters per user and topic, updated with every saved quiz result."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_topic_stats')
+    topic = models.CharField(max_length=128)
+    quizzes = models.PositiveIntegerField(default=0)  # type: ignore[arg-type]
+    attempts = models.PositiveIntegerField(default=0)  # type: ignore[arg-type]  # questions answered
+    correct = models.PositiveIntegerField(default=0)  # type: ignore[arg-type]
+    score_sum = models.FloatField(default=0.0)  # type: ignore[arg-type]
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'topic'], name='uniq_quiz_topic_stat'),
+        ]
+
+    def __str__(self) -> str:
+        return f"QuizTopicStat({self.user.username}, {self.topic})"  # type: ignore[attr-defined]
+
+    @classmethod
+    def record(cls, user, topic: str, attempts: int, correct: int, score: float, seen_at) -> None:
+        """Add one quiz result to the user's counters for ``topic`` (call inside the saving transaction)."""
+        changes = {
+            'quizzes': F('quizzes') + 1, 'attempts': F('attempts') + attempts, 'correct': F('correct') + correct,
+            'score_sum': F('score_sum') + score, 'last_seen': seen_at,
+        }
+        if cls.objects.filter(user=user, topic=topic).update(**changes):  # type: ignore[attr-defined]
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(  # type: ignore[attr-defined]
+                    user=user, topic=topic, quizzes=1, attempts=attempts, correct=correct, score_sum=score, last_seen=seen_at,
+                )
+        except IntegrityError:  # created concurrently
+            cls.objects.filter(user=user, topic=topic).update(**changes)  # type: ignore[attr-defined]
+
+    @classmethod
+    def forget(cls, user, topic: str, attempts: int, correct: int, score: float) -> None:
+        """Take one deleted quiz result back out of the user's counters for ``topic``."""
+        rows = cls.objects.filter(user=user, topic=topic)  # type: ignore[attr-defined]
+        rows.update(
+            quizzes=Greatest(F('quizzes') - 1, 0), attempts=Greatest(F('attempts') - attempts, 0),
+            correct=Greatest(F('correct') - correct, 0), score_sum=F('score_sum') - score,
+        )
+        rows.filter(quizzes=0).delete()
+
+    @classmethod
+    def record_result(cls, result: Assessment) -> None:
+        """``record`` a saved quiz-result assessment."""
+        topic, attempts, correct = quiz_counts(result.data)
+        cls.record(result.user, topic, attempts, correct, result.score or 0, result.created_at)
+
+    @classmethod
+    def forget_result(cls, result: Assessment) -> None:
+        topic, attempts, correct = quiz_counts(result.data)
+        cls.forget(result.user, topic, attempts, correct, result.score or 0)
+
+
+def quiz_counts(data) -> tuple:
+    """(topic, questions answered, correct) of a saved quiz result's data."""
+    data = data if isinstance(data, dict) else {}
+    topic = (str(data.get('topics') or '')).strip()[:128] or 'Genel'
+    questions = data.get('questions') or []
+    selected = data.get('selected') or {}
+    attempts = correct = 0
+    if isinstance(questions, list) and isinstance(selected, dict):
+        for idx, q in enumerate(questions):
+            if not isinstance(q, dict):
+                continue
+            attempts += 1
+            if selected.get(str(idx)) == q.get('correct'):
+                correct += 1
+    return topic, attempts, correct
+
+
+def kind_for(title: str, data) -> str:
+    """Kind of a row from its legacy markers (``data['type']``, then the title)."""
+    data_type = (data or {}).get('type') if isinstance(data, dict) else None
+    by_type = {
+        'chat': Assessment.CHAT,
+        'schedule': Assessment.SCHEDULE,
+        'daily_report': Assessment.DAILY_REPORT,
+        'daily_report_analysis': Assessment.DAILY_REPORT_ANALYSIS,
+        'ai_avg': Assessment.PER_COURSE_AVERAGES,
+    }
+    if data_type in by_type:
+        return by_type[data_type]
+    title = title or ''
+    lower = title.lower()
+    if 'quizresult' in lower:
+        return Assessment.QUIZ_RESULT
+    if title.startswith('DailyReportAnalysis'):
+        return Assessment.DAILY_REPORT_ANALYSIS
+    if title.startswith('DailyReport'):
+        return Assessment.DAILY_REPORT
+    if title.startswith('ExamAnalysis'):
+        return Assessment.EXAM_ANALYSIS
+    if title.startswith('PsychSupport'):
+        return Assessment.PSYCH_CHAT
+    if title == 'CurrentSchedule':
+        return Assessment.SCHEDULE
+    if title == 'PerCourseAverages':
+        return Assessment.PER_COURSE_AVERAGES
+    if 'quiz' in lower:
+        return Assessment.QUIZ
+    if 'chat' in lower or 'sohbet' in lower:
+        return Assessment.CHAT
+    if lower.startswith(('rapor', 'report')):
+        return Assessment.REPORT
+    return Assessment.OTHER
+
+
+def event_date_for(kind: str, title: str, data):
+    """Date a daily report (or its analysis) is about, or None for other kinds / unparsable dates."""
+    if kind not in (Assessment.DAILY_REPORT, Assessment.DAILY_REPORT_ANALYSIS):
+        return None
+    value = (data or {}).get('date') if isinstance(data, dict) else None
+    value = value or (title or '').rpartition(' ')[2]
+    try:
+        return parse_date(str(value))
+    except ValueError:
+        return None
+
 # Create your models here.
@@ -1,27 +1,102 @@
 from rest_framework import permissions, viewsets, views, status
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.serializers import ModelSerializer
-from .models import Assessment
-from django.db.models import Avg
-from datetime import datetime, timedelta
+from . import export
+from .expressions import JSONArrayLength
+from .models import Assessment, QuizTopicStat
+from django.db import transaction
+from django.db.models import Avg, Case, CharField, Count, IntegerField, JSONField, Q, Value, When
+from django.db.models.fields.json import KT, KeyTransform
+from django.db.models.functions import Substr, TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+import base64
+import binascii
+
+
+def requested_fields(request):
+    """Known field names from ``?fields=a,b`` on reads (id always included), or None for every field."""
+    if request is None or request.method != 'GET':
+        return None
+    raw = request.query_params.get('fields') or ''
+    wanted = { f.strip() for f in raw.split(',') } & set(AssessmentSerializer.Meta.fields)
+    return (wanted | {'id'}) if wanted else None
 
 
 class AssessmentSerializer(ModelSerializer):
     class Meta:
         model = Assessment
-        fields = ["id", "title", "score", "data", "created_at"]
+        fields = ["id", "title", "kind", "score", "data", "event_date", "created_at"]
+        read_only_fields = ["kind", "event_date"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get('request'))
+        if wanted:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class AssessmentCursorPagination(CursorPagination):
+    ordering = '-created_at'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
 
 
 class AssessmentViewSet(viewsets.ModelViewSet):
+    """Assessments of the current user.
+
+    List options (all opt-in; without them the response is the plain list the
+    frontend expects):
+    - ``page_size``/``cursor``: cursor pagination on created_at ({next, previous, results})
+    - ``fields=id,title,created_at``: only these fields; ``data`` is not even loaded unless listed
+    - ``kind=quiz_result,daily_report``: only these kinds
+    """
     serializer_class = AssessmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AssessmentCursorPagination
 
     def get_queryset(self):
-        # Optimize query with select_related and prefetch_related if needed
-        return Assessment.objects.filter(user=self.request.user).order_by('-created_at')  # type: ignore[attr-defined]
+        qs = Assessment.objects.filter(user=self.request.user).order_by('-created_at')  # type: ignore[attr-defined]
+        if self.action == 'list':
+            kinds = [k.strip() for k in (self.request.query_params.get('kind') or '').split(',') if k.strip()]
+            if kinds:
+                qs = qs.filter(kind__in=kinds)
+            wanted = requested_fields(self.request)
+            if wanted and 'data' not in wanted:
+                # List pages skip the JSON blob; detail requests fetch it
+                qs = qs.defer('data')
+        return qs
 
+    def paginate_queryset(self, queryset):
+        params = self.request.query_params
+        if 'cursor' not in params and 'page_size' not in params:
+            return None
+        return super().paginate_queryset(queryset)
+
+    # Quiz results written here keep the per-topic counters in step, like SaveQuizResultView
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            result = serializer.save(user=self.request.user)
+            if result.kind == Assessment.QUIZ_RESULT:
+                QuizTopicStat.record_result(result)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            if serializer.instance.kind == Assessment.QUIZ_RESULT:
+                QuizTopicStat.forget_result(serializer.instance)
+            result = serializer.save()
+            if result.kind == Assessment.QUIZ_RESULT:
+                QuizTopicStat.record_result(result)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            if instance.kind == Assessment.QUIZ_RESULT:
+                QuizTopicStat.forget_result(instance)
+            instance.delete()
 
 # Create your views here.
 
@@ -30,44 +105,17 @@ class QuizStatsView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        # Optimize query with better filtering and limit results
-        qs = Assessment.objects.filter(user=request.user).order_by('-created_at')[:100]  # Limit to last 100  # type: ignore[attr-defined]
-        
-        # Average over saved quiz results; fallback to any Assessment titled like Quiz
-        quiz_results = [a for a in qs if 'QuizResult' in a.title]
-        if not quiz_results:
-            quiz_results = [a for a in qs if 'Quiz' in a.title]
-        
-        # Calculate average score more efficiently
-        scores = [a.score for a in quiz_results if a.score]
-        avg_score = sum(scores) / len(scores) if scores else 0
-
-        # Per-topic accuracy if available in data
-        from collections import defaultdict
-        topic_correct = defaultdict(int)
-        topic_total = defaultdict(int)
-        
-        # Limit processing to most recent quiz results for performance
-        for a in quiz_results[:20]:  # Process only last 20 quiz results
-            data = a.data or {}
-            per_q = data.get('questions') or []
-            selected = data.get('selected') or {}
-            topic = (data.get('topics') or '').strip() or 'Genel'
-            if per_q and isinstance(per_q, list):
-                for idx, q in enumerate(per_q):
-                    key = str(idx)
-                    user_choice = selected.get(key)
-                    correct = q.get('correct')
-                    topic_total[topic] += 1
-                    if user_choice == correct:
-                        topic_correct[topic] += 1
-                        
+        # One indexed read of the user's per-topic counters (all history, most recent topic first)
+        stats = list(QuizTopicStat.objects.filter(user=request.user).order_by('-last_seen'))  # type: ignore[attr-defined]
+        quizzes = sum(s.quizzes for s in stats)
+        avg_score = sum(s.score_sum for s in stats) / quizzes if quizzes else 0
+
         topic_stats = []
-        for t in topic_total.keys():
-            total = topic_total[t]
-            corr = topic_correct[t]
-            pct = round((corr / max(total, 1)) * 100, 2)
-            topic_stats.append({ 'topic': t, 'accuracy': pct, 'total': total })
+        for s in stats:
+            if not s.attempts:
+                continue
+            pct = round((s.correct / s.attempts) * 100, 2)
+            topic_stats.append({ 'topic': s.topic, 'accuracy': pct, 'total': s.attempts })
 
         return Response({ 'average': round(avg_score or 0, 2), 'topics': topic_stats })
 
@@ -82,75 +130,121 @@ class SaveQuizResultView(views.APIView):
             questions = payload.get('questions') or []
             selected = payload.get('selected') or {}
             score = float(payload.get('score') or 0)
-            Assessment.objects.create(  # type: ignore[attr-defined]
-                user=request.user,
-                title='QuizResult',
-                score=score,
-                data={ 'topics': topics, 'questions': questions, 'selected': selected }
-            )
+            data = { 'topics': topics, 'questions': questions, 'selected': selected }
+            with transaction.atomic():
+                result = Assessment.objects.create(  # type: ignore[attr-defined]
+                    user=request.user,
+                    title='QuizResult',
+                    kind=Assessment.QUIZ_RESULT,
+                    score=score,
+                    data=data
+                )
+                QuizTopicStat.record_result(result)
             return Response({ 'ok': True }, status=status.HTTP_201_CREATED)
         except Exception as e:
             return Response({ 'ok': False, 'error': str(e) }, status=status.HTTP_400_BAD_REQUEST)
 
 
+# Calendar event type -> Assessment kinds
+EVENT_KINDS = {
+    'quiz': [Assessment.QUIZ, Assessment.QUIZ_RESULT],
+    'report': [Assessment.REPORT, Assessment.EXAM_ANALYSIS, Assessment.DAILY_REPORT, Assessment.DAILY_REPORT_ANALYSIS],
+    'schedule': [Assessment.SCHEDULE],
+}
+
+
 class PastEventsView(views.APIView):
+    """Calendar feed of the user's assessments.
+
+    Range: ``start``/``end`` (YYYY-MM-DD, inclusive) or ``days`` back from today
+    (default 30). ``type`` filters by event type. Events come newest first,
+    ``limit`` (default 50) at a time; pass ``next_cursor`` back as ``cursor``
+    for the next page. ``days`` in the response counts every event of the range
+    per date and type, whatever page is shown.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
 
     def get(self, request):
         """Get user's past events/assessments with proper formatting for calendar view"""
         try:
-            # Get filter parameters
-            days_back = int(request.GET.get('days', 30))  # Default last 30 days
-            event_type = request.GET.get('type', 'all')  # all, quiz, schedule, report
-            
-            # Calculate date range
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days_back)
+            try:
+                start_date, end_date = self._date_range(request)
+                limit = max(1, min(int(request.GET.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT))
+                cursor = self._decode_cursor(request.GET.get('cursor'))
+            except ValueError:
+                return Response({
+                    'error': 'Geçersiz tarih aralığı, limit veya cursor',
+                    'events': [],
+                    'events_by_date': {}
+                }, status=status.HTTP_400_BAD_REQUEST)
+            event_type = request.GET.get('type', 'all')  # all, quiz, schedule, report, other
             
             # Query assessments within date range
+            tz = timezone.get_current_timezone()
             qs = Assessment.objects.filter(  # type: ignore[attr-defined]
                 user=request.user,
-                created_at__gte=start_date,
-                created_at__lte=end_date
-            ).order_by('-created_at')
+                created_at__gte=datetime.combine(start_date, time.min, tzinfo=tz),
+                created_at__lt=datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=tz)
+            )
             
             # Filter by type if specified
-            if event_type != 'all':
-                type_filters = {
-                    'quiz': ['Quiz', 'QuizResult'],
-                    'schedule': ['Schedule', 'StudyPlan'],
-                    'report': ['Rapor', 'Report', 'ExamAnalysis']
-                }
-                if event_type in type_filters:
-                    title_contains = type_filters[event_type]
-                    qs = qs.filter(title__in=title_contains)
+            known = [kind for kinds in EVENT_KINDS.values() for kind in kinds]
+            if event_type in EVENT_KINDS:
+                qs = qs.filter(kind__in=EVENT_KINDS[event_type])
+            elif event_type == 'other':
+                qs = qs.exclude(kind__in=known)
+            
+            # Per-day counts over the whole range, grouped in the database
+            days = []
+            per_day = qs.annotate(day=TruncDate('created_at', tzinfo=tz)).values('day').annotate(
+                total=Count('id'),
+                **{ t: Count('id', filter=Q(kind__in=kinds)) for t, kinds in EVENT_KINDS.items() },
+            ).order_by('-day')
+            for row in per_day:
+                days.append({
+                    'date': row['day'].isoformat(),
+                    'total': row['total'],
+                    **{ t: row[t] for t in EVENT_KINDS },
+                    'other': row['total'] - sum(row[t] for t in EVENT_KINDS),
+                })
+            
+            # One page of events, newest first, keyed on (created_at, id)
+            page = qs.order_by('-created_at', '-id')
+            if cursor:
+                page = page.filter(Q(created_at__lt=cursor[0]) | Q(created_at=cursor[0], id__lt=cursor[1]))
+            rows = list(self._annotate(page).values(
+                'id', 'title', 'score', 'created_at', 'event_type',
+                'topics', 'questions_count', 'summary', 'metrics', 'items_count',
+            )[:limit + 1])
+            has_more = len(rows) > limit
+            rows = rows[:limit]
             
             # Format events for frontend
             events = []
-            for assessment in qs[:50]:  # Limit to 50 most recent
-                event_data = {
-                    'id': assessment.id,
-                    'title': assessment.title,
-                    'date': assessment.created_at.strftime('%Y-%m-%d'),
-                    'time': assessment.created_at.strftime('%H:%M'),
-                    'score': assessment.score,
-                    'type': self._get_event_type(assessment.title),
-                    'details': self._format_event_details(assessment)
-                }
-                events.append(event_data)
-            
-            # Group events by date for calendar view
             events_by_date = {}
-            for event in events:
-                date = event['date']
-                if date not in events_by_date:
-                    events_by_date[date] = []
-                events_by_date[date].append(event)
+            for row in rows:
+                created = timezone.localtime(row['created_at'])
+                event = {
+                    'id': row['id'],
+                    'title': row['title'],
+                    'date': created.strftime('%Y-%m-%d'),
+                    'time': created.strftime('%H:%M'),
+                    'score': row['score'],
+                    'type': row['event_type'],
+                    'details': self._details(row)
+                }
+                events.append(event)
+                events_by_date.setdefault(event['date'], []).append(event)
             
             return Response({
                 'events': events,
                 'events_by_date': events_by_date,
-                'total_count': len(events),
+                'days': days,
+                'total_count': sum(d['total'] for d in days),
+                'has_more': has_more,
+                'next_cursor': self._encode_cursor(rows[-1]) if has_more else None,
                 'date_range': {
                     'start': start_date.strftime('%Y-%m-%d'),
                     'end': end_date.strftime('%Y-%m-%d')
@@ -163,44 +257,123 @@ class PastEventsView(views.APIView):
                 'events': [],
                 'events_by_date': {}
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    def _get_event_type(self, title):
-        """Determine event type from title"""
-        title_lower = title.lower()
-        if 'quiz' in title_lower:
-            return 'quiz'
-        elif any(word in title_lower for word in ['rapor', 'report', 'exam', 'analiz']):
-            return 'report'
-        elif any(word in title_lower for word in ['schedule', 'plan']):
-            return 'schedule'
+
+    def _date_range(self, request):
+        today = timezone.localdate()
+        end = parse_date(request.GET['end']) if request.GET.get('end') else today
+        if request.GET.get('start'):
+            start = parse_date(request.GET['start'])
         else:
-            return 'other'
-    
-    def _format_event_details(self, assessment):
+            start = (end or today) - timedelta(days=int(request.GET.get('days', 30)))  # Default last 30 days
+        if start is None or end is None or start > end:
+            raise ValueError('invalid range')
+        return start, end
+
+    @staticmethod
+    def _encode_cursor(row):
+        raw = f"{row['created_at'].isoformat()}|{row['id']}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(value):
+        if not value:
+            return None
+        try:
+            created, pk = base64.urlsafe_b64decode(value.encode()).decode().split('|')
+        except (binascii.Error, UnicodeDecodeError) as e:
+            raise ValueError('invalid cursor') from e
+        created_at = parse_datetime(created)
+        if created_at is None:
+            raise ValueError('invalid cursor')
+        return created_at, int(pk)
+
+    @staticmethod
+    def _annotate(qs):
+        """Event type and, per type, only the JSON values its details need."""
+        def only_for(event_type, expression, output_field):
+            return Case(When(kind__in=EVENT_KINDS[event_type], then=expression), default=Value(None), output_field=output_field)
+
+        return qs.annotate(
+            event_type=Case(
+                *[When(kind__in=kinds, then=Value(t)) for t, kinds in EVENT_KINDS.items()],
+                default=Value('other'), output_field=CharField(),
+            ),
+        ).annotate(
+            topics=only_for('quiz', KT('data__topics'), CharField()),
+            questions_count=only_for('quiz', JSONArrayLength('data', 'questions'), IntegerField()),
+            summary=only_for('report', Substr(KT('data__summary'), 1, 101), CharField()),
+            metrics=only_for('report', KeyTransform('metrics', 'data'), JSONField()),
+            # Saved schedules keep their days under data.schedule or data.schedule.schedule
+            items_count=only_for(
+                'schedule',
+                JSONArrayLength('data', 'schedule') + JSONArrayLength('data', 'schedule', 'schedule'),
+                IntegerField(),
+            ),
+        )
+
+    def _details(self, row):
         """Format event details based on type"""
-        data = assessment.data or {}
-        event_type = self._get_event_type(assessment.title)
-        
+        event_type = row['event_type']
         if event_type == 'quiz':
-            questions_count = len(data.get('questions', []))
-            topics = data.get('topics', 'Genel')
             return {
-                'topics': topics,
-                'questions_count': questions_count,
-                'score_percentage': f"{assessment.score}%" if assessment.score else '0%'
+                'topics': row['topics'] or 'Genel',
+                'questions_count': row['questions_count'] or 0,
+                'score_percentage': f"{row['score']}%" if row['score'] else '0%'
             }
         elif event_type == 'report':
-            summary = data.get('summary', '')[:100] + '...' if len(data.get('summary', '')) > 100 else data.get('summary', '')
+            summary = row['summary'] or ''
             return {
-                'summary': summary,
-                'metrics': data.get('metrics', {})
+                'summary': summary[:100] + '...' if len(summary) > 100 else summary,
+                'metrics': row['metrics'] or {}
             }
         elif event_type == 'schedule':
             return {
                 'description': 'Ders programı oluşturuldu',
-                'items_count': len(data.get('schedule', []))
+                'items_count': row['items_count'] or 0
             }
         else:
             return {
                 'description': 'Genel etkinlik'
             }
+
+
+class ExportAssessmentsView(views.APIView):
+    """Stream the user's whole history as NDJSON (default) or CSV (``?format=csv``).
+
+    Filters: ``kind`` (comma-separated), ``start``/``end`` (YYYY-MM-DD).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [export.NDJSONRenderer, export.CSVRenderer]
+
+    def get(self, request):
+        try:
+            filters = export.parse_filters(request.query_params)
+        except ValueError as e:
+            return Response({ 'error': str(e) }, status=status.HTTP_400_BAD_REQUEST)
+        qs = Assessment.objects.filter(user=request.user, **filters)  # type: ignore[attr-defined]
+        filename = f"assessments-{request.user.username}-{timezone.localdate():%Y%m%d}"
+        return export.response(qs, request.accepted_renderer.format, filename, asgi=export.served_over_asgi(request))
+
+
+class ExportClassAssessmentsView(views.APIView):
+    """Teacher export: the histories of a class in one stream, with user_id/username columns.
+
+    Class: ``users`` (comma-separated ids or usernames) and/or ``grade_level``;
+    same filters and formats as the personal export.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [export.NDJSONRenderer, export.CSVRenderer]
+
+    def get(self, request):
+        students = export.resolve_students(request.query_params.get('users'), request.query_params.get('grade_level'))
+        if students is None:
+            return Response({ 'error': 'users veya grade_level gerekli' }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            filters = export.parse_filters(request.query_params)
+        except ValueError as e:
+            return Response({ 'error': str(e) }, status=status.HTTP_400_BAD_REQUEST)
+        qs = Assessment.objects.filter(user__in=students.values('pk'), **filters)  # type: ignore[attr-defined]
+        filename = f"assessments-class-{timezone.localdate():%Y%m%d}"
+        return export.response(
+            qs, request.accepted_renderer.format, filename, with_user=True, asgi=export.served_over_asgi(request),
+        )
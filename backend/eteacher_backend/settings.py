@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     'students',
     'assessments',
     'ai',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -88,19 +89,48 @@ WSGI_APPLICATION = 'eteacher_backend.wsgi.application'
 
 
 # Database performance optimizations
+# DB_ENGINE picks the profile. Connections are reused for DB_CONN_MAX_AGE
+# seconds (0 reconnects per request) and health-checked before reuse.
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.sqlite3'),
+        'ENGINE': DB_ENGINE,
         'NAME': os.getenv('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
         'USER': os.getenv('DB_USER', 'postgres'),
         'PASSWORD': os.getenv('DB_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', '127.0.0.1'),
         'PORT': os.getenv('DB_PORT', '5432'),
-        'OPTIONS': {
-            'timeout': 5,  # SQLite connection timeout
-        }
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
     }
 }
+if DB_ENGINE.endswith('sqlite3'):
+    # WAL lets readers run alongside the single writer; synchronous=NORMAL is
+    # durable in WAL mode except for the last commits on power loss. IMMEDIATE
+    # transactions take the write lock up front, so a read-then-write block
+    # waits for busy_timeout instead of failing with "database is locked".
+    _sqlite_timeout = int(os.getenv('DB_SQLITE_TIMEOUT', '20'))
+    _sqlite_pragmas = [
+        f"PRAGMA busy_timeout = {_sqlite_timeout * 1000}",
+        f"PRAGMA mmap_size = {int(os.getenv('DB_SQLITE_MMAP_MB', '128')) * 1024 * 1024}",
+        "PRAGMA cache_size = -20000",  # ~20 MB page cache per connection
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if os.getenv('DB_SQLITE_WAL', '1') == '1':
+        _sqlite_pragmas[:0] = ["PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL"]
+    DATABASES['default']['OPTIONS'] = {
+        'timeout': _sqlite_timeout,
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': ';'.join(_sqlite_pragmas),
+    }
+elif 'postgresql' in DB_ENGINE:
+    DATABASES['default']['OPTIONS'] = {
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+        'application_name': os.getenv('DB_APPLICATION_NAME', 'eteacher'),
+    }
+    if os.getenv('DB_SSLMODE'):
+        DATABASES['default']['OPTIONS']['sslmode'] = os.getenv('DB_SSLMODE')
 
 
 # Password validation
@@ -209,6 +239,49 @@ SESSION_CACHE_ALIAS = 'default'
 SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_SAVE_EVERY_REQUEST = False
 
+# Cache configuration
+# 'ai' holds provider completions (see ai/cache.py); LocMemCache evicts
+# least-recently-used entries once MAX_ENTRIES is reached.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'ai': {
+        'BACKEND': os.getenv('AI_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('AI_CACHE_LOCATION', 'ai-completions'),
+        'TIMEOUT': int(os.getenv('AI_CACHE_TTL', '3600')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('AI_CACHE_MAX_ENTRIES', '2000')),
+            'CULL_FREQUENCY': 10,  # drop the oldest 10% when full
+        },
+    },
+}
+
+# Endpoints whose completions are cached, with their TTL in seconds.
+# Endpoints that salt prompts with random seeds (quiz, recommend) gain nothing here.
+AI_CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', '1') == '1'
+AI_CACHE_ENDPOINTS = {
+    'target_nets': int(os.getenv('AI_CACHE_TTL_TARGET_NETS', str(7 * 24 * 3600))),
+    'per_course_averages': int(os.getenv('AI_CACHE_TTL_PER_COURSE_AVERAGES', str(24 * 3600))),
+    'summarize': int(os.getenv('AI_CACHE_TTL_SUMMARIZE', str(24 * 3600))),
+}
+# Identical in-flight prompts always share one upstream call within a process;
+# enable this to coalesce across processes through a lock in the 'ai' cache
+# (only useful when that alias is a shared backend such as Redis).
+AI_SINGLE_FLIGHT_CROSS_PROCESS = os.getenv('AI_SINGLE_FLIGHT_CROSS_PROCESS', '0') == '1'
+
+# Token-bucket limits on AI endpoints (see ai.throttling): '<count>/<s|min|hour|day>',
+# empty for no limit. Buckets live in AI_THROTTLE_CACHE; point it at a shared
+# backend (Redis/Memcached) so limits hold across workers.
+AI_THROTTLE_ENABLED = os.getenv('AI_THROTTLE_ENABLED', '1') == '1'
+AI_THROTTLE_RATES = {
+    'user': os.getenv('AI_RATE_USER', '30/min') or None,
+    'anon': os.getenv('AI_RATE_ANON', '10/min') or None,
+    'global': os.getenv('AI_RATE_GLOBAL', '600/min') or None,
+}
+AI_THROTTLE_CACHE = os.getenv('AI_THROTTLE_CACHE', 'default')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
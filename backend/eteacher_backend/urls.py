@@ -22,8 +22,10 @@ from rest_framework_simplejwt.views import (
 )
 from accounts.views import RegisterView, ProfileView, SaveCareerRoadmapView, CareerRoadmapListView, EmailOrUsernameTokenObtainPairView
 from students.views import StudentViewSet
-from assessments.views import AssessmentViewSet, QuizStatsView, SaveQuizResultView, PastEventsView
-from ai.views import AIRecommendView, AISummarizeView, AIStudyScheduleView, AIQuizGenerateView, AIReportGenerateView, AIExamAnalysisView, AIPsychSupportView, AIChatView, AIChatSaveThreadView, AIChatHistoryView, AIChatLoadView, AIChatNewView, AIScheduleSaveView, AIDailyReportView, AIDailyReportAnalyzeView, TargetNetsView, AIPerCourseAveragesView
+from assessments.views import AssessmentViewSet, QuizStatsView, SaveQuizResultView, PastEventsView, ExportAssessmentsView, ExportClassAssessmentsView
+from ai import async_views as ai_async
+from jobs.views import JobDetailView
+from ai.views import AIRecommendView, AISummarizeView, AIStudyScheduleView, AIQuizGenerateView, AIReportGenerateView, AIExamAnalysisView, AIPsychSupportView, AIChatView, AIChatStreamView, AIChatSaveThreadView, AIChatHistoryView, AIChatLoadView, AIChatNewView, AIScheduleSaveView, AIScheduleRepairView, AIScheduleBatchView, AIDailyReportView, AIDailyReportAnalyzeView, TargetNetsView, AIPerCourseAveragesView, AICacheStatsView, AIProviderStatusView, AIQuestionBankStatsView, AIThrottleStatsView
 
 router = DefaultRouter()
 router.register(r'students', StudentViewSet, basename='student')
@@ -41,16 +43,22 @@ urlpatterns = [
     path('api/assessments-actions/quiz-stats/', QuizStatsView.as_view(), name='quiz_stats'),
     path('api/assessments-actions/save-quiz/', SaveQuizResultView.as_view(), name='save_quiz'),
     path('api/assessments-actions/past-events/', PastEventsView.as_view(), name='past_events'),
+    path('api/assessments-actions/export/', ExportAssessmentsView.as_view(), name='export_assessments'),
+    path('api/assessments-actions/export/class/', ExportClassAssessmentsView.as_view(), name='export_class_assessments'),
     path('api/', include(router.urls)),
     path('api/ai/recommend/', AIRecommendView.as_view(), name='ai_recommend'),
     path('api/ai/summarize/', AISummarizeView.as_view(), name='ai_summarize'),
     path('api/ai/schedule/', AIStudyScheduleView.as_view(), name='ai_schedule'),
     path('api/ai/schedule/save/', AIScheduleSaveView.as_view(), name='ai_schedule_save'),
+    path('api/ai/schedule/repair/', AIScheduleRepairView.as_view(), name='ai_schedule_repair'),
+    path('api/ai/schedule/batch/', AIScheduleBatchView.as_view(), name='ai_schedule_batch'),
     path('api/ai/quiz/', AIQuizGenerateView.as_view(), name='ai_quiz'),
+    path('api/ai/quiz/bank/', AIQuestionBankStatsView.as_view(), name='ai_quiz_bank'),
     path('api/ai/report/', AIReportGenerateView.as_view(), name='ai_report'),
     path('api/ai/exam-analysis/', AIExamAnalysisView.as_view(), name='ai_exam_analysis'),
     path('api/ai/psych-support/', AIPsychSupportView.as_view(), name='ai_psych_support'),
     path('api/ai/chat/', AIChatView.as_view(), name='ai_chat'),
+    path('api/ai/chat/stream/', AIChatStreamView.as_view(), name='ai_chat_stream'),
     path('api/ai/chat/save-thread/', AIChatSaveThreadView.as_view(), name='ai_chat_save_thread'),
     path('api/ai/chat/history/', AIChatHistoryView.as_view(), name='ai_chat_history'),
     path('api/ai/chat/load/<int:chat_id>/', AIChatLoadView.as_view(), name='ai_chat_load'),
@@ -61,4 +69,20 @@ urlpatterns = [
     path('api/ai/daily-report/<str:date>/', AIDailyReportView.as_view(), name='ai_daily_report'),
     path('api/ai/target-nets/', TargetNetsView.as_view(), name='ai_target_nets'),
     path('api/ai/per-course-averages/', AIPerCourseAveragesView.as_view(), name='ai_per_course_averages'),
+    path('api/ai/cache/stats/', AICacheStatsView.as_view(), name='ai_cache_stats'),
+    path('api/ai/provider/status/', AIProviderStatusView.as_view(), name='ai_provider_status'),
+    path('api/ai/throttle/stats/', AIThrottleStatsView.as_view(), name='ai_throttle_stats'),
+    path('api/jobs/<uuid:pk>/', JobDetailView.as_view(), name='job_detail'),
+    # ASGI-native variants: same behavior, provider calls are awaited instead of blocking a worker thread
+    path('api/ai/async/recommend/', ai_async.ai_recommend, name='ai_async_recommend'),
+    path('api/ai/async/summarize/', ai_async.ai_summarize, name='ai_async_summarize'),
+    path('api/ai/async/schedule/', ai_async.ai_schedule, name='ai_async_schedule'),
+    path('api/ai/async/quiz/', ai_async.ai_quiz, name='ai_async_quiz'),
+    path('api/ai/async/exam-analysis/', ai_async.ai_exam_analysis, name='ai_async_exam_analysis'),
+    path('api/ai/async/psych-support/', ai_async.ai_psych_support, name='ai_async_psych_support'),
+    path('api/ai/async/chat/', ai_async.ai_chat, name='ai_async_chat'),
+    path('api/ai/async/chat/stream/', ai_async.ai_chat_stream, name='ai_async_chat_stream'),
+    path('api/ai/async/daily-report/analyze/', ai_async.ai_daily_report_analyze, name='ai_async_daily_report_analyze'),
+    path('api/ai/async/target-nets/', ai_async.ai_target_nets, name='ai_async_target_nets'),
+    path('api/ai/async/per-course-averages/', ai_async.ai_per_course_averages, name='ai_async_per_course_averages'),
 ]
\ No newline at end of file
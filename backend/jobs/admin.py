@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'status_code', 'user', 'attempts', 'worker', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('id', 'kind', 'user__username')
+    readonly_fields = ('id', 'created_at', 'started_at', 'finished_at')
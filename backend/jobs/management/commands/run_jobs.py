@@ -0,0 +1,69 @@
+"""
+Run background job workers.
+
+Starts ``--processes`` worker processes with ``--threads`` threads each; every
+thread claims one job at a time. Jobs mostly wait on the AI provider, so
+threads are cheap parallelism and processes add CPU headroom.
+
+    python manage.py run_jobs --processes 2 --threads 4
+    python manage.py run_jobs --once        # drain the queue and exit
+"""
+import multiprocessing
+import os
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs import queue
+
+
+def _worker_process(name, threads, poll):
+    stop = threading.Event()
+    pool = [
+        threading.Thread(target=queue.work, args=(f'{name}-t{i}', poll), kwargs={ 'stop': stop }, daemon=True)
+        for i in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    try:
+        for thread in pool:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set()
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers for queued AI requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=int(os.getenv('JOBS_PROCESSES', '2')))
+        parser.add_argument('--threads', type=int, default=int(os.getenv('JOBS_THREADS', '4')))
+        parser.add_argument('--poll', type=float, default=0.5, help='Seconds between polls of an empty queue')
+        parser.add_argument('--once', action='store_true', help='Run queued jobs in this process, then exit')
+
+    def handle(self, *args, **options):
+        base = f'{socket.gethostname()}-{os.getpid()}'
+        if options['once']:
+            done = queue.work(base, options['poll'], once=True)
+            self.stdout.write(f'{done} jobs run')
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=_worker_process, args=(f'{base}-p{i}', options['threads'], options['poll']), name=f'jobs-{i}')
+            for i in range(max(1, options['processes']))
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"{len(workers)} worker processes x {options['threads']} threads")
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
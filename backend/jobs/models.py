@@ -0,0 +1,40 @@
+import uuid
+
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class Job(models.Model):
+    """A slow API request run by a background worker (see jobs/queue.py)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    kind = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, blank=True)  # request body of the original POST
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # HTTP status the view returned
+    result = models.JSONField(null=True, blank=True)  # response body the view returned
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)  # type: ignore[arg-type]
+    worker = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self) -> str:
+        return f"Job({self.kind}, {self.status})"
@@ -0,0 +1,165 @@
+"""
+Database-backed job queue for slow AI endpoints.
+
+A view that supports background mode enqueues its request body as a ``Job``
+and answers 202 with the job id; ``manage.py run_jobs`` workers claim queued
+jobs, run the same view code (``post_steps``) and store the response. Clients
+poll ``GET /api/jobs/<id>/``.
+
+Claiming is an optimistic ``UPDATE ... WHERE status='queued'``, so any number of
+worker processes can share the queue on SQLite or Postgres without a broker.
+A job left running past JOBS_STALE_AFTER seconds (worker died) is queued again,
+up to JOBS_MAX_ATTEMPTS attempts.
+
+Config (env):
+- JOBS_MAX_ATTEMPTS (default 3)
+- JOBS_STALE_AFTER: seconds (default 300)
+- JOBS_EAGER=1: run each job in a thread of the web process right away (dev, no worker)
+"""
+import os
+import threading
+import time
+import traceback
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Job
+
+# kind -> view whose post_steps runs the job
+KINDS = {
+    'quiz': 'ai.views.AIQuizGenerateView',
+    'schedule': 'ai.views.AIStudyScheduleView',
+    'daily_report_analyze': 'ai.views.AIDailyReportAnalyzeView',
+    'exam_analysis': 'ai.views.AIExamAnalysisView',
+}
+
+MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', '3'))
+STALE_AFTER = int(os.getenv('JOBS_STALE_AFTER', '300'))
+EAGER = os.getenv('JOBS_EAGER', '0') == '1'
+
+
+class JobRequest:
+    """The parts of a DRF request the AI views read, rebuilt from a stored job."""
+
+    def __init__(self, data: Dict[str, Any], user):
+        self.data = data
+        self.user = user
+        self.query_params: Dict[str, Any] = {}
+
+
+def wants_background(request) -> bool:
+    flag = request.query_params.get('background')
+    if flag is None and hasattr(request.data, 'get'):
+        flag = request.data.get('background')
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+
+def enqueue(kind: str, request) -> Job:
+    data = request.data.dict() if hasattr(request.data, 'dict') else dict(request.data or {})
+    data.pop('background', None)
+    user = request.user if getattr(request, 'user', None) is not None and request.user.is_authenticated else None
+    job = Job.objects.create(user=user, kind=kind, payload=data)  # type: ignore[attr-defined]
+    print(f"Job {job.pk} queued ({kind})")
+    if EAGER:
+        transaction.on_commit(lambda: _run_in_thread(job.pk))
+    return job
+
+
+def accepted(job: Job) -> Response:
+    return Response({
+        'job_id': str(job.pk),
+        'status': job.status,
+        'status_url': f'/api/jobs/{job.pk}/',
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def _run_in_thread(pk) -> None:
+    def run():
+        try:
+            job = claim(worker='eager', pk=pk)
+            if job:
+                execute(job)
+        finally:
+            close_old_connections()
+
+    threading.Thread(target=run, name=f'job-{pk}', daemon=True).start()
+
+
+def claim(worker: str, pk=None) -> Optional[Job]:
+    """Mark the oldest queued job (or job ``pk``) running for ``worker`` and return it."""
+    candidates = Job.objects.filter(status=Job.QUEUED)  # type: ignore[attr-defined]
+    if pk is not None:
+        candidates = candidates.filter(pk=pk)
+    for candidate in candidates.order_by('created_at').values_list('pk', flat=True)[:10]:
+        won = Job.objects.filter(pk=candidate, status=Job.QUEUED).update(  # type: ignore[attr-defined]
+            status=Job.RUNNING, worker=worker, started_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if won:
+            return Job.objects.select_related('user').get(pk=candidate)  # type: ignore[attr-defined]
+    return None
+
+
+def execute(job: Job) -> None:
+    """Run the job's view and store its response (or the error)."""
+    from ai.provider import run_sync
+
+    started = time.monotonic()
+    try:
+        view = import_string(KINDS[job.kind])()
+        request = JobRequest(job.payload or {}, job.user or AnonymousUser())
+        response = run_sync(view.post_steps(request))
+        Job.objects.filter(pk=job.pk).update(  # type: ignore[attr-defined]
+            status=Job.DONE, status_code=response.status_code, result=response.data,
+            error='', finished_at=timezone.now(),
+        )
+        print(f"Job {job.pk} done ({job.kind}, {response.status_code}) in {time.monotonic() - started:.1f}s")
+    except Exception as e:
+        traceback.print_exc()
+        retry = job.attempts < MAX_ATTEMPTS
+        Job.objects.filter(pk=job.pk).update(  # type: ignore[attr-defined]
+            status=Job.QUEUED if retry else Job.FAILED, error=str(e)[:2000],
+            finished_at=None if retry else timezone.now(),
+        )
+        print(f"Job {job.pk} failed ({job.kind}, attempt {job.attempts}): {e}")
+
+
+def requeue_stale() -> int:
+    """Queue again (or fail) jobs whose worker stopped reporting; returns how many were touched."""
+    cutoff = timezone.now() - timedelta(seconds=STALE_AFTER)
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=cutoff)  # type: ignore[attr-defined]
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=Job.FAILED, error='Worker zaman aşımı', finished_at=timezone.now(),
+    )
+    return failed + stale.update(status=Job.QUEUED)
+
+
+def work(worker: str, poll: float = 0.5, once: bool = False, stop: Optional[threading.Event] = None) -> int:
+    """Claim and run jobs until ``stop`` is set (or, with ``once``, until the queue is empty)."""
+    done = 0
+    last_sweep = 0.0
+    while not (stop and stop.is_set()):
+        if time.monotonic() - last_sweep > 30:
+            requeue_stale()
+            last_sweep = time.monotonic()
+        job = claim(worker)
+        if job is None:
+            if once:
+                break
+            close_old_connections()
+            if stop:
+                stop.wait(poll)
+            else:
+                time.sleep(poll)
+            continue
+        execute(job)
+        done += 1
+    close_old_connections()
+    return done
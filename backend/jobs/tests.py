@@ -0,0 +1,127 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from . import queue
+from .models import Job
+
+
+class FailingView:
+    def post_steps(self, request):
+        raise RuntimeError('provider down')
+
+
+class EchoView:
+    def post_steps(self, request):
+        if False:
+            yield
+        return Response({ 'echo': request.data.get('text') }, status=201)
+
+
+TEST_KINDS = { 'fail': 'jobs.tests.FailingView', 'echo': 'jobs.tests.EchoView' }
+
+
+class ClaimTests(TestCase):
+    def test_claim_marks_oldest_job_running_once(self):
+        first = Job.objects.create(kind='echo')
+        Job.objects.create(kind='echo')
+
+        job = queue.claim('w1')
+
+        self.assertEqual(job.pk, first.pk)
+        self.assertEqual((job.status, job.worker, job.attempts), (Job.RUNNING, 'w1', 1))
+        self.assertIsNone(queue.claim('w2', pk=first.pk))
+
+    def test_claim_skips_a_job_taken_between_read_and_update(self):
+        contested = Job.objects.create(kind='echo')
+        other = Job.objects.create(kind='echo')
+        real_now = timezone.now
+
+        def competing_worker_wins():
+            # Runs while claim() builds its UPDATE, i.e. after it read the candidates
+            Job.objects.filter(pk=contested.pk).update(status=Job.RUNNING, worker='w2')
+            return real_now()
+
+        with mock.patch('jobs.queue.timezone.now', side_effect=competing_worker_wins):
+            job = queue.claim('w1')
+
+        self.assertEqual(job.pk, other.pk)
+        contested.refresh_from_db()
+        self.assertEqual((contested.worker, contested.attempts), ('w2', 0))
+
+
+@mock.patch.dict(queue.KINDS, TEST_KINDS)
+@mock.patch('jobs.queue.traceback.print_exc')
+class ExecuteTests(TestCase):
+    def test_success_stores_response(self, _print_exc):
+        Job.objects.create(kind='echo', payload={ 'text': 'merhaba' })
+
+        queue.execute(queue.claim('w1'))
+
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.status_code, job.result), (Job.DONE, 201, { 'echo': 'merhaba' }))
+        self.assertIsNotNone(job.finished_at)
+
+    @mock.patch('jobs.queue.MAX_ATTEMPTS', 2)
+    def test_failure_is_retried_then_failed(self, _print_exc):
+        Job.objects.create(kind='fail')
+
+        queue.execute(queue.claim('w1'))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.error), (Job.QUEUED, 1, 'provider down'))
+        self.assertIsNone(job.finished_at)
+
+        queue.execute(queue.claim('w1'))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(queue.claim('w1'))
+
+
+@mock.patch('jobs.queue.MAX_ATTEMPTS', 2)
+class RequeueStaleTests(TestCase):
+    def test_stale_jobs_are_queued_again_or_failed(self):
+        old = timezone.now() - timedelta(seconds=queue.STALE_AFTER + 60)
+        retry = Job.objects.create(kind='echo', status=Job.RUNNING, attempts=1, started_at=old)
+        exhausted = Job.objects.create(kind='echo', status=Job.RUNNING, attempts=2, started_at=old)
+        fresh = Job.objects.create(kind='echo', status=Job.RUNNING, attempts=1, started_at=timezone.now())
+
+        self.assertEqual(queue.requeue_stale(), 2)
+
+        for job in (retry, exhausted, fresh):
+            job.refresh_from_db()
+        self.assertEqual(retry.status, Job.QUEUED)
+        self.assertEqual((exhausted.status, exhausted.error), (Job.FAILED, 'Worker zaman aşımı'))
+        self.assertEqual(fresh.status, Job.RUNNING)
+
+
+class JobDetailViewTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='x')
+        self.other = User.objects.create_user('other', password='x')
+        self.client = APIClient()
+
+    def test_user_job_is_owner_only(self):
+        job = Job.objects.create(kind='echo', user=self.owner, status=Job.DONE, status_code=200, result={ 'ok': True })
+        url = f'/api/jobs/{job.pk}/'
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result'], { 'ok': True })
+
+    def test_anonymous_job_is_readable_by_id(self):
+        job = Job.objects.create(kind='echo', status=Job.FAILED, error='boom')
+
+        response = self.client.get(f'/api/jobs/{job.pk}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['status'], response.json()['error']), (Job.FAILED, 'boom'))
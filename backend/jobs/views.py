@@ -0,0 +1,29 @@
+from rest_framework import permissions, views, status
+from rest_framework.response import Response
+
+from .models import Job
+
+
+class JobDetailView(views.APIView):
+    """Status and, once finished, the response of a background job."""
+    permission_classes = [permissions.AllowAny]  # job ids are random UUIDs; user jobs are owner-only
+
+    def get(self, request, pk):
+        job = Job.objects.filter(pk=pk).first()  # type: ignore[attr-defined]
+        if not job or (job.user_id and job.user_id != getattr(request.user, 'pk', None)):
+            return Response({ 'error': 'İş bulunamadı' }, status=status.HTTP_404_NOT_FOUND)
+        body = {
+            'id': str(job.pk),
+            'kind': job.kind,
+            'status': job.status,
+            'attempts': job.attempts,
+            'created_at': job.created_at.isoformat(),
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+        if job.status == Job.DONE:
+            body['status_code'] = job.status_code
+            body['result'] = job.result
+        elif job.error:
+            body['error'] = job.error
+        return Response(body)